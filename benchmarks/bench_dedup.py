@@ -0,0 +1,110 @@
+"""Mide el índice MinHash/LSH de dedup_index frente a comparar la firma con todas las vacantes.
+
+Indexa `--vacancies` descripciones sintéticas en una base temporal y busca
+`--queries` republicaciones (la misma descripción con pequeñas ediciones) y
+otras tantas vacantes nuevas. Reporta latencia de búsqueda, recall de las
+republicaciones y falsos positivos.
+
+Uso: python benchmarks/bench_dedup.py [--vacancies 20000] [--queries 200] [--edits 3]
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+import numpy as np
+
+import stub_server  # noqa: F401  (agrega src/ al path)
+
+from dedup_index import NearDuplicateIndex, similarity
+from skill_taxonomy import get_skill_taxonomy
+
+WORDS = ("we are looking for a motivated professional to join our growing team buscamos una persona proactiva "
+         "con capacidad de analisis orientacion a resultados experiencia liderando proyectos con clientes "
+         "internacionales ofrecemos salario competitivo modalidad remota beneficios de salud").split()
+
+
+def make_description(rng, skills, words=250):
+    tokens = [rng.choice(WORDS) if rng.random() > 0.15 else rng.choice(skills) for _ in range(words)]
+    return " ".join(tokens)
+
+
+def repost(rng, text, edits):
+    # Republicación: se cambian, agregan o quitan algunas palabras
+    tokens = text.split()
+    for _ in range(edits):
+        position = rng.randrange(len(tokens))
+        action = rng.random()
+        if action < 0.4:
+            tokens[position] = rng.choice(WORDS)
+        elif action < 0.7:
+            tokens.insert(position, rng.choice(WORDS))
+        else:
+            del tokens[position]
+    return " ".join(tokens)
+
+
+def percentiles(values):
+    values = sorted(values)
+    return statistics.median(values), values[int(len(values) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vacancies", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--edits", type=int, default=3, help="Palabras editadas en cada republicación")
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    skills = get_skill_taxonomy().skills
+    descriptions = [make_description(rng, skills) for _ in range(args.vacancies)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = NearDuplicateIndex(os.path.join(tmp, "jobs.sqlite3"))
+        start = time.perf_counter()
+        conn = index._connection()
+        conn.execute("BEGIN")
+        for row_id, text in enumerate(descriptions, 1):
+            index._insert(conn, row_id, text)
+        conn.execute("COMMIT")
+        build_s = time.perf_counter() - start
+        print(f"Indexadas {args.vacancies} vacantes en {build_s:.1f} s "
+              f"({build_s * 1000 / args.vacancies:.2f} ms/vacante)")
+
+        targets = rng.sample(range(args.vacancies), args.queries)
+        reposts = [(row + 1, repost(rng, descriptions[row], args.edits)) for row in targets]
+        fresh = [make_description(rng, skills) for _ in range(args.queries)]
+
+        lsh_ms, found, false_positives = [], 0, 0
+        for expected, text in reposts:
+            start = time.perf_counter()
+            matches = index.find(text)
+            lsh_ms.append((time.perf_counter() - start) * 1000)
+            found += bool(matches) and matches[0][0] == expected
+        for text in fresh:
+            start = time.perf_counter()
+            false_positives += bool(index.find(text))
+            lsh_ms.append((time.perf_counter() - start) * 1000)
+
+        signatures = [(row_id, np.frombuffer(blob, dtype=np.uint32)) for row_id, blob in
+                      conn.execute("SELECT job_row_id, signature FROM job_minhash")]
+        scan_ms = []
+        for _, text in reposts[:20]:
+            start = time.perf_counter()
+            signature = index.hasher.signature(text)
+            max(signatures, key=lambda item: similarity(signature, item[1]))
+            scan_ms.append((time.perf_counter() - start) * 1000)
+
+    p50, p95 = percentiles(lsh_ms)
+    print(f"LSH:           p50={p50:7.2f} ms  p95={p95:7.2f} ms por búsqueda")
+    print(f"Barrido lineal: p50={statistics.median(scan_ms):7.2f} ms por búsqueda (firmas ya en memoria)")
+    print(f"Republicaciones encontradas: {found}/{len(reposts)}  "
+          f"falsos positivos: {false_positives}/{len(fresh)} (umbral {index.threshold})")
+
+
+if __name__ == "__main__":
+    main()
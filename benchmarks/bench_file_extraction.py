@@ -0,0 +1,79 @@
+"""Compara la extracción en memoria de FileProcessor con la ruta anterior (guardar en disco y releer).
+
+Uso: python benchmarks/bench_file_extraction.py [--runs 10] [--pdf-pages 20]
+"""
+import io
+import os
+import time
+import argparse
+import statistics
+import tracemalloc
+
+import stub_server  # noqa: F401  (agrega src/ al path)
+from documents import make_docx, make_pdf, make_txt
+
+from file_processor import FileProcessor
+
+
+class FakeUpload:
+    """Imita werkzeug.FileStorage: nombre, stream y save()."""
+
+    def __init__(self, filename, content):
+        self.filename = filename
+        self.content = content
+        self.stream = io.BytesIO(content)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.content)
+
+
+def legacy_process(upload):
+    # Ruta anterior: guardar en temp_uploads, extraer desde la ruta y borrar
+    temp_path = FileProcessor.save_temp_file(upload)
+    try:
+        extension = FileProcessor.get_file_extension(upload.filename)
+        return FileProcessor.extract_text(temp_path, extension).strip()
+    finally:
+        os.remove(temp_path)
+
+
+def in_memory_process(upload):
+    return FileProcessor.process_file(upload)
+
+
+def measure(fn, filename, content, runs):
+    latencies = []
+    peaks = []
+    for _ in range(runs):
+        upload = FakeUpload(filename, content)
+        tracemalloc.start()
+        start = time.perf_counter()
+        text = fn(upload)
+        latencies.append((time.perf_counter() - start) * 1000)
+        peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+        tracemalloc.stop()
+        assert text
+    return statistics.median(latencies), max(peaks)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--pdf-pages", type=int, default=20)
+    args = parser.parse_args()
+
+    documents = [
+        ("cv.txt", make_txt()),
+        ("cv.docx", make_docx()),
+        ("cv.pdf", make_pdf(pages=args.pdf_pages)),
+    ]
+    print(f"{'archivo':<10} {'tamaño':>10} {'ruta':<10} {'p50 ms':>9} {'pico KiB':>10}")
+    for filename, content in documents:
+        for name, fn in (("disco", legacy_process), ("memoria", in_memory_process)):
+            p50, peak = measure(fn, filename, content, args.runs)
+            print(f"{filename:<10} {len(content):>10} {name:<10} {p50:>9.2f} {peak:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
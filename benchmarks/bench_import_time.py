@@ -0,0 +1,103 @@
+"""Mide el tiempo de importación en frío de los módulos de entrada con `python -X importtime`.
+
+Falla (código de salida 1) si un módulo de entrada vuelve a importar al cargar
+alguna dependencia pesada que debe ser perezosa, o si con `--compare` el tiempo
+empeora más de la tolerancia respecto a una línea base guardada con `--save`.
+
+Uso:
+    python benchmarks/bench_import_time.py [--runs 5] [--save base.json] [--compare base.json]
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), "src")
+
+# Dependencias que solo deben cargarse en el primer uso (scraping con navegador, HTML, Gemini)
+LAZY_MODULES = ("selenium", "webdriver_manager", "google.generativeai", "bs4", "requests", "pandas")
+
+ENTRY_MODULES = ("job_cv_optimizer", "pipeline", "file_processor", "batch", "app")
+
+
+def import_profile(module):
+    """Retorna {módulo: microsegundos acumulados} de un `import module` en un intérprete nuevo."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR, capture_output=True, text=True,
+        # Sin el warm-up de app.py, que importaría Gemini y Selenium en segundo plano
+        env=dict(os.environ, PYTHONPATH=SRC_DIR, APP_WARM_UP="0"),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {module}:\n{result.stderr[-2000:]}")
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        entries.append((name.strip(), int(cumulative), len(name) - len(name.lstrip()) > 1))
+    # Se listan en orden de finalización: las dependencias del módulo son las líneas anidadas
+    # justo antes de su entrada de nivel superior (lo anterior es el arranque del intérprete)
+    end = max(i for i, (name, _, nested) in enumerate(entries) if name == module and not nested)
+    start = end
+    while start > 0 and entries[start - 1][2]:
+        start -= 1
+    profile = {}
+    for name, cumulative, _ in entries[start:end + 1]:
+        profile[name] = max(profile.get(name, 0), cumulative)
+    return profile
+
+
+def lazy_violations(profile):
+    return sorted(name for name in profile
+                  if any(name == lazy or name.startswith(lazy + ".") for lazy in LAZY_MODULES))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modules", nargs="+", default=list(ENTRY_MODULES))
+    parser.add_argument("--runs", type=int, default=5, help="Se toma el mínimo de varias ejecuciones")
+    parser.add_argument("--top", type=int, default=5, help="Dependencias más costosas a mostrar")
+    parser.add_argument("--save", help="Guarda los tiempos como línea base JSON")
+    parser.add_argument("--compare", help="Compara contra una línea base JSON")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Empeoramiento relativo permitido")
+    parser.add_argument("--min-delta-ms", type=float, default=20, help="Empeoramiento absoluto ignorado")
+    args = parser.parse_args()
+
+    failures = []
+    results = {}
+    for module in args.modules:
+        profiles = [import_profile(module) for _ in range(args.runs)]
+        best = min(profiles, key=lambda p: p[module])
+        results[module] = best[module] / 1000
+        heaviest = sorted(((us, name) for name, us in best.items() if name != module), reverse=True)[:args.top]
+        print(f"{module:<18} {results[module]:8.1f} ms   "
+              + ", ".join(f"{name} {us / 1000:.0f}" for us, name in heaviest))
+        violations = lazy_violations(best)
+        if violations:
+            failures.append(f"{module} importa al cargar: {', '.join(violations[:5])}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        for module, ms in results.items():
+            if module not in baseline:
+                continue
+            delta = ms - baseline[module]
+            if delta > args.min_delta_ms and delta > baseline[module] * args.tolerance:
+                failures.append(f"{module}: {baseline[module]:.1f} ms -> {ms:.1f} ms")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Línea base guardada en {args.save}")
+
+    for failure in failures:
+        print("REGRESIÓN:", failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""Compara la extracción de palabras clave anterior con el autómata de skill_taxonomy.
+
+Amplía la taxonomía incluida con habilidades sintéticas de varias palabras hasta
+`--skills` y genera descripciones de `--chars` caracteres. La línea base por
+expresiones regulares recorre el texto una vez por sinónimo; el autómata, una
+sola vez en total.
+
+Uso: python benchmarks/bench_keywords.py [--skills 5000] [--chars 100000] [--docs 5]
+"""
+import re
+import time
+import random
+import argparse
+import statistics
+
+import stub_server  # noqa: F401  (agrega src/ al path)
+
+import skill_taxonomy
+from skill_taxonomy import SkillTaxonomy, parse_taxonomy, normalize
+
+SYLLABLES = ("da", "ta", "lo", "ri", "ne", "xo", "ku", "ve", "mi", "sa", "po", "tre", "gan", "bel", "qui")
+
+
+def legacy_extract(description, requirements):
+    # Implementación anterior de linkedin_scraper._extract_keywords
+    keywords = []
+    combined_text = description + " " + requirements
+    common_keywords = ["python", "machine learning", "data science", "remote", "english", "skills", "experience"]
+    for word in combined_text.lower().split():
+        if word in common_keywords and word.capitalize() not in keywords:
+            keywords.append(word.capitalize())
+    return keywords
+
+
+def synthetic_entries(count, rng):
+    def word():
+        return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+    entries = []
+    for i in range(count):
+        name = " ".join(word() for _ in range(rng.randint(1, 3))) + f" {i}"
+        entries.append((name, "Sintéticas", [f"{name} pro", name.replace(" ", "-")]))
+    return entries
+
+
+def make_document(chars, skills, rng):
+    filler = ("We are looking for a motivated analyst to join our remote team. Buscamos una persona "
+              "con experiencia, capacidad de análisis y ganas de aprender. ").split()
+    words = []
+    size = 0
+    while size < chars:
+        token = rng.choice(skills) if rng.random() < 0.03 else rng.choice(filler)
+        words.append(token)
+        size += len(token) + 1
+    return " ".join(words)
+
+
+class RegexBaseline:
+    """Una búsqueda con límites de palabra por sinónimo: O(sinónimos × texto)."""
+
+    def __init__(self, taxonomy_entries):
+        self.patterns = []
+        for canonical, _, aliases in taxonomy_entries:
+            for alias in [canonical] + [a.lstrip("!") for a in aliases]:
+                folded = normalize(alias)
+                if folded:
+                    self.patterns.append((canonical, re.compile(r"(?<!\w)" + re.escape(folded) + r"(?!\w)")))
+
+    def extract(self, text):
+        folded = normalize(text)
+        found = []
+        for canonical, pattern in self.patterns:
+            if canonical not in found and pattern.search(folded):
+                found.append(canonical)
+        return found
+
+
+def measure(name, fn, documents, runs):
+    times = []
+    found = 0
+    for _ in range(runs):
+        for document in documents:
+            start = time.perf_counter()
+            found = len(fn(document))
+            times.append((time.perf_counter() - start) * 1000)
+    p50 = statistics.median(times)
+    chars = statistics.mean(len(d) for d in documents)
+    print(f"{name:<28} p50={p50:9.2f} ms/doc  {chars / 1e6 / (p50 / 1000):7.1f} M caracteres/s  "
+          f"habilidades={found}")
+    return p50
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--skills", type=int, default=5000, help="Tamaño total de la taxonomía")
+    parser.add_argument("--chars", type=int, default=100_000, help="Caracteres por descripción")
+    parser.add_argument("--docs", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--skip-regex", action="store_true", help="Omite la línea base lenta")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with open(skill_taxonomy.DEFAULT_TAXONOMY_PATH, "r", encoding="utf-8") as f:
+        entries = parse_taxonomy(f)
+    entries += synthetic_entries(max(0, args.skills - len(entries)), rng)
+
+    start = time.perf_counter()
+    taxonomy = SkillTaxonomy(entries)
+    compile_ms = (time.perf_counter() - start) * 1000
+    print(f"Taxonomía: {len(taxonomy.skills)} habilidades, {taxonomy.pattern_count} sinónimos, "
+          f"{len(taxonomy._goto)} estados, compilada en {compile_ms:.1f} ms")
+
+    mentions = [name for name, _, _ in entries[::7]]
+    documents = [make_document(args.chars, mentions, rng) for _ in range(args.docs)]
+    print(f"{args.docs} descripciones de ~{args.chars} caracteres")
+
+    measure("anterior (split + 7 palabras)", lambda d: legacy_extract(d, ""), documents, args.runs)
+    automaton_ms = measure("autómata Aho-Corasick", taxonomy.extract, documents, args.runs)
+    if not args.skip_regex:
+        baseline = RegexBaseline(entries)
+        regex_ms = measure("regex por sinónimo", baseline.extract, documents[:1], 1)
+        print(f"Aceleración frente a regex: {regex_ms / automaton_ms:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Compara la extracción de PDFs página a página en un hilo con el pool de procesos de pdf_extraction.
+
+Uso: python benchmarks/bench_pdf_extraction.py [--pages 40] [--blank-every 5] [--runs 3]
+"""
+import io
+import time
+import argparse
+import statistics
+
+import stub_server  # noqa: F401  (agrega src/ al path)
+from documents import make_pdf
+
+import PyPDF2
+import pdf_extraction
+
+
+def legacy_extract(content):
+    reader = PyPDF2.PdfReader(io.BytesIO(content))
+    start = time.perf_counter()
+    first = None
+    texts = []
+    for page in reader.pages:
+        texts.append(page.extract_text())
+        if first is None:
+            first = time.perf_counter() - start
+    return first, '\n'.join(texts)
+
+
+def engine_extract(content):
+    start = time.perf_counter()
+    first = None
+    texts = []
+    for _, text in pdf_extraction.iter_pdf_pages(io.BytesIO(content), max_pages=0, time_budget=600):
+        texts.append(text)
+        if first is None:
+            first = time.perf_counter() - start
+    return first, '\n'.join(texts)
+
+
+def measure(name, fn, content, runs):
+    totals, firsts = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        first, text = fn(content)
+        totals.append((time.perf_counter() - start) * 1000)
+        firsts.append((first or 0) * 1000)
+    print(f"{name:<22} primera página p50={statistics.median(firsts):8.1f} ms  "
+          f"total p50={statistics.median(totals):8.1f} ms  caracteres={len(text)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--blank-every", type=int, default=5, help="Cada cuántas páginas hay una sin texto")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    blank = set(range(args.blank_every - 1, args.pages, args.blank_every)) if args.blank_every else set()
+    content = make_pdf(pages=args.pages, blank_pages=blank)
+    print(f"PDF de {args.pages} páginas ({len(blank)} sin texto), {len(content)} bytes, "
+          f"{pdf_extraction.WORKERS} workers")
+
+    measure("un hilo (anterior)", legacy_extract, content, args.runs)
+    parallel_min = pdf_extraction.PARALLEL_MIN_PAGES
+    pdf_extraction.PARALLEL_MIN_PAGES = args.pages + 1
+    measure("un hilo + salto vacías", engine_extract, content, args.runs)
+    pdf_extraction.PARALLEL_MIN_PAGES = parallel_min
+    pdf_extraction.warm_up_pdf_executor()  # arranque del pool fuera de la medición
+    measure("pool de procesos", engine_extract, content, args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""Benchmark de extremo a extremo del pipeline sin red: fixtures locales y Gemini falso.
+
+Cubre scraping, postprocess_job_text, optimize_cv_with_gemini, build_custom_json,
+guardar_en_dataframe y save_to_history. Con --combined, el postprocesamiento y la
+optimización salen de una sola llamada (optimize_and_postprocess). Reporta
+p50/p95/p99 por etapa, throughput, tokens de prompt enviados y memoria pico, y
+puede guardar una línea base para comparar ejecuciones.
+
+Uso:
+    python benchmarks/bench_pipeline.py [--iterations 50] [--concurrency 4] [--llm-latency-ms 50]
+                                        [--warm-cache] [--no-parser] [--combined] [--save base.json] [--compare base.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import platform
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+from stub_server import FIXTURES_DIR, serve_fixtures
+
+STAGES = ("scrape", "postprocess_job_text", "optimize_cv", "llm_combined", "build_custom_json", "ats_score",
+          "guardar_en_dataframe", "save_to_history", "total")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        # Windows: sin getrusage
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KiB y macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_iteration(pipeline, url, cv_text):
+    from pipeline import StageTimer
+
+    timer = StageTimer()
+    start = time.perf_counter()
+    with timer.stage("scrape"):
+        vacancy_data = pipeline["scrape_linkedin_vacancy"](url)
+    if vacancy_data is None:
+        raise RuntimeError(f"El fixture no se pudo scrapear: {url}")
+    if "optimize_and_postprocess" in pipeline:
+        with timer.stage("llm_combined"):
+            cv_es, cv_en, processed = pipeline["optimize_and_postprocess"](vacancy_data, cv_text)
+        with timer.stage("build_custom_json"):
+            custom_json = pipeline["build_custom_json"](vacancy_data, processed=processed)
+    else:
+        with timer.stage("postprocess_job_text"):
+            pipeline["postprocess_job_text"](vacancy_data["Información del trabajo"])
+        with timer.stage("optimize_cv"):
+            cv_es, cv_en = pipeline["optimize_cv_with_gemini"](vacancy_data, cv_text)
+        with timer.stage("build_custom_json"):
+            custom_json = pipeline["build_custom_json"](vacancy_data)
+    with timer.stage("ats_score"):
+        pipeline["ats_score"](vacancy_data, cv_text, cv_es, cv_en)
+    with timer.stage("guardar_en_dataframe"):
+        pipeline["guardar_en_dataframe"](custom_json)
+    with timer.stage("save_to_history"):
+        pipeline["save_to_history"](cv_text, cv_es, cv_en, vacancy_data)
+    timer.record("total", (time.perf_counter() - start) * 1000)
+    return timer.as_dict()
+
+
+def prompt_tokens_sent(metrics):
+    """Tokens estimados de todos los prompts enviados (después de compactarlos)."""
+    return sum(series["sum"] for (stage, phase), series in metrics.PROMPT_TOKENS.snapshot().items()
+               if phase == "after")
+
+
+def summarize(samples, wall_seconds):
+    stages = {}
+    for stage in STAGES:
+        values = [sample[stage] for sample in samples if stage in sample]
+        if values:
+            stages[stage] = {"p50": percentile(values, 50), "p95": percentile(values, 95),
+                             "p99": percentile(values, 99), "n": len(values)}
+    return {
+        "stages": stages,
+        "throughput_per_min": round(len(samples) / wall_seconds * 60, 1) if wall_seconds else 0.0,
+        "wall_seconds": round(wall_seconds, 2),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def print_report(results):
+    print(f"{'etapa':<22} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for stage, values in results["stages"].items():
+        print(f"{stage:<22} {values['p50']:>9.1f} {values['p95']:>9.1f} {values['p99']:>9.1f}")
+    print(f"Throughput: {results['throughput_per_min']} vacantes/min en {results['wall_seconds']} s  "
+          f"Memoria pico (RSS): {results['peak_rss_mb']} MB")
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Imprime las diferencias con la línea base y retorna la lista de regresiones."""
+    regressions = []
+    if baseline.get("config") != results.get("config"):
+        print("Aviso: la configuración difiere de la línea base:", baseline.get("config"))
+    print(f"\n{'etapa':<22} {'base p95':>9} {'p95':>9} {'cambio':>8}")
+    for stage, values in results["stages"].items():
+        base = baseline["stages"].get(stage)
+        if base is None:
+            continue
+        delta = values["p95"] - base["p95"]
+        change = delta / base["p95"] if base["p95"] else 0.0
+        print(f"{stage:<22} {base['p95']:>9.1f} {values['p95']:>9.1f} {change:>+8.0%}")
+        if delta > min_delta_ms and change > tolerance:
+            regressions.append(f"{stage} p95 {base['p95']:.1f} -> {values['p95']:.1f} ms")
+    base_throughput = baseline.get("throughput_per_min") or 0
+    if base_throughput and results["throughput_per_min"] < base_throughput * (1 - tolerance):
+        regressions.append(f"throughput {base_throughput} -> {results['throughput_per_min']} vacantes/min")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=2, help="Iteraciones iniciales fuera de la medición")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--llm-latency-ms", type=float, default=50)
+    parser.add_argument("--llm-jitter-ms", type=float, default=10)
+    parser.add_argument("--response-chars", type=int, default=3000, help="Largo de cada versión del CV falso")
+    parser.add_argument("--failure-rate", type=float, default=0.0,
+                        help="Fracción de llamadas al Gemini falso que responden 429")
+    parser.add_argument("--rpm", type=float, default=0, help="Límite de llamadas por minuto (0 sin límite)")
+    parser.add_argument("--warm-cache", action="store_true",
+                        help="Misma vacante en todas las iteraciones, con cachés activas")
+    parser.add_argument("--no-parser", action="store_true",
+                        help="Envía siempre el postprocesamiento a Gemini (sin el parser local)")
+    parser.add_argument("--combined", action="store_true",
+                        help="Una sola llamada a Gemini con respuesta JSON para el CV y la vacante")
+    parser.add_argument("--save", help="Guarda los resultados como línea base JSON")
+    parser.add_argument("--compare", help="Compara contra una línea base JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Empeoramiento relativo permitido")
+    parser.add_argument("--min-delta-ms", type=float, default=5, help="Empeoramiento absoluto ignorado")
+    parser.add_argument("--verbose", action="store_true", help="Muestra los mensajes del pipeline")
+    args = parser.parse_args()
+
+    save_path = os.path.abspath(args.save) if args.save else None
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+    with open(os.path.join(FIXTURES_DIR, "input_cv.txt"), "r", encoding="utf-8") as f:
+        cv_text = f.read()
+
+    # Todos los almacenes y cachés usan rutas relativas: se aíslan en un directorio temporal
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    os.chdir(workdir)
+    os.environ["GEMINI_RPM"] = str(args.rpm)
+    # app.py se importa solo por save_to_history: sin arrancar Chrome ni Gemini reales
+    os.environ["APP_WARM_UP"] = "0"
+    if args.no_parser:
+        os.environ["POSTPROCESS_PARSER"] = "0"
+    if not args.warm_cache:
+        os.environ["LLM_CACHE_PATH"] = ""
+        os.environ["LLM_CACHE_MEMORY_BYTES"] = "0"
+
+    from fake_gemini import FakeGemini
+    from gemini_client import set_model_factory
+    from job_cv_optimizer import (scrape_linkedin_vacancy, postprocess_job_text, optimize_cv_with_gemini,
+                                  build_custom_json, guardar_en_dataframe, optimize_and_postprocess)
+    from app import save_to_history
+    from ats_score import get_ats_scorer
+
+    import metrics
+
+    fake = FakeGemini(latency_ms=args.llm_latency_ms, jitter_ms=args.llm_jitter_ms,
+                      response_chars=args.response_chars, failure_rate=args.failure_rate, seed=42)
+    set_model_factory(fake)
+    pipeline = {
+        "scrape_linkedin_vacancy": scrape_linkedin_vacancy,
+        "postprocess_job_text": postprocess_job_text,
+        "optimize_cv_with_gemini": optimize_cv_with_gemini,
+        "build_custom_json": build_custom_json,
+        "guardar_en_dataframe": guardar_en_dataframe,
+        "save_to_history": save_to_history,
+        "ats_score": get_ats_scorer().compare,
+    }
+    if args.combined:
+        pipeline["optimize_and_postprocess"] = optimize_and_postprocess
+
+    config = {key: getattr(args, key) for key in ("iterations", "concurrency", "llm_latency_ms", "llm_jitter_ms",
+                                                   "response_chars", "failure_rate", "rpm", "warm_cache", "combined")}
+    config["python"] = platform.python_version()
+    # Los print de depuración del pipeline incluyen las respuestas completas
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    with serve_fixtures() as base_url, quiet:
+        def url_for(i):
+            # Sin --warm-cache cada iteración es una vacante distinta para las cachés
+            job_id = 4119032958 if args.warm_cache else 4119032958 + i
+            return f"{base_url}/linkedin_job_public.html?currentJobId={job_id}"
+
+        for i in range(args.warmup):
+            run_iteration(pipeline, url_for(-1 - i), cv_text)
+        calls_before = fake.calls
+        tokens_before = prompt_tokens_sent(metrics)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+            samples = list(executor.map(lambda i: run_iteration(pipeline, url_for(i), cv_text),
+                                        range(args.iterations)))
+        wall_seconds = time.perf_counter() - start
+
+    results = summarize(samples, wall_seconds)
+    results["config"] = config
+    results["llm_calls"] = fake.calls - calls_before
+    results["prompt_tokens"] = prompt_tokens_sent(metrics) - tokens_before
+    results["gemini_requests"] = {f"{stage}:{outcome}": count
+                                  for (stage, outcome), count in sorted(metrics.GEMINI_REQUESTS.values().items())}
+    results["fallbacks"] = metrics.fallback_counts()
+    results["postprocess"] = metrics.postprocess_report()
+    print(f"{args.iterations} iteraciones, concurrencia {args.concurrency}, "
+          f"{results['llm_calls']} llamadas al Gemini falso ({args.llm_latency_ms} ms), "
+          f"{results['prompt_tokens']:.0f} tokens de prompt estimados")
+    if args.failure_rate:
+        print("Llamadas por resultado:", results["gemini_requests"], " Respaldos:", results["fallbacks"])
+    print_report(results)
+    if not args.no_parser:
+        parsed = results["postprocess"]
+        print(f"Postprocesamiento local: {parsed['parser']} de {parsed['parser'] + parsed['gemini']} "
+              f"llamadas evitadas ({parsed['avoided_share']:.0%}), parser p. medio {parsed['parser_mean_ms']} ms")
+
+    if save_path:
+        with open(save_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Línea base guardada en {save_path}")
+    if compare_path:
+        with open(compare_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        for regression in regressions:
+            print("REGRESIÓN:", regression)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
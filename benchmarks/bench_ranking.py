@@ -0,0 +1,87 @@
+"""Mide el ranking vectorizado de ranking.py frente a puntuar par a par con ats_score.
+
+Genera `--vacancies` vacantes y `--cvs` CVs sintéticos con habilidades reales de
+la taxonomía y mide: construcción del índice, matriz de similitud completa,
+top-k en ambos sentidos y la actualización incremental con `--new` vacantes.
+La línea base puntúa `--baseline-pairs` pares con ATSScorer y extrapola al total.
+
+Uso: python benchmarks/bench_ranking.py [--vacancies 10000] [--cvs 100] [--top 10]
+"""
+import time
+import random
+import argparse
+
+import stub_server  # noqa: F401  (agrega src/ al path)
+
+from ranking import RankingIndex
+from ats_score import ATSScorer
+from skill_taxonomy import get_skill_taxonomy
+
+FILLER = ("We are looking for a motivated professional to join our growing team in a fast paced environment. "
+          "Buscamos una persona proactiva con capacidad de análisis, orientación a resultados y trabajo en "
+          "equipo para liderar proyectos con clientes internacionales y mejorar procesos internos").split()
+
+
+def make_document(rng, skills, words, skill_count):
+    chosen = rng.sample(skills, skill_count)
+    tokens = [rng.choice(FILLER) for _ in range(words)]
+    for skill in chosen:
+        tokens.insert(rng.randrange(len(tokens) + 1), skill + ",")
+    return " ".join(tokens)
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{label:<40} {elapsed:10.1f} ms")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vacancies", type=int, default=10_000)
+    parser.add_argument("--cvs", type=int, default=100)
+    parser.add_argument("--new", type=int, default=200, help="Vacantes agregadas después de construir")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--baseline-pairs", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    taxonomy = get_skill_taxonomy()
+    skills = taxonomy.skills
+    vacancies = [(f"vacante-{i}", make_document(rng, skills, 220, 12)) for i in range(args.vacancies + args.new)]
+    cvs = [(f"cv-{i}", make_document(rng, skills, 350, 25)) for i in range(args.cvs)]
+    initial, arriving = vacancies[:args.vacancies], vacancies[args.vacancies:]
+    print(f"{args.vacancies} vacantes × {args.cvs} CVs (+{args.new} vacantes nuevas), top {args.top}")
+
+    index = RankingIndex(taxonomy=taxonomy)
+    timed("índice: vacantes", lambda: index.add_vacancies(initial))
+    timed("índice: CVs", lambda: index.add_cvs(cvs))
+    print("  ", index.stats())
+    scores, similarity_ms = timed("matriz de similitud completa", index.similarity)
+    _, top_ms = timed("top-k vacantes por CV", lambda: index.top_vacancies(args.top))
+    timed("top-k CVs por vacante", lambda: index.top_cvs(args.top))
+    pairs = scores.size
+    print(f"  {pairs / (similarity_ms / 1000) / 1e6:.1f} M pares/s")
+
+    timed(f"incremental: agregar {args.new} vacantes", lambda: index.add_vacancies(arriving))
+    _, rerank_ms = timed("incremental: similitud + top-k", lambda: index.top_vacancies(args.top))
+
+    scorer = ATSScorer(taxonomy=taxonomy)
+    sample = [({"Información del trabajo": text}, cv_text)
+              for (_, text), (_, cv_text) in zip(rng.choices(initial, k=args.baseline_pairs),
+                                                 rng.choices(cvs, k=args.baseline_pairs))]
+    start = time.perf_counter()
+    for vacancy_data, cv_text in sample:
+        scorer.score(cv_text, vacancy_data)
+    per_pair_ms = (time.perf_counter() - start) * 1000 / len(sample)
+    baseline_s = per_pair_ms * pairs / 1000
+    print(f"{'línea base ATSScorer par a par':<40} {per_pair_ms:10.2f} ms/par → ~{baseline_s:,.0f} s para {pairs:,} pares")
+    print(f"Aceleración de similitud + top-k frente a par a par: {baseline_s * 1000 / (similarity_ms + top_ms):,.0f}x")
+    print(f"Re-ranking tras la actualización incremental: {rerank_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
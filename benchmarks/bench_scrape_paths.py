@@ -0,0 +1,73 @@
+"""Compara la ruta HTTP sin navegador con la ruta Selenium sobre fixtures locales.
+
+Uso: python benchmarks/bench_scrape_paths.py [--runs 20] [--skip-selenium]
+"""
+import argparse
+import statistics
+import time
+
+from stub_server import serve_fixtures
+
+from linkedin_scraper import has_required_fields, parse_vacancy_html, scrape_linkedin_vacancy_with_http
+
+
+def check_fixtures(base_url):
+    """Verifica que el parser reconoce la página pública y descarta el authwall."""
+    vacancy = scrape_linkedin_vacancy_with_http(f"{base_url}/linkedin_job_public.html")
+    assert has_required_fields(vacancy), "La página pública debería parsearse completa"
+    assert vacancy["Título del puesto"] == "Senior Data Analyst"
+    assert vacancy["Nombre de la empresa"] == "EPAM Systems"
+    assert vacancy["Requisitos"].startswith("\n- Seniority level: Mid-Senior level")
+    # El HTML minificado (sin espacios entre etiquetas) debe dar las mismas líneas que el indentado
+    minified = scrape_linkedin_vacancy_with_http(f"{base_url}/linkedin_job_public_minified.html")
+    assert minified["Información del trabajo"].split() == vacancy["Información del trabajo"].split()
+    assert "Responsibilities\nBuild dashboards" in minified["Información del trabajo"]
+    assert scrape_linkedin_vacancy_with_http(f"{base_url}/linkedin_authwall.html") is None
+    assert not has_required_fields(parse_vacancy_html("<html></html>", base_url))
+    print("Fixtures OK")
+
+
+def timed(fn, url, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn(url)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert result is not None
+    return samples
+
+
+def report(name, samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{name:<10} n={len(samples):<4} media={statistics.mean(samples):8.1f} ms  "
+          f"p50={statistics.median(samples):8.1f} ms  p95={p95:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--skip-selenium", action="store_true")
+    args = parser.parse_args()
+
+    with serve_fixtures() as base_url:
+        check_fixtures(base_url)
+        url = f"{base_url}/linkedin_job_public.html"
+        report("http", timed(scrape_linkedin_vacancy_with_http, url, args.runs))
+        if not args.skip_selenium:
+            from driver_pool import ChromeDriverPool
+            from job_cv_optimizer import scrape_linkedin_vacancy_with_selenium
+
+            pool = ChromeDriverPool(size=1)
+            try:
+                # El primer arranque de Chrome se mide aparte del régimen estable
+                start = time.perf_counter()
+                pool.warm_up()
+                print(f"Arranque en frío de Chrome: {(time.perf_counter() - start) * 1000:.1f} ms")
+                report("selenium", timed(lambda u: scrape_linkedin_vacancy_with_selenium(u, pool=pool), url, args.runs))
+            finally:
+                pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
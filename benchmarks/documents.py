@@ -0,0 +1,65 @@
+"""Genera CVs sintéticos (PDF, DOCX, TXT) en memoria para los benchmarks de extracción."""
+import io
+
+import docx
+
+LINE = "Senior Data Analyst con experiencia en Python, SQL, Power BI y machine learning aplicado."
+
+
+def make_txt(lines=200):
+    return ("\n".join(f"{i:04d} {LINE}" for i in range(lines))).encode("utf-8")
+
+
+def make_docx(paragraphs=200):
+    document = docx.Document()
+    for i in range(paragraphs):
+        document.add_paragraph(f"{i:04d} {LINE}")
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages=10, lines_per_page=40, blank_pages=()):
+    """PDF mínimo con una fuente estándar; las páginas en `blank_pages` no tienen capa de texto."""
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog_id = add(None)
+    pages_id = add(None)
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    page_ids = []
+    for page in range(pages):
+        if page in blank_pages:
+            content = b"0.9 g 72 72 400 600 re f"
+        else:
+            lines = [f"BT /F1 9 Tf 40 {800 - 18 * i} Td ({_escape(f'p{page} l{i} {LINE}')}) Tj ET"
+                     for i in range(lines_per_page)]
+            content = "\n".join(lines).encode("latin-1")
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_id, font_id, content_id)
+        ))
+    objects[catalog_id - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog_id, xref))
+    return out.getvalue()
@@ -1,12 +1,71 @@
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_file, Response, stream_with_context
 import os
 import json
+import threading
 from datetime import datetime
+from flask.wrappers import Request
 from werkzeug.utils import secure_filename
 from file_processor import FileProcessor
-from job_cv_optimizer import scrape_linkedin_vacancy_with_selenium, optimize_cv_with_gemini, clean_filename, build_custom_json, guardar_en_dataframe
+from job_cv_optimizer import init, scrape_linkedin_vacancy, clean_filename, guardar_en_dataframe
+from pipeline import StageTimer, OptimizationStream, optimize_vacancy
+from driver_pool import get_driver_pool
+from pdf_extraction import warm_up_pdf_executor
+from skill_taxonomy import get_skill_taxonomy
+from ats_score import get_ats_scorer
+from vacancy_cache import get_vacancy_cache
+from llm_cache import get_llm_cache
+from extraction_cache import get_extraction_cache
+from metrics import span, render_latest
+from jobs_store import get_jobs_store, DEFAULT_CSV_PATH
+from history_store import get_history_store
+from store_query import InvalidQueryError
+from job_queue import JobQueue, QueueFullError, create_backend, QUEUED, SCRAPING, OPTIMIZING, FINAL_STATES
+
+class UploadRequest(Request):
+    # Las subidas grandes van directo a un archivo temporal con nombre que se lee sin copiarlo
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return FileProcessor.upload_stream_factory(total_content_length, content_type, filename, content_length)
 
 app = Flask(__name__)
+app.request_class = UploadRequest
+# Carga .env y crea los directorios de datos; Gemini y Selenium se cargan en el primer uso
+init()
+
+_warm_up_lock = threading.Lock()
+_warm_up_pid = None
+
+def warm_up():
+    """Configura Gemini, arranca el pool de Chrome y los workers de PDF y compila la taxonomía.
+
+    Corre una sola vez por proceso: un worker creado con fork (gunicorn --preload)
+    vuelve a calentar sus propios recursos.
+    """
+    global _warm_up_pid
+    with _warm_up_lock:
+        if _warm_up_pid == os.getpid():
+            return
+        _warm_up_pid = os.getpid()
+    init(preload_gemini=True)
+    get_driver_pool().warm_up()
+    warm_up_pdf_executor()
+    get_skill_taxonomy()
+
+def start_warm_up():
+    """Lanza warm_up en segundo plano si APP_WARM_UP no lo desactiva."""
+    if os.getenv('APP_WARM_UP', '1').lower() in ('0', 'false', 'no') or _warm_up_pid == os.getpid():
+        return
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+
+@app.before_request
+def _warm_up_worker():
+    # Workers creados después de importar el módulo (fork) no heredan los navegadores del padre
+    start_warm_up()
+
+# Al importar el módulo, en cualquier servidor WSGI; con el recargador de Flask solo en el proceso
+# hijo que atiende peticiones, no en el que vigila los archivos. Nunca en __mp_main__, que es
+# este archivo reimportado por un worker de multiprocessing con spawn
+if __name__ != '__mp_main__' and (__name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+    start_warm_up()
 
 # Configuraciones
 UPLOAD_FOLDER = 'temp_uploads'
@@ -16,16 +75,8 @@ app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max-limit
 # Asegurarse que existe el directorio de uploads
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-def save_to_history(cv_original, cv_es, cv_en, vacancy_data):
+def save_to_history(cv_original, cv_es, cv_en, vacancy_data, fallback=False):
     try:
-        history_file = 'optimization_history.json'
-        
-        if os.path.exists(history_file):
-            with open(history_file, 'r', encoding='utf-8') as f:
-                history = json.load(f)
-        else:
-            history = []
-        
         new_record = {
             'fecha': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             'empresa': vacancy_data.get("Nombre de la empresa", "NA"),
@@ -33,13 +84,13 @@ def save_to_history(cv_original, cv_es, cv_en, vacancy_data):
             'linkedin_url': vacancy_data.get("Enlace de la vacante", "NA"),
             'cv_original': cv_original,
             'cv_es': cv_es,
-            'cv_en': cv_en
+            'cv_en': cv_en,
+            'fallback': fallback
         }
         
-        history.append(new_record)
-        
-        with open(history_file, 'w', encoding='utf-8') as f:
-            json.dump(history, f, ensure_ascii=False, indent=4)
+        # Inserción append-only: el costo no depende del tamaño del histórico
+        with span('persist_history'):
+            get_history_store().append(new_record)
             
     except Exception as e:
         print(f"Error guardando histórico: {e}")
@@ -58,34 +109,57 @@ def process_file():
         return jsonify({'error': 'No selected file'}), 400
     
     try:
-        text = FileProcessor.process_file(file)
-        return jsonify({'text': text})
+        outcome = {}
+        text = FileProcessor.process_file(file, outcome=outcome)
+        body = {'text': text}
+        if outcome.get('truncated'):
+            body['truncated'] = True
+            body['warning'] = (f"El PDF tiene {outcome['pages']} páginas; "
+                               f"solo se leyeron las primeras {outcome['read_pages']}.")
+        return jsonify(body)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/optimize', methods=['POST'])
-def optimize():
-    try:
-        cv_text = request.form.get('cv_text')
-        linkedin_url = request.form.get('linkedin_url')
-        
-        if not cv_text:
-            return jsonify({'error': 'No se proporcionó el texto del CV'}), 400
-        
-        if not linkedin_url:
-            return jsonify({'error': 'No se proporcionó la URL de LinkedIn'}), 400
-        
-        with open("input_cv.txt", "w", encoding="utf-8") as f:
-            f.write(cv_text)
-        
-        vacancy_data = scrape_linkedin_vacancy_with_selenium(linkedin_url)
-        
-        if vacancy_data is None:
-            return jsonify({'error': 'No se pudo extraer información de LinkedIn'}), 400
-            
-        cv_es, cv_en = optimize_cv_with_gemini(vacancy_data, cv_text)
-        
-        save_to_history(cv_text, cv_es, cv_en, vacancy_data)
+class VacancyScrapeError(Exception):
+    """No se pudo extraer la vacante de LinkedIn."""
+
+def run_optimization(cv_text, linkedin_url, job=None):
+    """Scraping, optimización y guardado de una vacante. Retorna el cuerpo de la respuesta.
+
+    Con `job` (un JobContext) se informa el estado y el CV optimizado se envía
+    fragmento a fragmento como eventos 'chunk' mientras Gemini lo genera.
+    """
+    set_status = job.set_status if job is not None else (lambda status: None)
+    
+    with open("input_cv.txt", "w", encoding="utf-8") as f:
+        f.write(cv_text)
+    
+    timer = StageTimer()
+    set_status(SCRAPING)
+    with timer.stage('scrape'):
+        vacancy_data = scrape_linkedin_vacancy(linkedin_url)
+    
+    if vacancy_data is None:
+        raise VacancyScrapeError('No se pudo extraer información de LinkedIn')
+    
+    # Optimización del CV y postprocesamiento de la vacante en paralelo
+    set_status(OPTIMIZING)
+    if job is not None:
+        stream = OptimizationStream(vacancy_data, cv_text, timer=timer)
+        for section, text in stream:
+            job.emit('chunk', {'section': section, 'text': text})
+        cv_es, cv_en, custom_json = stream.result()
+        outcome = stream.outcome
+    else:
+        outcome = {}
+        cv_es, cv_en, custom_json = optimize_vacancy(vacancy_data, cv_text, timer=timer, outcome=outcome)
+    
+    # Puntaje ATS local del CV original y de las versiones optimizadas (milisegundos, sin Gemini)
+    with timer.stage('ats_score'):
+        ats = get_ats_scorer().compare(vacancy_data, cv_text, cv_es, cv_en)
+    
+    with timer.stage('persist'):
+        save_to_history(cv_text, cv_es, cv_en, vacancy_data, fallback=outcome['fallback'])
         
         job_title = clean_filename(vacancy_data["Título del puesto"])
         company_name = clean_filename(vacancy_data["Nombre de la empresa"])
@@ -101,28 +175,180 @@ def optimize():
             f.write(cv_en)
         
         # Guardar información de la vacante
-        custom_json = build_custom_json(vacancy_data)
         json_filename = f"{job_title}-{company_name}.json"
         
         with open(json_filename, "w", encoding="utf-8") as f:
             json.dump(custom_json, f, ensure_ascii=False, indent=4)
         
-        guardar_en_dataframe(custom_json)
-            
-        return jsonify({
-            'success': True,
-            'cv_es': cv_es,
-            'cv_en': cv_en,
-            'es_filename': es_filename,
-            'en_filename': en_filename,
-            'vacancy_data': vacancy_data
-        })
+        guardar_en_dataframe(custom_json, source_text=vacancy_data["Información del trabajo"],
+                             fallback=outcome['postprocess_fallback'])
+    
+    print("Tiempos por etapa (ms):", timer.as_dict())
+    
+    return {
+        'success': True,
+        'cv_es': cv_es,
+        'cv_en': cv_en,
+        'es_filename': es_filename,
+        'en_filename': en_filename,
+        'vacancy_data': vacancy_data,
+        'ats': ats,
+        'timings': timer.as_dict()
+    }
+
+job_queue = JobQueue(
+    handler=lambda payload, job: run_optimization(payload['cv_text'], payload['linkedin_url'], job),
+    backend=create_backend(),
+    workers=int(os.getenv('JOB_WORKERS', '2')),
+    max_pending=int(os.getenv('JOB_MAX_PENDING', '100'))
+)
+
+def _read_optimize_form():
+    cv_text = request.form.get('cv_text')
+    linkedin_url = request.form.get('linkedin_url')
+    
+    if not cv_text:
+        return None, None, 'No se proporcionó el texto del CV'
+    
+    if not linkedin_url:
+        return None, None, 'No se proporcionó la URL de LinkedIn'
+    
+    return cv_text, linkedin_url, None
+
+def _public_job(job):
+    # El payload contiene el CV completo; no se devuelve en cada consulta de estado
+    return {key: job[key] for key in ('id', 'status', 'result', 'error', 'created_at', 'updated_at')}
+
+@app.route('/optimize', methods=['POST'])
+def optimize():
+    try:
+        cv_text, linkedin_url, error = _read_optimize_form()
+        if error:
+            return jsonify({'error': error}), 400
         
+        return jsonify(run_optimization(cv_text, linkedin_url))
+        
+    except VacancyScrapeError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         import traceback
         print("Error detallado:", traceback.format_exc())
         return jsonify({'error': str(e)}), 500
 
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    cv_text, linkedin_url, error = _read_optimize_form()
+    if error:
+        return jsonify({'error': error}), 400
+    
+    try:
+        job_id = job_queue.submit({'cv_text': cv_text, 'linkedin_url': linkedin_url})
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503
+    
+    return jsonify({
+        'job_id': job_id,
+        'status': QUEUED,
+        'status_url': f'/jobs/{job_id}',
+        'events_url': f'/jobs/{job_id}/events'
+    }), 202
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    return jsonify(_public_job(job))
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    if job_queue.get(job_id) is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    
+    def stream():
+        version = -1
+        event_count = 0
+        while True:
+            job = job_queue.wait_for_change(job_id, version, event_count, timeout=15)
+            if job is None:
+                yield 'event: error\ndata: {"error": "Trabajo no encontrado"}\n\n'
+                return
+            if job['version'] == version and job['events'] == event_count:
+                # Comentario SSE para mantener viva la conexión a través de proxies
+                yield ': keep-alive\n\n'
+                continue
+            # Fragmentos del CV generados desde la última vuelta
+            for event in job_queue.get_events(job_id, event_count):
+                event_count += 1
+                yield f"event: {event['type']}\ndata: {json.dumps(event['data'], ensure_ascii=False)}\n\n"
+            if job['version'] != version:
+                version = job['version']
+                yield f"data: {json.dumps(_public_job(job), ensure_ascii=False)}\n\n"
+            if job['status'] in FINAL_STATES:
+                return
+    
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def _query_filters():
+    return {
+        'company': request.args.get('company'),
+        'title': request.args.get('title'),
+        'date_from': request.args.get('date_from'),
+        'date_to': request.args.get('date_to'),
+        'url': request.args.get('url'),
+        'cursor': request.args.get('cursor'),
+        'limit': request.args.get('limit')
+    }
+
+@app.route('/api/history')
+def list_history():
+    include_cv = request.args.get('include_cv', '').lower() in ('1', 'true', 'yes')
+    try:
+        return jsonify(get_history_store().query(include_cv=include_cv, **_query_filters()))
+    except InvalidQueryError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/history/<int:record_id>')
+def history_record(record_id):
+    record = get_history_store().get(record_id)
+    if record is None:
+        return jsonify({'error': 'Registro no encontrado'}), 404
+    return jsonify(record)
+
+@app.route('/api/jobs')
+def list_jobs():
+    fields = [field for field in request.args.get('fields', '').split(',') if field]
+    try:
+        return jsonify(get_jobs_store().query(fields=fields, **_query_filters()))
+    except InvalidQueryError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/jobs/<int:job_row_id>')
+def job_record(job_row_id):
+    record = get_jobs_store().get(job_row_id)
+    if record is None:
+        return jsonify({'error': 'Vacante no encontrada'}), 404
+    return jsonify(record)
+
+@app.route('/export/jobs.csv')
+def export_jobs_csv():
+    csv_path = get_jobs_store().export_csv(os.getenv('JOBS_CSV_PATH', DEFAULT_CSV_PATH))
+    return send_file(os.path.abspath(csv_path), mimetype='text/csv', as_attachment=True, download_name='jobs.CSV')
+
+@app.route('/driver_pool/stats')
+def driver_pool_stats():
+    return jsonify(get_driver_pool().stats())
+
+@app.route('/cache/stats')
+def cache_stats():
+    return jsonify({'vacancies': get_vacancy_cache().stats(), 'llm': get_llm_cache().stats(),
+                    'extraction': get_extraction_cache().stats()})
+
+@app.route('/metrics')
+def metrics():
+    return Response(render_latest(), mimetype='text/plain; version=0.0.4')
+
 @app.errorhandler(413)
 def too_large(e):
     return jsonify({'error': 'El archivo es demasiado grande. Tamaño máximo: 16MB'}), 413
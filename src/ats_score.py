@@ -0,0 +1,213 @@
+"""Puntaje ATS local: qué tanto cubre un CV una vacante, sin llamar a Gemini.
+
+El puntaje (0-100) combina dos señales:
+- Cobertura de habilidades: las habilidades de la taxonomía mencionadas en la
+  vacante ("Palabras clave", "Requisitos" e "Información del trabajo") que
+  también aparecen en el CV, ponderadas por su peso en la vacante. Los
+  sinónimos cuentan en ambos idiomas ("inglés" cubre "English").
+- Coincidencia de texto BM25: los términos de la vacante como consulta y el CV
+  como documento, normalizado por el máximo alcanzable para esa consulta.
+
+Sin corpus todos los términos valen lo mismo; con `ATSScorer.from_corpus` (p.
+ej. las vacantes de un lote) el IDF resta peso a lo que todas las vacantes repiten.
+"""
+import re
+import math
+import time
+import threading
+from collections import Counter
+
+from skill_taxonomy import get_skill_taxonomy, normalize
+
+# Peso de cada campo de la vacante en la consulta
+FIELD_WEIGHTS = (("Información del trabajo", 1.0), ("Requisitos", 2.0), ("Palabras clave", 2.0))
+
+STOPWORDS = frozenset("""
+a al algo algunas algunos ante antes como con contra cual cuando de del desde donde durante e el ella ellas
+ellos en entre era es esa esas ese eso esos esta estas este esto estos fue ha hace hacia han hasta hay la las
+le les lo los mas me mi mis muy nos nuestra nuestras nuestro nuestros o os otra otras otro otros para pero poco
+por porque que quien se sea ser si sin sobre somos son su sus tambien te tiene tienen todo todos tu tus un una
+unas uno unos usted y ya buscamos busca buscando deseable requerido requerida requisitos puesto cargo vacante
+empresa equipo trabajo trabajar experiencia anos ano nivel tipo funcion jornada tiempo completo
+about above after all also an and any are as at be been being both but by can could did do does doing for from
+had has have having he her here his how i if in into is it its just may me more most must my no nor not of off
+on once only or other our ours out over own per same she should so some such than that the their them then
+there these they this those through to too under until up very was we were what when where which while who
+whom why will with would you your yours looking join role position candidate ideal opportunity company team
+work working years year experience level type seniority employment function industries full time part job
+description requirements responsibilities plus strong excellent good great ability able skills skill knowledge
+mid senior junior entry associate
+""".split())
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+_HAS_LETTER = re.compile(r"[a-z]")
+# Plurales en español en -es tras d, l, n, r o z: habilidades -> habilidad (reportes solo pierde la s)
+_ES_PLURAL = re.compile(r"([dlnrz])es$")
+
+
+def _stem(token):
+    if len(token) <= 4 or not token.isalpha():
+        return token
+    if _ES_PLURAL.search(token) and len(token) > 5:
+        return token[:-2]
+    if token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Términos normalizados (sin tildes ni palabras vacías, plurales simples recortados)."""
+    return [(_stem(token), token) for token in _TOKEN.findall(normalize(text or ""))
+            if token not in STOPWORDS and _HAS_LETTER.search(token)]
+
+
+def _field_text(vacancy_data, field):
+    value = vacancy_data.get(field)
+    if isinstance(value, (list, tuple)):
+        return "\n".join(str(item) for item in value)
+    return "" if value in (None, "NA") else str(value)
+
+
+class VacancyProfile:
+    """Términos y habilidades ponderados de una vacante; se reutiliza al puntuar varios CVs."""
+
+    def __init__(self, term_weights, surface, skill_weights):
+        self.term_weights = term_weights
+        self.surface = surface
+        self.skill_weights = skill_weights
+
+
+class ATSScorer:
+    def __init__(self, k1=1.2, b=0.75, avg_doc_length=350, keyword_weight=0.6, document_frequencies=None,
+                 corpus_size=0, taxonomy=None):
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_length = avg_doc_length
+        self.keyword_weight = keyword_weight
+        self.document_frequencies = document_frequencies or {}
+        self.corpus_size = corpus_size
+        self.taxonomy = taxonomy or get_skill_taxonomy()
+
+    @classmethod
+    def from_corpus(cls, texts, **kwargs):
+        """Scorer con IDF y longitud media calculados sobre `texts` (vacantes o CVs)."""
+        frequencies = Counter()
+        lengths = []
+        for text in texts:
+            terms = [stem for stem, _ in tokenize(text)]
+            frequencies.update(set(terms))
+            lengths.append(len(terms))
+        if lengths and sum(lengths):
+            kwargs.setdefault("avg_doc_length", sum(lengths) / len(lengths))
+        return cls(document_frequencies=dict(frequencies), corpus_size=len(lengths), **kwargs)
+
+    def idf(self, term):
+        if not self.corpus_size:
+            return 1.0
+        df = self.document_frequencies.get(term, 0)
+        return math.log(1 + (self.corpus_size - df + 0.5) / (df + 0.5))
+
+    def profile(self, vacancy_data):
+        term_counts = Counter()
+        surface = {}
+        skill_weights = Counter()
+        for field, weight in FIELD_WEIGHTS:
+            text = _field_text(vacancy_data, field)
+            if not text:
+                continue
+            for stem, token in tokenize(text):
+                term_counts[stem] += weight
+                surface.setdefault(stem, token)
+            for skill, count in self.taxonomy.count(text).items():
+                skill_weights[skill] += weight * count
+        # Palabras clave fuera de la taxonomía (p. ej. vacantes cacheadas antes de usarla) cuentan tal cual
+        for keyword in vacancy_data.get("Palabras clave") or ():
+            if keyword and not self.taxonomy.count(keyword):
+                skill_weights[keyword] += 2.0
+        term_weights = {stem: 1 + math.log(count) for stem, count in term_counts.items()}
+        return VacancyProfile(term_weights, surface, dict(skill_weights))
+
+    def _text_match(self, profile, cv_terms):
+        if not profile.term_weights:
+            return 0.0, []
+        tf = Counter(cv_terms)
+        norm = self.k1 * (1 - self.b + self.b * len(cv_terms) / self.avg_doc_length)
+        score = best = 0.0
+        missing = []
+        for term, weight in profile.term_weights.items():
+            idf_weight = weight * self.idf(term)
+            best += idf_weight * (self.k1 + 1)
+            count = tf.get(term, 0)
+            if count:
+                score += idf_weight * count * (self.k1 + 1) / (count + norm)
+            else:
+                missing.append((idf_weight, term))
+        missing.sort(key=lambda item: (-item[0], item[1]))
+        return (score / best if best else 0.0), [profile.surface[term] for _, term in missing]
+
+    def _skill_coverage(self, profile, cv_text):
+        if not profile.skill_weights:
+            return None, [], []
+        cv_skills = self.taxonomy.count(cv_text)
+        folded_cv = normalize(cv_text)
+        matched, missing = [], []
+        for skill, weight in sorted(profile.skill_weights.items(), key=lambda item: (-item[1], item[0])):
+            found = skill in cv_skills or (
+                skill not in self.taxonomy.categories
+                and re.search(r"(?<!\w)" + re.escape(normalize(skill)) + r"(?!\w)", folded_cv))
+            (matched if found else missing).append((skill, weight))
+        total = sum(weight for _, weight in matched + missing)
+        coverage = sum(weight for _, weight in matched) / total
+        return coverage, [skill for skill, _ in matched], [skill for skill, _ in missing]
+
+    def score(self, cv_text, vacancy, missing_terms_limit=10):
+        """Puntaje de `cv_text` frente a `vacancy` (vacancy_data o un VacancyProfile ya calculado).
+
+        Retorna {score, keyword_coverage, text_match, matched_keywords,
+        missing_keywords, missing_terms, elapsed_ms}.
+        """
+        start = time.perf_counter()
+        profile = vacancy if isinstance(vacancy, VacancyProfile) else self.profile(vacancy)
+        cv_terms = [stem for stem, _ in tokenize(cv_text)]
+        text_match, missing_terms = self._text_match(profile, cv_terms)
+        coverage, matched, missing = self._skill_coverage(profile, cv_text or "")
+        # Un término ya cubierto por una habilidad (p. ej. "english" por "inglés") no falta
+        covered = {stem for skill in matched for stem, _ in tokenize(skill)}
+        missing_terms = [term for term in missing_terms if _stem(term) not in covered]
+        if coverage is None:
+            score = text_match
+        else:
+            score = self.keyword_weight * coverage + (1 - self.keyword_weight) * text_match
+        return {
+            "score": round(score * 100, 1),
+            "keyword_coverage": round(coverage, 3) if coverage is not None else None,
+            "text_match": round(text_match, 3),
+            "matched_keywords": matched,
+            "missing_keywords": missing,
+            "missing_terms": missing_terms[:missing_terms_limit],
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+
+    def compare(self, vacancy_data, cv_text, cv_es, cv_en):
+        """Puntajes del CV original y de las dos versiones optimizadas frente a la misma vacante."""
+        profile = self.profile(vacancy_data)
+        before = self.score(cv_text, profile)
+        after = {"es": self.score(cv_es, profile), "en": self.score(cv_en, profile)}
+        best = max(after.values(), key=lambda report: report["score"])
+        return {"before": before, "after": after, "delta": round(best["score"] - before["score"], 1)}
+
+
+_scorer = None
+_scorer_lock = threading.Lock()
+
+
+def get_ats_scorer():
+    """Scorer compartido del proceso, sin corpus (IDF uniforme)."""
+    global _scorer
+    with _scorer_lock:
+        if _scorer is None:
+            _scorer = ATSScorer()
+        return _scorer
+
+
+def score_cv(cv_text, vacancy_data):
+    return get_ats_scorer().score(cv_text, vacancy_data)
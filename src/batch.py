@@ -0,0 +1,328 @@
+"""Procesamiento por lotes de vacantes de LinkedIn contra uno o varios CVs.
+
+Uso:
+    python src/batch.py --input vacantes.txt --cv data/raw/input_cv.txt [--cv otro_cv.txt]
+    python src/batch.py --input vacantes.txt --cv cv.txt --score-only   # solo puntaje ATS, sin Gemini
+
+`--input` acepta un archivo con una URL por línea o un JSONL con un objeto por
+línea (`{"url": "...", "cv": "ruta/opcional.txt"}`). Las vacantes ya terminadas
+se registran en el checkpoint y se omiten al reanudar una ejecución interrumpida.
+"""
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+import statistics
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from job_cv_optimizer import (
+    init,
+    scrape_linkedin_vacancy,
+    clean_filename,
+    guardar_en_dataframe,
+    set_gemini_rate_limiter,
+)
+from pipeline import StageTimer, optimize_vacancy
+from driver_pool import shutdown_driver_pool
+from rate_limit import TokenBucket
+from vacancy_cache import extract_job_id
+from ats_score import ATSScorer, get_ats_scorer
+import metrics
+
+_URL_RE = re.compile(r"https?://[^\s\"'<>]*linkedin\.com/jobs/[^\s\"'<>]+")
+
+
+def read_batch_input(path):
+    """Lee URLs (una por línea) o JSONL. Retorna una lista de (url, cv_path o None)."""
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if not line.startswith("{"):
+                entries.append((line, None))
+                continue
+            record = json.loads(line)
+            url = record.get("url") or record.get("linkedin_url") or record.get("job_url")
+            if not url:
+                # Registros sin campo de URL (p. ej. solicitudes en texto libre): se busca una URL de LinkedIn
+                match = _URL_RE.search(json.dumps(record, ensure_ascii=False))
+                url = match.group(0) if match else None
+            if url:
+                entries.append((url, record.get("cv")))
+            else:
+                print("Línea sin URL de LinkedIn, se omite:", line[:80])
+    return entries
+
+
+def _item_key(url, cv_text):
+    vacancy_key = extract_job_id(url) or url
+    cv_hash = hashlib.sha256(cv_text.encode("utf-8")).hexdigest()[:16]
+    return f"{vacancy_key}|{cv_hash}"
+
+
+def load_checkpoint(path):
+    """Retorna las claves de los elementos ya completados."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Una línea cortada por una interrupción no invalida el resto
+                continue
+            if record.get("status") == "done":
+                done.add(record["key"])
+    return done
+
+
+class BatchRunner:
+    def __init__(self, output_dir, checkpoint_path, scrape_workers=2, llm_workers=2):
+        self.output_dir = output_dir
+        self.checkpoint_path = checkpoint_path
+        self._scrape_slots = threading.BoundedSemaphore(scrape_workers)
+        self._llm_slots = threading.BoundedSemaphore(llm_workers)
+        self.workers = scrape_workers + llm_workers
+        self._checkpoint_lock = threading.Lock()
+        self._scrape_locks = {}
+        self._scrape_locks_guard = threading.Lock()
+
+    def _scrape(self, url):
+        # Varias filas pueden compartir vacante: solo una la scrapea, el resto usa la caché
+        with self._scrape_locks_guard:
+            lock = self._scrape_locks.setdefault(extract_job_id(url) or url, threading.Lock())
+        with lock, self._scrape_slots:
+            return scrape_linkedin_vacancy(url)
+
+    def _write_checkpoint(self, record):
+        with self._checkpoint_lock:
+            with open(self.checkpoint_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _write_outputs(self, vacancy_data, cv_name, cv_es, cv_en, custom_json):
+        job_title = clean_filename(vacancy_data["Título del puesto"])
+        company_name = clean_filename(vacancy_data["Nombre de la empresa"])
+        filename_base = os.path.join(self.output_dir, f"{job_title}-{company_name}-{clean_filename(cv_name)}")
+        with open(f"{filename_base}_es.txt", "w", encoding="utf-8") as f:
+            f.write(cv_es)
+        with open(f"{filename_base}_en.txt", "w", encoding="utf-8") as f:
+            f.write(cv_en)
+        with open(f"{filename_base}.json", "w", encoding="utf-8") as f:
+            json.dump(custom_json, f, ensure_ascii=False, indent=4)
+        return filename_base
+
+    def _ats_summary(self, vacancy_data, cv_text, cv_es, cv_en):
+        ats = get_ats_scorer().compare(vacancy_data, cv_text, cv_es, cv_en)
+        best = max(ats["after"].values(), key=lambda report: report["score"])
+        return {"before": ats["before"]["score"], "after": best["score"],
+                "missing_keywords": best["missing_keywords"]}
+
+    def process_item(self, key, url, cv_name, cv_text):
+        timer = StageTimer()
+        start = time.perf_counter()
+        try:
+            with timer.stage("scrape"):
+                vacancy_data = self._scrape(url)
+            if vacancy_data is None:
+                raise ValueError("No se pudo extraer información de LinkedIn")
+            outcome = {}
+            with self._llm_slots:
+                cv_es, cv_en, custom_json = optimize_vacancy(vacancy_data, cv_text, timer=timer, outcome=outcome)
+            with timer.stage("persist"):
+                guardar_en_dataframe(custom_json, source_text=vacancy_data["Información del trabajo"],
+                                     fallback=outcome["postprocess_fallback"])
+                output = self._write_outputs(vacancy_data, cv_name, cv_es, cv_en, custom_json)
+            with timer.stage("ats_score"):
+                ats = self._ats_summary(vacancy_data, cv_text, cv_es, cv_en)
+            record = {"key": key, "url": url, "cv": cv_name, "status": "done", "output": output, "ats": ats}
+        except Exception as e:
+            print(f"Error procesando {url} con {cv_name}: {e}")
+            record = {"key": key, "url": url, "cv": cv_name, "status": "failed", "error": str(e)}
+        record["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        record["timings"] = timer.as_dict()
+        self._write_checkpoint(record)
+        return record
+
+    def run(self, items):
+        """Procesa [(key, url, cv_name, cv_text)] y retorna los registros resultantes."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        records = []
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch") as executor:
+            futures = [executor.submit(self.process_item, *item) for item in items]
+            for i, future in enumerate(as_completed(futures), 1):
+                record = future.result()
+                records.append(record)
+                print(f"[{i}/{len(items)}] {record['status']} {record['url']} ({record['latency_ms']} ms)")
+        return records
+
+    def run_scores(self, items):
+        """Puntaje ATS de cada (vacante, CV) sin llamar a Gemini.
+
+        Primero se scrapean todas las vacantes y con ellas se calcula el IDF, así
+        los términos que repiten todas las vacantes del lote pesan menos.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        urls = list(dict.fromkeys(url for _, url, _, _ in items))
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch") as executor:
+            vacancies = dict(zip(urls, executor.map(self._scrape_or_none, urls)))
+        scraped = [vacancy for vacancy in vacancies.values() if vacancy is not None]
+        scorer = ATSScorer.from_corpus(
+            "\n".join(str(vacancy.get(field, "")) for field in ("Información del trabajo", "Requisitos"))
+            for vacancy in scraped)
+        profiles = {url: scorer.profile(vacancy) for url, vacancy in vacancies.items() if vacancy is not None}
+        records = []
+        for key, url, cv_name, cv_text in items:
+            if url not in profiles:
+                record = {"key": key, "url": url, "cv": cv_name, "status": "failed",
+                          "error": "No se pudo extraer información de LinkedIn"}
+            else:
+                report = scorer.score(cv_text, profiles[url])
+                record = {"key": key, "url": url, "cv": cv_name, "status": "done",
+                          "title": vacancies[url]["Título del puesto"],
+                          "company": vacancies[url]["Nombre de la empresa"], "ats": report}
+            self._write_checkpoint(record)
+            records.append(record)
+        return records
+
+    def _scrape_or_none(self, url):
+        try:
+            return self._scrape(url)
+        except Exception as e:
+            print(f"Error extrayendo {url}: {e}")
+            return None
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(records, skipped, wall_seconds):
+    done = [r for r in records if r["status"] == "done"]
+    failed = [r for r in records if r["status"] == "failed"]
+    latencies = [r["latency_ms"] for r in records]
+    print("\n=== Resumen del lote ===")
+    print(f"Procesados: {len(records)}  Completados: {len(done)}  Fallidos: {len(failed)}  "
+          f"Omitidos (checkpoint): {skipped}")
+    print(f"Tiempo total: {wall_seconds:.1f} s  Throughput: {len(records) / wall_seconds * 60 if wall_seconds else 0:.1f} elementos/min")
+    if latencies:
+        print(f"Latencia por elemento (ms): p50={statistics.median(latencies):.0f}  "
+              f"p95={_percentile(latencies, 95):.0f}  máx={max(latencies):.0f}")
+        stages = {}
+        for record in records:
+            for stage, ms in record["timings"].items():
+                stages.setdefault(stage, []).append(ms)
+        for stage, values in stages.items():
+            print(f"  {stage:<18} media={statistics.mean(values):8.0f} ms  p95={_percentile(values, 95):8.0f} ms")
+    fallbacks = metrics.fallback_counts()
+    if fallbacks:
+        print("Respaldos usados en lugar de Gemini:", fallbacks)
+    parsed = metrics.postprocess_report()
+    if parsed["parser"] + parsed["gemini"]:
+        saved = parsed["estimated_saved_ms"]
+        print(f"Postprocesamiento local: {parsed['parser']} de {parsed['parser'] + parsed['gemini']} llamadas a Gemini "
+              f"evitadas ({parsed['avoided_share']:.0%})"
+              + (f", ~{saved / 1000:.1f} s ahorrados" if saved is not None else ""))
+
+
+def summarize_scores(records, limit=20):
+    done = sorted((r for r in records if r["status"] == "done"), key=lambda r: -r["ats"]["score"])
+    print("\n=== Puntaje ATS por vacante y CV ===")
+    for record in done[:limit]:
+        ats = record["ats"]
+        missing = ", ".join(ats["missing_keywords"][:5]) or "-"
+        print(f"{ats['score']:5.1f}  {record['cv']:<16} {record['title']} – {record['company']}  faltan: {missing}")
+    if len(done) > limit:
+        print(f"... y {len(done) - limit} más en el checkpoint")
+    failed = len(records) - len(done)
+    if failed:
+        print(f"Vacantes sin extraer: {failed}")
+    if done:
+        print(f"Puntaje en {statistics.mean(r['ats']['elapsed_ms'] for r in done):.2f} ms por par en promedio")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Optimiza CVs para un lote de vacantes de LinkedIn.")
+    parser.add_argument("--input", required=True, help="Archivo de URLs (una por línea) o JSONL")
+    parser.add_argument("--cv", action="append", default=[], help="Ruta a un CV en texto; se puede repetir")
+    parser.add_argument("--output-dir", default="data/processed/batch")
+    parser.add_argument("--checkpoint", default=None, help="Por defecto <output-dir>/checkpoint.jsonl")
+    parser.add_argument("--scrape-workers", type=int, default=2)
+    parser.add_argument("--llm-workers", type=int, default=2)
+    parser.add_argument("--rpm", type=float, default=15, help="Llamadas por minuto a Gemini")
+    parser.add_argument("--burst", type=int, default=2, help="Ráfaga máxima de llamadas a Gemini")
+    parser.add_argument("--metrics-file", default=None, help="Escribe las métricas en formato Prometheus al terminar")
+    parser.add_argument("--score-only", action="store_true",
+                        help="Solo calcula el puntaje ATS local de cada par, sin optimizar con Gemini")
+    parser.add_argument("--combined", action="store_true",
+                        help="Una sola llamada a Gemini por vacante para el CV y el JSON (GEMINI_COMBINED=1)")
+    args = parser.parse_args(argv)
+    if args.combined:
+        os.environ["GEMINI_COMBINED"] = "1"
+
+    init()
+    entries = read_batch_input(args.input)
+    default_cvs = args.cv or ["data/raw/input_cv.txt"]
+    cv_texts = {}
+
+    def read_cv(path):
+        if path not in cv_texts:
+            with open(path, "r", encoding="utf-8") as f:
+                cv_texts[path] = f.read()
+        return cv_texts[path]
+
+    # El modo de puntaje tiene su propio checkpoint para no marcar como optimizados los pares puntuados
+    default_checkpoint = "scores.jsonl" if args.score_only else "checkpoint.jsonl"
+    checkpoint_path = args.checkpoint or os.path.join(args.output_dir, default_checkpoint)
+    os.makedirs(os.path.dirname(checkpoint_path) or ".", exist_ok=True)
+    completed = load_checkpoint(checkpoint_path)
+
+    items = []
+    skipped = 0
+    seen = set()
+    for url, cv_path in entries:
+        for path in ([cv_path] if cv_path else default_cvs):
+            cv_text = read_cv(path)
+            key = _item_key(url, cv_text)
+            if key in completed:
+                skipped += 1
+                continue
+            if key in seen:
+                continue
+            seen.add(key)
+            cv_name = os.path.splitext(os.path.basename(path))[0]
+            items.append((key, url, cv_name, cv_text))
+
+    print(f"{len(items)} elementos por procesar, {skipped} ya completados en {checkpoint_path}.")
+    if args.score_only:
+        runner = BatchRunner(args.output_dir, checkpoint_path, args.scrape_workers, args.llm_workers)
+        try:
+            records = runner.run_scores(items)
+        finally:
+            shutdown_driver_pool()
+        summarize_scores(records)
+        return 0 if all(r["status"] == "done" for r in records) else 1
+    previous_limiter = set_gemini_rate_limiter(TokenBucket.per_minute(args.rpm, burst=args.burst))
+    runner = BatchRunner(args.output_dir, checkpoint_path, args.scrape_workers, args.llm_workers)
+    start = time.perf_counter()
+    try:
+        records = runner.run(items)
+    finally:
+        set_gemini_rate_limiter(previous_limiter)
+        shutdown_driver_pool()
+    summarize(records, skipped, time.perf_counter() - start)
+    if args.metrics_file:
+        metrics.write_textfile(args.metrics_file)
+        print(f"Métricas escritas en {args.metrics_file}")
+    return 0 if all(r["status"] == "done" for r in records) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
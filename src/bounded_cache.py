@@ -0,0 +1,159 @@
+import os
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# Cada cuántas escrituras se vuelve a sumar el tamaño en disco (otros procesos pueden compartir el archivo)
+RESYNC_WRITES = 1000
+EVICT_BATCH = 64
+
+
+class BoundedTextCache:
+    """Textos por clave: LRU en memoria acotada por bytes y, opcionalmente, SQLite acotado por bytes.
+
+    Las subclases definen la tabla (`table`), la columna del texto
+    (`value_column`) y columnas descriptivas opcionales (`extra_columns`), que
+    `_put` recibe en el mismo orden. Sin `db_path` solo existe el nivel en memoria.
+    El tamaño en disco se lleva en memoria, así escribir no recorre la tabla.
+    """
+
+    table = None
+    value_column = "text"
+    extra_columns = ()
+
+    def __init__(self, db_path=None, memory_max_bytes=16 * 1024 * 1024, disk_max_bytes=256 * 1024 * 1024):
+        self.db_path = db_path
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0,
+                       "memory_evictions": 0, "disk_evictions": 0}
+        self._conn = None
+        self._disk_bytes = 0
+        self._writes_since_sync = 0
+        if db_path:
+            if os.path.dirname(db_path):
+                os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            extra = "".join(f"{column} TEXT NOT NULL,\n" for column in self.extra_columns)
+            self._conn.execute(
+                f"""CREATE TABLE IF NOT EXISTS {self.table} (
+                    key TEXT PRIMARY KEY,
+                    {extra}{self.value_column} TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{self.table}_accessed ON {self.table}(accessed_at)")
+            self._conn.commit()
+            self._sync_disk_bytes()
+
+    def _sync_disk_bytes(self):
+        self._disk_bytes = self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+        self._writes_since_sync = 0
+
+    def _stored_size(self, key):
+        row = self._conn.execute(f"SELECT size FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def _remember(self, key, text):
+        size = len(text.encode("utf-8"))
+        if size > self.memory_max_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key).encode("utf-8"))
+        self._memory[key] = text
+        self._memory_bytes += size
+        while self._memory_bytes > self.memory_max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted.encode("utf-8"))
+            self._stats["memory_evictions"] += 1
+
+    def get(self, key):
+        with self._lock:
+            text = self._memory.get(key)
+            if text is not None:
+                self._memory.move_to_end(key)
+                self._stats["hits"] += 1
+                self._stats["memory_hits"] += 1
+                return text
+            if self._conn is not None:
+                row = self._conn.execute(
+                    f"SELECT {self.value_column} FROM {self.table} WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (time.time(), key))
+                    self._conn.commit()
+                    self._remember(key, row[0])
+                    self._stats["hits"] += 1
+                    self._stats["disk_hits"] += 1
+                    return row[0]
+            self._stats["misses"] += 1
+            return None
+
+    def _put(self, key, text, extra=()):
+        with self._lock:
+            self._remember(key, text)
+            if self._conn is not None:
+                now = time.time()
+                size = len(text.encode("utf-8"))
+                previous = self._stored_size(key)
+                columns = ", ".join(("key",) + tuple(self.extra_columns) + (self.value_column,))
+                self._conn.execute(
+                    f"""INSERT OR REPLACE INTO {self.table} ({columns}, size, created_at, accessed_at)
+                        VALUES ({", ".join("?" * (len(self.extra_columns) + 5))})""",
+                    (key, *extra, text, size, now, now),
+                )
+                self._disk_bytes += size - previous
+                self._writes_since_sync += 1
+                if self._writes_since_sync >= RESYNC_WRITES:
+                    self._sync_disk_bytes()
+                self._evict_disk()
+                self._conn.commit()
+            self._stats["writes"] += 1
+
+    def discard(self, key):
+        with self._lock:
+            text = self._memory.pop(key, None)
+            if text is not None:
+                self._memory_bytes -= len(text.encode("utf-8"))
+            if self._conn is not None:
+                self._disk_bytes -= self._stored_size(key)
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._conn.commit()
+
+    def _evict_disk(self):
+        # Las más antiguas por accessed_at (índice), de a EVICT_BATCH filas
+        while self._disk_bytes > self.disk_max_bytes:
+            rows = self._conn.execute(
+                f"SELECT key, size FROM {self.table} ORDER BY accessed_at ASC LIMIT ?", (EVICT_BATCH,)
+            ).fetchall()
+            if not rows:
+                self._disk_bytes = 0
+                break
+            for key, size in rows:
+                if self._disk_bytes <= self.disk_max_bytes:
+                    break
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._disk_bytes -= size
+                self._stats["disk_evictions"] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["memory_bytes"] = self._memory_bytes
+            if self._conn is not None:
+                entries, size = self._conn.execute(
+                    f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}"
+                ).fetchone()
+                stats["disk_entries"] = entries
+                stats["disk_bytes"] = size
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
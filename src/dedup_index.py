@@ -0,0 +1,255 @@
+"""Índice MinHash/LSH de vacantes casi idénticas (la misma oferta republicada con otro ID).
+
+La "Información del trabajo" normalizada se divide en tejas de SHINGLE_WORDS
+palabras. Su firma MinHash (NUM_PERM mínimos) estima la similitud de Jaccard
+entre dos descripciones. La firma se corta en BANDS bandas; dos vacantes son
+candidatas si coinciden en al menos una banda entera. La búsqueda consulta solo
+los buckets de la vacante nueva (índice de SQLite), no todas las vacantes, y
+verifica los candidatos con la similitud estimada.
+
+Las firmas y los buckets se guardan en las tablas job_minhash y job_lsh de la
+misma base que jobs_store, con el id de fila de la vacante. Se indexa la
+descripción scrapeada (columna source_text), la misma que se consulta al buscar
+una republicación; las filas sin ella no se indexan.
+
+Uso:
+    python src/dedup_index.py sync
+    python src/dedup_index.py check --text descripcion.txt
+"""
+import os
+import re
+import sys
+import zlib
+import sqlite3
+import hashlib
+import argparse
+import threading
+
+import numpy as np
+
+from jobs_store import DEFAULT_DB_PATH, get_jobs_store
+from skill_taxonomy import normalize
+
+NUM_PERM = 128
+BANDS = 16
+SHINGLE_WORDS = 5
+MAX_CANDIDATES = 50
+_SEED = 20240611
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+_WORD = re.compile(r"\w+")
+
+
+def shingles(text):
+    """Hashes de 32 bits de las tejas de palabras del texto normalizado."""
+    words = _WORD.findall(normalize(text or ""))
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+    if len(words) <= SHINGLE_WORDS:
+        grams = {" ".join(words)}
+    else:
+        grams = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    return np.fromiter((zlib.crc32(gram.encode("utf-8")) for gram in grams), dtype=np.uint64, count=len(grams))
+
+
+class MinHasher:
+    """Firmas MinHash con permutaciones (a·x + b) mod p de semilla fija, así son estables entre procesos."""
+
+    def __init__(self, num_perm=NUM_PERM, seed=_SEED):
+        rng = np.random.default_rng(seed)
+        # a < 2^31 y x < 2^32: el producto cabe en 64 bits sin desbordar
+        self.a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+
+    def signature(self, text):
+        """Firma de `text` (uint32 × num_perm), o None si no tiene palabras."""
+        hashes = shingles(text)
+        if not len(hashes):
+            return None
+        permuted = (self.a[:, None] * hashes[None, :] + self.b[:, None]) % _MERSENNE
+        return (permuted & _MAX_HASH).min(axis=1).astype(np.uint32)
+
+
+def band_keys(signature, bands=BANDS):
+    """Una clave entera de 64 bits por banda (incluye el número de banda)."""
+    rows = len(signature) // bands
+    keys = []
+    for band in range(bands):
+        digest = hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(),
+                                 digest_size=8, person=band.to_bytes(2, "big")).digest()
+        keys.append(int.from_bytes(digest, "big", signed=True))
+    return keys
+
+
+def similarity(left, right):
+    """Jaccard estimada: fracción de mínimos que coinciden."""
+    return float(np.count_nonzero(left == right)) / len(left)
+
+
+class NearDuplicateIndex:
+    """Firmas y buckets LSH en SQLite junto al almacén de vacantes."""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, threshold=0.8, hasher=None):
+        self.db_path = db_path
+        self.threshold = threshold
+        self.hasher = hasher or MinHasher()
+        self._local = threading.local()
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._connection().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS job_minhash (
+                job_row_id INTEGER PRIMARY KEY,
+                signature BLOB
+            );
+            CREATE TABLE IF NOT EXISTS job_lsh (
+                bucket INTEGER NOT NULL,
+                job_row_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_job_lsh_bucket ON job_lsh(bucket, job_row_id);
+            CREATE INDEX IF NOT EXISTS idx_job_lsh_job ON job_lsh(job_row_id);
+            """
+        )
+
+    def _connection(self):
+        # Una conexión por hilo; SQLite serializa a los escritores con su propio lock
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _insert(self, conn, job_row_id, text):
+        signature = self.hasher.signature(text)
+        conn.execute("INSERT OR REPLACE INTO job_minhash (job_row_id, signature) VALUES (?, ?)",
+                     (job_row_id, signature.tobytes() if signature is not None else None))
+        conn.execute("DELETE FROM job_lsh WHERE job_row_id = ?", (job_row_id,))
+        if signature is not None:
+            conn.executemany("INSERT INTO job_lsh (bucket, job_row_id) VALUES (?, ?)",
+                             [(key, job_row_id) for key in band_keys(signature)])
+
+    def add(self, job_row_id, text):
+        """Indexa la descripción de la vacante con ese id de fila en jobs_store."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._insert(conn, job_row_id, text)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def sync(self):
+        """Indexa las vacantes del almacén que aún no tienen firma. Retorna cuántas.
+
+        Solo las que guardaron su descripción scrapeada y no son de respaldo. Las
+        firmas de filas sin descripción (versiones anteriores las calculaban del
+        resumen de Gemini, que nunca coincide con una descripción scrapeada) se borran.
+        """
+        conn = self._connection()
+        rows = conn.execute(
+            """SELECT j.id, j.source_text FROM jobs j LEFT JOIN job_minhash m ON m.job_row_id = j.id
+               WHERE m.job_row_id IS NULL AND j.fallback = 0 AND j.source_text IS NOT NULL ORDER BY j.id"""
+        ).fetchall()
+        stale = [row[0] for row in conn.execute(
+            "SELECT m.job_row_id FROM job_minhash m JOIN jobs j ON j.id = m.job_row_id WHERE j.source_text IS NULL"
+        )]
+        if not rows and not stale:
+            return 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for job_row_id in stale:
+                conn.execute("DELETE FROM job_minhash WHERE job_row_id = ?", (job_row_id,))
+                conn.execute("DELETE FROM job_lsh WHERE job_row_id = ?", (job_row_id,))
+            for job_row_id, text in rows:
+                self._insert(conn, job_row_id, text)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if stale:
+            print(f"Índice de duplicados: {len(stale)} firmas sin descripción scrapeada eliminadas.")
+        print(f"Índice de duplicados: {len(rows)} vacantes indexadas en {self.db_path}.")
+        return len(rows)
+
+    def find(self, text, threshold=None, exclude=()):
+        """Vacantes casi idénticas a `text`: [(job_row_id, similitud)] de mayor a menor."""
+        threshold = self.threshold if threshold is None else threshold
+        signature = self.hasher.signature(text)
+        if signature is None:
+            return []
+        keys = band_keys(signature)
+        conn = self._connection()
+        candidates = conn.execute(
+            f"""SELECT job_row_id FROM job_lsh WHERE bucket IN ({", ".join("?" * len(keys))})
+                GROUP BY job_row_id ORDER BY COUNT(*) DESC, job_row_id DESC LIMIT ?""",
+            keys + [MAX_CANDIDATES],
+        ).fetchall()
+        candidates = [row[0] for row in candidates if row[0] not in exclude]
+        if not candidates:
+            return []
+        rows = conn.execute(
+            f"SELECT job_row_id, signature FROM job_minhash WHERE job_row_id IN ({', '.join('?' * len(candidates))})",
+            candidates,
+        ).fetchall()
+        matches = []
+        for job_row_id, blob in rows:
+            score = similarity(signature, np.frombuffer(blob, dtype=np.uint32))
+            if score >= threshold:
+                matches.append((job_row_id, round(score, 3)))
+        matches.sort(key=lambda match: (-match[1], -match[0]))
+        return matches
+
+    def count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM job_minhash").fetchone()[0]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_duplicate_index():
+    """Índice compartido sobre la base de jobs_store; en el primer uso indexa las vacantes existentes."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            store = get_jobs_store()
+            _index = NearDuplicateIndex(store.db_path, threshold=float(os.getenv("DEDUP_THRESHOLD", "0.8")))
+            _index.sync()
+        return _index
+
+
+def dedup_enabled():
+    return os.getenv("DEDUP_ENABLED", "1").lower() not in ("0", "false", "no")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Índice de vacantes casi idénticas.")
+    parser.add_argument("command", choices=["sync", "check"])
+    parser.add_argument("--text", help="Archivo con la descripción a buscar (check)")
+    parser.add_argument("--threshold", type=float, default=None)
+    args = parser.parse_args(argv)
+
+    index = get_duplicate_index()
+    if args.command == "sync":
+        print(f"{index.count()} vacantes en el índice.")
+        return 0
+    if not args.text:
+        parser.error("check requiere --text")
+    with open(args.text, "r", encoding="utf-8") as f:
+        matches = index.find(f.read(), threshold=args.threshold)
+    store = get_jobs_store()
+    for job_row_id, score in matches:
+        record = store.get(job_row_id) or {}
+        print(f"{score:.3f}  #{job_row_id}  {record.get('Título___del___puesto')} – "
+              f"{record.get('Nombre___de___la___empresa')}  {record.get('Enlace___de___la___vacante')}")
+    if not matches:
+        print("Sin vacantes casi idénticas.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+import os
+import queue
+import threading
+import time
+import atexit
+from contextlib import contextmanager
+
+# Selenium y webdriver_manager se importan al crear el primer navegador
+from metrics import STAGE_SECONDS, span
+
+
+class PoolTimeoutError(Exception):
+    """No hubo un navegador libre dentro del tiempo de espera."""
+
+
+class _PooledDriver:
+    """Envuelve un driver de Chrome con sus contadores de uso."""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        self.created_at = time.time()
+
+
+class ChromeDriverPool:
+    """Pool de sesiones headless de Chrome reutilizables entre peticiones."""
+
+    def __init__(self, size=2, max_pages=50, checkout_timeout=60):
+        self.size = max(1, size)
+        self.max_pages = max_pages
+        self.checkout_timeout = checkout_timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._live = 0
+        self._closed = False
+        self._driver_path = None
+        self._stats = {
+            "checkouts": 0,
+            "created": 0,
+            "recycled": 0,
+            "crashed": 0,
+            "timeouts": 0,
+            "wait_total_ms": 0.0,
+            "wait_max_ms": 0.0,
+            "checkout_total_ms": 0.0,
+            "checkout_max_ms": 0.0,
+        }
+
+    def _chrome_options(self):
+        from selenium.webdriver.chrome.options import Options
+
+        chrome_options = Options()
+        chrome_options.add_argument("--headless")
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        return chrome_options
+
+    def _new_driver(self):
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service as ChromeService
+        from webdriver_manager.chrome import ChromeDriverManager
+
+        # ChromeDriverManager().install() solo se ejecuta una vez por pool
+        with span("chrome_start"):
+            if self._driver_path is None:
+                self._driver_path = ChromeDriverManager().install()
+            driver = webdriver.Chrome(service=ChromeService(self._driver_path), options=self._chrome_options())
+        with self._lock:
+            self._stats["created"] += 1
+        return _PooledDriver(driver)
+
+    def _quit(self, pooled):
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            print("Error cerrando el navegador del pool:", e)
+        with self._lock:
+            self._live -= 1
+
+    def _is_healthy(self, pooled):
+        try:
+            pooled.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def _reset(self, pooled):
+        """Limpia cookies y almacenamiento para que la siguiente petición empiece limpia."""
+        from selenium.common.exceptions import WebDriverException
+
+        driver = pooled.driver
+        driver.delete_all_cookies()
+        try:
+            driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+        except WebDriverException:
+            # about:blank y algunas páginas de error no exponen storage
+            pass
+        driver.get("about:blank")
+
+    def warm_up(self, count=None):
+        """Arranca navegadores por adelantado para evitar el arranque en frío."""
+        count = self.size if count is None else min(count, self.size)
+        started = 0
+        while True:
+            with self._lock:
+                if self._closed or self._live >= count:
+                    break
+                self._live += 1
+            try:
+                self._idle.put(self._new_driver())
+                started += 1
+            except Exception as e:
+                with self._lock:
+                    self._live -= 1
+                print("Error iniciando navegador durante el warm-up:", e)
+                break
+        print(f"Pool de Chrome listo: {started} navegadores iniciados.")
+        return started
+
+    def _acquire(self):
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            if self._closed:
+                raise PoolTimeoutError("El pool de navegadores está cerrado")
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                pooled = None
+                with self._lock:
+                    can_create = self._live < self.size
+                    if can_create:
+                        self._live += 1
+                if can_create:
+                    try:
+                        return self._new_driver()
+                    except Exception:
+                        with self._lock:
+                            self._live -= 1
+                        raise
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    with self._lock:
+                        self._stats["timeouts"] += 1
+                    raise PoolTimeoutError(f"Sin navegadores libres tras {self.checkout_timeout}s")
+                try:
+                    pooled = self._idle.get(timeout=min(remaining, 0.5))
+                except queue.Empty:
+                    continue
+            # Chequeo de salud: un navegador caído se reemplaza en el acto
+            if self._is_healthy(pooled):
+                return pooled
+            with self._lock:
+                self._stats["crashed"] += 1
+            self._quit(pooled)
+
+    def _release(self, pooled, broken=False):
+        if broken or self._closed:
+            if broken:
+                with self._lock:
+                    self._stats["crashed"] += 1
+            self._quit(pooled)
+            return
+        if self.max_pages and pooled.pages >= self.max_pages:
+            with self._lock:
+                self._stats["recycled"] += 1
+            self._quit(pooled)
+            return
+        try:
+            self._reset(pooled)
+        except Exception as e:
+            print("Error limpiando el navegador, se descarta:", e)
+            with self._lock:
+                self._stats["crashed"] += 1
+            self._quit(pooled)
+            return
+        self._idle.put(pooled)
+
+    @contextmanager
+    def driver(self):
+        """Presta un driver del pool y lo devuelve limpio al terminar."""
+        # Import local: importar el pool no debe cargar Selenium
+        from selenium.common.exceptions import TimeoutException, WebDriverException
+
+        wait_start = time.perf_counter()
+        pooled = self._acquire()
+        wait_ms = (time.perf_counter() - wait_start) * 1000
+        STAGE_SECONDS.observe(wait_ms / 1000, stage="chrome_checkout")
+        held_start = time.perf_counter()
+        broken = False
+        try:
+            pooled.pages += 1
+            yield pooled.driver
+        except TimeoutException:
+            # Una página lenta no implica que el navegador esté roto
+            raise
+        except WebDriverException:
+            broken = True
+            raise
+        finally:
+            held_ms = (time.perf_counter() - held_start) * 1000
+            with self._lock:
+                self._stats["checkouts"] += 1
+                self._stats["wait_total_ms"] += wait_ms
+                self._stats["wait_max_ms"] = max(self._stats["wait_max_ms"], wait_ms)
+                self._stats["checkout_total_ms"] += held_ms
+                self._stats["checkout_max_ms"] = max(self._stats["checkout_max_ms"], held_ms)
+            self._release(pooled, broken=broken)
+
+    def stats(self):
+        """Devuelve contadores y tiempos de espera/préstamo del pool."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = self.size
+            stats["live"] = self._live
+        stats["idle"] = self._idle.qsize()
+        checkouts = stats["checkouts"] or 1
+        stats["wait_avg_ms"] = stats["wait_total_ms"] / checkouts
+        stats["checkout_avg_ms"] = stats["checkout_total_ms"] / checkouts
+        return stats
+
+    def shutdown(self):
+        """Cierra todos los navegadores inactivos del pool."""
+        self._closed = True
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._quit(pooled)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_driver_pool():
+    """Devuelve el pool compartido del proceso, configurado por variables de entorno."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ChromeDriverPool(
+                size=int(os.getenv("CHROME_POOL_SIZE", "2")),
+                max_pages=int(os.getenv("CHROME_POOL_MAX_PAGES", "50")),
+                checkout_timeout=float(os.getenv("CHROME_POOL_TIMEOUT", "60")),
+            )
+            atexit.register(_pool.shutdown)
+        return _pool
+
+
+def shutdown_driver_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
@@ -0,0 +1,53 @@
+import os
+import hashlib
+import threading
+
+from bounded_cache import BoundedTextCache
+
+# Cambiar al modificar cualquier extractor para invalidar los textos ya cacheados
+EXTRACTOR_VERSION = "extract-v1"
+
+
+def hash_stream(stream, chunk_size=1024 * 1024):
+    """SHA-256 del contenido de un stream, leído por bloques; deja el stream al inicio."""
+    digest = hashlib.sha256()
+    stream.seek(0)
+    for block in iter(lambda: stream.read(chunk_size), b""):
+        digest.update(block)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def make_extraction_key(content_hash, extension, extractor_version):
+    """Clave de la caché: hash del archivo subido + extensión + versión del extractor."""
+    return hashlib.sha256(f"{content_hash}\x00{extension}\x00{extractor_version}".encode("utf-8")).hexdigest()
+
+
+class ExtractionCache(BoundedTextCache):
+    """Textos extraídos de archivos subidos: LRU en memoria acotada por bytes y, opcionalmente, SQLite."""
+
+    table = "extractions"
+    value_column = "text"
+
+    def __init__(self, db_path=None, memory_max_bytes=32 * 1024 * 1024, disk_max_bytes=128 * 1024 * 1024):
+        super().__init__(db_path, memory_max_bytes, disk_max_bytes)
+
+    def put(self, key, text):
+        self._put(key, text)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_extraction_cache():
+    """Caché compartida del proceso. El nivel en disco solo se activa con EXTRACTION_CACHE_PATH."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ExtractionCache(
+                db_path=os.getenv("EXTRACTION_CACHE_PATH") or None,
+                memory_max_bytes=int(os.getenv("EXTRACTION_CACHE_MEMORY_BYTES", str(32 * 1024 * 1024))),
+                disk_max_bytes=int(os.getenv("EXTRACTION_CACHE_DISK_BYTES", str(128 * 1024 * 1024))),
+            )
+        return _cache
@@ -0,0 +1,149 @@
+"""Backend de Gemini falso para benchmarks y desarrollo sin red.
+
+Imita la parte de google.generativeai que usa el proyecto:
+`GenerativeModel(nombre).generate_content(prompt, stream=False, generation_config=None)`
+con respuestas que tienen `.text`; con un `response_schema` responde JSON.
+Se activa con `GEMINI_BACKEND=fake` o con
+`gemini_client.set_model_factory(FakeGemini(...))`.
+"""
+import os
+import json
+import time
+import random
+import threading
+
+FILLER = ("Lideré proyectos de análisis de datos con Python, SQL y Power BI, "
+          "automatizando reportes y mejorando la toma de decisiones. ")
+
+
+class FakeGeminiError(Exception):
+    """Error simulado con código HTTP, como las excepciones de google.api_core."""
+
+    def __init__(self, message, code=429):
+        super().__init__(message)
+        self.code = code
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGeminiModel:
+    def __init__(self, backend, model_name):
+        self.backend = backend
+        self.model_name = model_name
+
+    def generate_content(self, prompt, stream=False, request_options=None, generation_config=None):
+        timeout = (request_options or {}).get("timeout")
+        text = self.backend.respond(prompt, generation_config)
+        if not stream:
+            self.backend.wait(self.backend.latency_ms, timeout)
+            return _Response(text)
+        return self._stream(text, timeout)
+
+    def _stream(self, text, timeout):
+        backend = self.backend
+        backend.wait(backend.ttft_ms, timeout)
+        step = max(1, backend.chunk_chars)
+        chunks = [text[i:i + step] for i in range(0, len(text), step)]
+        per_chunk_ms = max(0.0, backend.latency_ms - backend.ttft_ms) / max(1, len(chunks))
+        for i, chunk in enumerate(chunks):
+            if i:
+                backend.wait(per_chunk_ms)
+            yield _Response(chunk)
+
+
+class FakeGemini:
+    """Fábrica de modelos falsos con latencia y tamaño de respuesta configurables.
+
+    `latency_ms` es la duración total de cada llamada (más `jitter_ms` aleatorio),
+    `ttft_ms` el tiempo al primer fragmento en streaming y `response_chars` el
+    largo aproximado de cada versión del CV. `failure_rate` hace fallar esa
+    fracción de llamadas y `fail_first` las primeras N, con el código HTTP
+    `failure_code` (429 por defecto), para probar reintentos y respaldos. Si la
+    latencia supera el timeout de la petición se lanza TimeoutError.
+    """
+
+    def __init__(self, latency_ms=800, jitter_ms=0, ttft_ms=None, response_chars=3000,
+                 chunk_chars=200, failure_rate=0.0, fail_first=0, failure_code=429, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.ttft_ms = latency_ms / 4 if ttft_ms is None else ttft_ms
+        self.response_chars = response_chars
+        self.chunk_chars = chunk_chars
+        self.failure_rate = failure_rate
+        self.fail_first = fail_first
+        self.failure_code = failure_code
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            latency_ms=float(os.getenv("FAKE_GEMINI_LATENCY_MS", "800")),
+            jitter_ms=float(os.getenv("FAKE_GEMINI_JITTER_MS", "0")),
+            response_chars=int(os.getenv("FAKE_GEMINI_RESPONSE_CHARS", "3000")),
+            failure_rate=float(os.getenv("FAKE_GEMINI_FAILURE_RATE", "0")),
+            fail_first=int(os.getenv("FAKE_GEMINI_FAIL_FIRST", "0")),
+            failure_code=int(os.getenv("FAKE_GEMINI_FAILURE_CODE", "429")),
+        )
+
+    def __call__(self, model_name):
+        return FakeGeminiModel(self, model_name)
+
+    def wait(self, ms, timeout=None):
+        with self._lock:
+            jitter = self._random.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+        seconds = (ms + jitter) / 1000
+        if timeout is not None and seconds > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("Timeout simulado del backend falso de Gemini")
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def respond(self, prompt, generation_config=None):
+        with self._lock:
+            self.calls += 1
+            fail = self.calls <= self.fail_first or (self.failure_rate and self._random.random() < self.failure_rate)
+        if fail:
+            raise FakeGeminiError("Fallo simulado del backend falso de Gemini", code=self.failure_code)
+        if (generation_config or {}).get("response_schema"):
+            return self._combined_json(prompt)
+        if "Optimized Resume for" in prompt:
+            return self._optimized_cv(prompt)
+        return self._postprocess_json()
+
+    def _body(self):
+        return (FILLER * (self.response_chars // len(FILLER) + 1))[:self.response_chars]
+
+    def _optimized_cv(self, prompt):
+        title = _prompt_value(prompt, "Título del puesto:")
+        company = _prompt_value(prompt, "Nombre de la empresa:")
+        return (f"Hoja de Vida Optimizada para {title} – {company} – Versión en Español\n\n{self._body()}\n\n"
+                f"Optimized Resume for {title} – {company} – English Version\n\n{self._body()}")
+
+    def _postprocess_fields(self):
+        return {
+            "Información___del___trabajo": self._body()[:1200],
+            "Responsabilidades": ["Analizar datos", "Construir reportes", "Comunicar hallazgos"],
+            "Requisitos": ["Python", "SQL", "Inglés avanzado"],
+            "Beneficios": None,
+        }
+
+    def _postprocess_json(self):
+        return "```json\n" + json.dumps(self._postprocess_fields(), ensure_ascii=False) + "\n```"
+
+    def _combined_json(self, prompt):
+        # Modo JSON con esquema: un solo objeto con la vacante estructurada y las dos versiones del CV
+        es, en = self._optimized_cv(prompt).split("\n\nOptimized Resume for ")
+        return json.dumps(dict(self._postprocess_fields(), cv_es=es, cv_en="Optimized Resume for " + en),
+                          ensure_ascii=False)
+
+
+def _prompt_value(prompt, label):
+    for line in prompt.splitlines():
+        if line.startswith(label):
+            return line[len(label):].strip()
+    return "NA"
@@ -1,20 +1,31 @@
+import io
 import os
+import uuid
+import tempfile
+from contextlib import contextmanager
+
 import docx
-import PyPDF2
 from werkzeug.utils import secure_filename
 
+import pdf_extraction
+from pdf_extraction import extract_pdf_text
+from metrics import span
+from extraction_cache import EXTRACTOR_VERSION, get_extraction_cache, hash_stream, make_extraction_key
+
 class FileProcessor:
     ALLOWED_EXTENSIONS = {'txt', 'pdf', 'doc', 'docx'}
+    # Por encima de este tamaño werkzeug escribe la subida en un archivo temporal con nombre
+    IN_MEMORY_LIMIT = int(os.getenv('UPLOAD_IN_MEMORY_LIMIT', str(8 * 1024 * 1024)))
 
     @staticmethod
     def allowed_file(filename):
         return '.' in filename and filename.rsplit('.', 1)[1].lower() in FileProcessor.ALLOWED_EXTENSIONS
 
     @staticmethod
-    def extract_text_from_docx(file_path):
-        """Extrae texto de un archivo DOCX."""
+    def extract_text_from_docx(source):
+        """Extrae texto de un DOCX. `source` puede ser una ruta o un objeto tipo archivo."""
         try:
-            doc = docx.Document(file_path)
+            doc = docx.Document(source)
             full_text = []
             for para in doc.paragraphs:
                 if para.text.strip():  # Solo añade párrafos no vacíos
@@ -25,35 +36,57 @@ class FileProcessor:
             return None
 
     @staticmethod
-    def extract_text_from_pdf(file_path):
-        """Extrae texto de un archivo PDF."""
+    def extract_text_from_pdf(source, outcome=None):
+        """Extrae texto de un PDF. `source` puede ser una ruta o un objeto tipo archivo.
+
+        Los PDFs largos se reparten por páginas en un pool de procesos, con los
+        límites de páginas y tiempo de pdf_extraction.
+        """
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = []
-                for page in pdf_reader.pages:
-                    text.append(page.extract_text())
-                return '\n'.join(text)
+            return extract_pdf_text(source, outcome=outcome)
         except Exception as e:
             print(f"Error procesando archivo PDF: {e}")
             return None
 
+    @staticmethod
+    def extract_text_from_txt(source):
+        """Extrae texto de un TXT en UTF-8. `source` puede ser una ruta o un objeto tipo archivo."""
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, 'r', encoding='utf-8') as f:
+                return f.read()
+        return source.read().decode('utf-8')
+
     @staticmethod
     def get_file_extension(filename):
         """Obtiene la extensión del archivo."""
         return filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
 
+    @staticmethod
+    def upload_stream_factory(total_content_length, content_type, filename, content_length=None):
+        """Destino de una subida mientras werkzeug la recibe (Request._get_file_stream).
+
+        Las pequeñas quedan en memoria; las mayores que IN_MEMORY_LIMIT van a un
+        archivo temporal con nombre en temp_uploads, que open_upload entrega por
+        ruta sin copiarlo. Se borra al cerrarse la petición.
+        """
+        if total_content_length is not None and total_content_length <= FileProcessor.IN_MEMORY_LIMIT:
+            return io.BytesIO()
+        temp_dir = os.path.join(os.getcwd(), 'temp_uploads')
+        os.makedirs(temp_dir, exist_ok=True)
+        return tempfile.NamedTemporaryFile('wb+', dir=temp_dir, prefix='upload_')
+
+    @staticmethod
+    def _temp_path(filename):
+        """Ruta única en temp_uploads para que dos subidas con el mismo nombre no colisionen."""
+        temp_dir = os.path.join(os.getcwd(), 'temp_uploads')
+        os.makedirs(temp_dir, exist_ok=True)
+        return os.path.join(temp_dir, f"{uuid.uuid4().hex}_{secure_filename(filename)}")
+
     @staticmethod
     def save_temp_file(file):
-        """Guarda un archivo temporal y retorna su ruta."""
+        """Guarda un archivo temporal con nombre único y retorna su ruta."""
         try:
-            # Crear directorio temporal si no existe
-            temp_dir = os.path.join(os.getcwd(), 'temp_uploads')
-            os.makedirs(temp_dir, exist_ok=True)
-            
-            # Guardar archivo
-            filename = secure_filename(file.filename)
-            temp_path = os.path.join(temp_dir, filename)
+            temp_path = FileProcessor._temp_path(file.filename)
             file.save(temp_path)
             return temp_path
         except Exception as e:
@@ -61,41 +94,98 @@ class FileProcessor:
             return None
 
     @staticmethod
-    def process_file(file):
-        """Procesa un archivo y extrae su texto."""
-        try:
-            if not file or not FileProcessor.allowed_file(file.filename):
-                raise ValueError("Tipo de archivo no permitido")
+    def _stream_path(stream):
+        """Ruta del archivo detrás del stream, o None si vive en memoria o no tiene nombre."""
+        name = getattr(stream, 'name', None)
+        return name if isinstance(name, str) and os.path.isfile(name) else None
 
-            # Guardar archivo temporalmente
+    @staticmethod
+    @contextmanager
+    def open_upload(file):
+        """Entrega el contenido de la subida como stream o, si ya está en un archivo con nombre, como su ruta.
+
+        Nunca se copia la subida: una grande ya la escribió werkzeug en disco
+        (upload_stream_factory) y se lee desde ese mismo archivo.
+        """
+        stream = getattr(file, 'stream', None)
+        if stream is None:
+            # Objetos que solo saben guardarse en disco
             temp_path = FileProcessor.save_temp_file(file)
             if not temp_path:
                 raise ValueError("Error al guardar archivo temporal")
-
             try:
-                # Obtener extensión del archivo
-                extension = FileProcessor.get_file_extension(file.filename)
-                
-                # Procesar según el tipo de archivo
-                if extension == 'txt':
-                    with open(temp_path, 'r', encoding='utf-8') as f:
-                        text = f.read()
-                elif extension == 'pdf':
-                    text = FileProcessor.extract_text_from_pdf(temp_path)
-                elif extension in ['doc', 'docx']:
-                    text = FileProcessor.extract_text_from_docx(temp_path)
-                else:
-                    raise ValueError(f"Formato de archivo no soportado: {extension}")
-
-                if text is None:
-                    raise ValueError("No se pudo extraer texto del archivo")
-
-                return text.strip()
-
+                yield temp_path
             finally:
-                # Limpiar archivo temporal
                 if os.path.exists(temp_path):
                     os.remove(temp_path)
+            return
+
+        stream.seek(0)
+        path = FileProcessor._stream_path(stream)
+        if path is None:
+            yield stream
+            return
+        # Los workers de PDF abren la ruta por su cuenta: lo escrito debe estar en disco
+        stream.flush()
+        yield path
+
+    @staticmethod
+    def extract_text(source, extension, outcome=None):
+        """Extrae el texto de una ruta o stream según la extensión."""
+        if extension == 'txt':
+            return FileProcessor.extract_text_from_txt(source)
+        if extension == 'pdf':
+            return FileProcessor.extract_text_from_pdf(source, outcome)
+        if extension in ['doc', 'docx']:
+            return FileProcessor.extract_text_from_docx(source)
+        raise ValueError(f"Formato de archivo no soportado: {extension}")
+
+    @staticmethod
+    def _cache_key(file, extension):
+        """Clave por contenido de la subida, o None si el objeto no expone su stream."""
+        stream = getattr(file, 'stream', None)
+        if stream is None:
+            return None
+        version = EXTRACTOR_VERSION
+        if extension == 'pdf':
+            # El texto de un PDF depende del límite de páginas configurado
+            version = f"{version}:pdf-pages={pdf_extraction.MAX_PAGES}"
+        return make_extraction_key(hash_stream(stream), extension, version)
+
+    @staticmethod
+    def process_file(file, use_cache=True, outcome=None):
+        """Procesa un archivo y extrae su texto.
+
+        El texto se reutiliza si ya se extrajo antes un archivo con el mismo contenido.
+        Si se pasa `outcome` (dict), en un PDF se completa con `pages`, `read_pages`,
+        `truncated` y `timed_out` (ver pdf_extraction.iter_pdf_pages).
+        """
+        try:
+            if not file or not FileProcessor.allowed_file(file.filename):
+                raise ValueError("Tipo de archivo no permitido")
+
+            # Obtener extensión del archivo
+            extension = FileProcessor.get_file_extension(file.filename)
+
+            cache_key = FileProcessor._cache_key(file, extension) if use_cache else None
+            if cache_key is not None:
+                cached = get_extraction_cache().get(cache_key)
+                if cached is not None:
+                    return cached
+
+            outcome = {} if outcome is None else outcome
+            with span(f"extract_{extension}"), FileProcessor.open_upload(file) as source:
+                text = FileProcessor.extract_text(source, extension, outcome)
+
+            if text is None:
+                raise ValueError("No se pudo extraer texto del archivo")
+
+            text = text.strip()
+            # Un PDF cortado por el límite de tiempo no se cachea: el próximo intento puede completarlo.
+            # Tampoco uno cortado por PDF_MAX_PAGES, para que cada subida vuelva a informar el recorte.
+            if cache_key is not None and not outcome.get("timed_out") and not outcome.get("truncated"):
+                get_extraction_cache().put(cache_key, text)
+            return text
 
         except Exception as e:
-            raise Exception(f"Error procesando archivo: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Error procesando archivo: {str(e)}")
@@ -0,0 +1,244 @@
+"""Acceso a Gemini: google.generativeai se importa y configura en el primer uso, no al importar.
+
+El backend es intercambiable: `set_model_factory` o `GEMINI_BACKEND=fake`
+sustituyen a la API real (ver fake_gemini). Todas las llamadas pasan por
+GeminiClient, que aplica el límite de cuota, los reintentos con backoff y el
+circuit breaker.
+"""
+import os
+import time
+import random
+import threading
+
+from rate_limit import TokenBucket, CircuitBreaker, CircuitOpenError
+from metrics import GEMINI_REQUESTS, GEMINI_RETRIES, GEMINI_CIRCUIT_OPENED
+
+_genai = None
+_genai_lock = threading.Lock()
+_model_factory = None
+
+
+def set_model_factory(factory):
+    """Instala `factory(model_name)` en lugar de genai.GenerativeModel. None vuelve a la API real."""
+    global _model_factory
+    _model_factory = factory
+
+
+def init_gemini(api_key=None):
+    """Importa y configura google.generativeai una sola vez por proceso. Retorna el módulo."""
+    global _genai
+    with _genai_lock:
+        if _genai is None:
+            api_key = api_key or os.getenv("GEMINI_API_KEY")
+            if not api_key:
+                # Procesos que no pasaron por job_cv_optimizer.init() (p. ej. un worker WSGI)
+                from dotenv import load_dotenv
+                load_dotenv()
+                api_key = os.getenv("GEMINI_API_KEY")
+            if not api_key:
+                raise RuntimeError("GEMINI_API_KEY no está definida (variable de entorno o .env)")
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+            _genai = genai
+        return _genai
+
+
+def warm_up_gemini():
+    """Importa y configura la API real por adelantado, salvo que haya un backend sustituto."""
+    if _model_factory is None and os.getenv("GEMINI_BACKEND") != "fake":
+        init_gemini()
+
+
+def get_model(model_name):
+    global _model_factory
+    if _model_factory is None and os.getenv("GEMINI_BACKEND") == "fake":
+        from fake_gemini import FakeGemini
+        _model_factory = FakeGemini.from_env()
+    if _model_factory is not None:
+        return _model_factory(model_name)
+    return init_gemini().GenerativeModel(model_name)
+
+
+# Errores transitorios: cuota agotada, sobrecarga o fallos del servidor
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {"ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+                    "DeadlineExceeded", "GatewayTimeout", "BadGateway"}
+
+
+class GeminiDeadlineError(TimeoutError):
+    """No queda tiempo dentro del plazo de la llamada para otro intento."""
+
+
+def retry_reason(exc):
+    """Motivo corto si el error es transitorio, o None si reintentar no tiene sentido."""
+    code = getattr(exc, "code", None)
+    if isinstance(code, int) and code in RETRYABLE_STATUS:
+        return str(int(code))
+    if type(exc).__name__ in RETRYABLE_ERRORS:
+        return type(exc).__name__
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return "timeout" if isinstance(exc, TimeoutError) else "connection"
+    return None
+
+
+class GeminiClient:
+    """Cliente compartido para Gemini con límite de cuota, reintentos y circuit breaker.
+
+    Cada llamada tiene un plazo (`deadline` segundos): la espera por cuota, los
+    reintentos y el timeout de la petición se descuentan de él, y no se programa
+    un reintento que terminaría después del plazo. El backoff es exponencial con
+    jitter completo.
+    """
+
+    def __init__(self, rate_limiter=None, breaker=None, max_attempts=4, base_delay=0.5, max_delay=8.0,
+                 deadline=60.0):
+        self.rate_limiter = rate_limiter
+        self.breaker = breaker or CircuitBreaker()
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self._random = random.Random()
+
+    def _backoff(self, attempt):
+        return self._random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def _record_failure(self):
+        opened_before = self.breaker.opened_count
+        self.breaker.record_failure()
+        if self.breaker.opened_count != opened_before:
+            GEMINI_CIRCUIT_OPENED.inc()
+
+    def _reject(self, stage):
+        GEMINI_REQUESTS.inc(stage=stage, outcome="rejected")
+        raise CircuitOpenError(
+            f"Gemini no disponible (circuito abierto, reintento en {self.breaker.retry_after():.0f}s)")
+
+    def _before_attempt(self, stage, deadline_at):
+        """Espera cuota y permiso del circuito. Retorna el timeout para la petición."""
+        # Con el circuito abierto no tiene sentido esperar cuota
+        if self.breaker.state == CircuitBreaker.OPEN:
+            self._reject(stage)
+        remaining = deadline_at - time.monotonic()
+        if self.rate_limiter is not None and not self.rate_limiter.acquire(timeout=max(0.0, remaining)):
+            GEMINI_REQUESTS.inc(stage=stage, outcome="failed")
+            raise GeminiDeadlineError("Se agotó el plazo esperando cuota para llamar a Gemini")
+        if not self.breaker.allow():
+            self._reject(stage)
+        return max(0.1, deadline_at - time.monotonic())
+
+    def _after_failure(self, exc, stage, attempt, deadline_at):
+        """Decide si reintentar: duerme el backoff o relanza la excepción."""
+        reason = retry_reason(exc)
+        if reason is None:
+            # El servicio respondió (p. ej. petición inválida): no cuenta para el circuito
+            self.breaker.record_success()
+            GEMINI_REQUESTS.inc(stage=stage, outcome="failed")
+            raise exc
+        self._record_failure()
+        delay = self._backoff(attempt)
+        if (attempt >= self.max_attempts or time.monotonic() + delay >= deadline_at
+                or self.breaker.state == CircuitBreaker.OPEN):
+            GEMINI_REQUESTS.inc(stage=stage, outcome="failed")
+            raise exc
+        GEMINI_RETRIES.inc(stage=stage, reason=reason)
+        print(f"Gemini falló ({reason}), reintento {attempt}/{self.max_attempts - 1} en {delay:.1f}s")
+        time.sleep(delay)
+
+    def generate(self, prompt, model_name, stage="gemini", deadline=None, generation_config=None):
+        """Retorna el texto de la respuesta, reintentando los errores transitorios.
+
+        `generation_config` se pasa tal cual a generate_content (p. ej. un esquema de respuesta JSON).
+        """
+        deadline_at = time.monotonic() + (deadline or self.deadline)
+        options = {"generation_config": generation_config} if generation_config else {}
+        attempt = 0
+        while True:
+            attempt += 1
+            timeout = self._before_attempt(stage, deadline_at)
+            try:
+                response = get_model(model_name).generate_content(
+                    prompt, request_options={"timeout": timeout}, **options)
+                text = response.text
+            except Exception as exc:
+                self._after_failure(exc, stage, attempt, deadline_at)
+                continue
+            self.breaker.record_success()
+            GEMINI_REQUESTS.inc(stage=stage, outcome="ok" if attempt == 1 else "recovered")
+            return text
+
+    def stream(self, prompt, model_name, stage="gemini", deadline=None):
+        """Genera los fragmentos de texto. Solo se reintenta antes del primer fragmento.
+
+        Si el consumidor abandona el generador (un rerun de Streamlit, un cliente
+        que se desconecta), el intento en curso igual se registra en el circuito:
+        como éxito si ya llegó algún fragmento y como fallo si no. Así una llamada
+        de prueba con el circuito medio abierto no lo deja bloqueado.
+        """
+        deadline_at = time.monotonic() + (deadline or self.deadline)
+        attempt = 0
+        while True:
+            attempt += 1
+            timeout = self._before_attempt(stage, deadline_at)
+            received = False
+            settled = False
+            try:
+                try:
+                    response = get_model(model_name).generate_content(
+                        prompt, stream=True, request_options={"timeout": timeout})
+                    for chunk in response:
+                        received = True
+                        yield chunk.text
+                except Exception as exc:
+                    settled = True
+                    if received:
+                        # Lo ya entregado no se puede repetir: el error llega al consumidor
+                        if retry_reason(exc):
+                            self._record_failure()
+                        else:
+                            self.breaker.record_success()
+                        GEMINI_REQUESTS.inc(stage=stage, outcome="failed")
+                        raise
+                    self._after_failure(exc, stage, attempt, deadline_at)
+                    continue
+                settled = True
+                self.breaker.record_success()
+                GEMINI_REQUESTS.inc(stage=stage, outcome="ok" if attempt == 1 else "recovered")
+                return
+            finally:
+                if not settled:
+                    # GeneratorExit (u otra BaseException) no pasa por `except Exception`
+                    if received:
+                        self.breaker.record_success()
+                    else:
+                        self._record_failure()
+                    GEMINI_REQUESTS.inc(stage=stage, outcome="abandoned")
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_gemini_client():
+    """Cliente compartido del proceso, configurado por variables de entorno.
+
+    GEMINI_RPM (0 desactiva el límite) y GEMINI_BURST dimensionan el token bucket
+    a la cuota; GEMINI_MAX_ATTEMPTS, GEMINI_DEADLINE y GEMINI_BREAKER_* ajustan
+    reintentos y circuito.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            rpm = float(os.getenv("GEMINI_RPM", "15"))
+            _client = GeminiClient(
+                rate_limiter=TokenBucket.per_minute(rpm, burst=int(os.getenv("GEMINI_BURST", "3"))) if rpm > 0 else None,
+                breaker=CircuitBreaker(
+                    failure_threshold=int(os.getenv("GEMINI_BREAKER_THRESHOLD", "5")),
+                    reset_timeout=float(os.getenv("GEMINI_BREAKER_RESET", "30")),
+                ),
+                max_attempts=int(os.getenv("GEMINI_MAX_ATTEMPTS", "4")),
+                base_delay=float(os.getenv("GEMINI_BACKOFF_BASE", "0.5")),
+                max_delay=float(os.getenv("GEMINI_BACKOFF_MAX", "8")),
+                deadline=float(os.getenv("GEMINI_DEADLINE", "60")),
+            )
+        return _client
@@ -0,0 +1,296 @@
+"""Histórico de optimizaciones append-only (reemplaza la reescritura de optimization_history.json).
+
+Uso:
+    python src/history_store.py migrate [--json optimization_history.json]
+    python src/history_store.py export  [--json optimization_history.json]
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+
+from vacancy_cache import extract_job_id
+from store_query import build_where, page_limit, paginate
+
+DEFAULT_DB_PATH = "data/processed/history.sqlite3"
+DEFAULT_JSON_PATH = "optimization_history.json"
+
+CV_FIELDS = ("cv_original", "cv_es", "cv_en")
+SUMMARY_COLUMNS = ("id", "fecha", "empresa", "puesto", "linkedin_url")
+QUERY_COLUMNS = {"id": "h.id", "company": "h.empresa", "title": "h.puesto", "date": "h.fecha",
+                 "job_id": "h.job_id", "url": "h.linkedin_url"}
+
+
+def content_hash(text):
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+class HistoryStore:
+    """Registros de optimización en SQLite (WAL); los textos de CV se guardan una sola vez por hash."""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._connection().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS cv_bodies (
+                hash TEXT PRIMARY KEY,
+                body TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                fecha TEXT NOT NULL,
+                empresa TEXT,
+                puesto TEXT,
+                linkedin_url TEXT,
+                cv_original_hash TEXT NOT NULL REFERENCES cv_bodies(hash),
+                cv_es_hash TEXT NOT NULL REFERENCES cv_bodies(hash),
+                cv_en_hash TEXT NOT NULL REFERENCES cv_bodies(hash)
+            );
+            CREATE TABLE IF NOT EXISTS migrations (
+                name TEXT PRIMARY KEY,
+                applied_at REAL NOT NULL
+            );
+            """
+        )
+        self._upgrade_schema(self._connection())
+
+    def _upgrade_schema(self, conn):
+        """Agrega job_id y los índices de consulta a bases creadas antes de la API de consultas."""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(history)")}
+        if "job_id" not in columns:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("ALTER TABLE history ADD COLUMN job_id TEXT")
+                rows = conn.execute("SELECT id, linkedin_url FROM history").fetchall()
+                conn.executemany("UPDATE history SET job_id = ? WHERE id = ?",
+                                 [(extract_job_id(url), row_id) for row_id, url in rows])
+                conn.execute("COMMIT")
+            except sqlite3.OperationalError:
+                # Otro proceso agregó la columna primero
+                conn.execute("ROLLBACK")
+        if "fallback" not in columns:
+            # 1 si los CVs salieron de optimize_cv_manual: find_optimized no los reutiliza
+            try:
+                conn.execute("ALTER TABLE history ADD COLUMN fallback INTEGER NOT NULL DEFAULT 0")
+            except sqlite3.OperationalError:
+                pass
+        conn.executescript(
+            """
+            CREATE INDEX IF NOT EXISTS idx_history_fecha ON history(fecha);
+            CREATE INDEX IF NOT EXISTS idx_history_empresa_nocase ON history(empresa COLLATE NOCASE);
+            CREATE INDEX IF NOT EXISTS idx_history_puesto_nocase ON history(puesto COLLATE NOCASE);
+            CREATE INDEX IF NOT EXISTS idx_history_job_id ON history(job_id);
+            CREATE INDEX IF NOT EXISTS idx_history_url ON history(linkedin_url);
+            """
+        )
+
+    def _connection(self):
+        # Una conexión por hilo; SQLite serializa a los escritores con su propio lock
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _insert(self, conn, record):
+        hashes = {}
+        for field in CV_FIELDS:
+            body = record.get(field) or ""
+            hashes[field] = content_hash(body)
+            conn.execute("INSERT OR IGNORE INTO cv_bodies (hash, body) VALUES (?, ?)", (hashes[field], body))
+        cursor = conn.execute(
+            """INSERT INTO history (fecha, empresa, puesto, linkedin_url, job_id,
+                                   cv_original_hash, cv_es_hash, cv_en_hash, fallback)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (record["fecha"], record.get("empresa"), record.get("puesto"), record.get("linkedin_url"),
+             extract_job_id(record.get("linkedin_url")),
+             hashes["cv_original"], hashes["cv_es"], hashes["cv_en"], int(bool(record.get("fallback")))),
+        )
+        return cursor.lastrowid
+
+    def append(self, record):
+        """Agrega un registro con las claves de optimization_history.json. Retorna su id.
+
+        `fallback` en el registro marca CVs de optimize_cv_manual.
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            record_id = self._insert(conn, record)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return record_id
+
+    def count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def query(self, company=None, title=None, date_from=None, date_to=None, url=None,
+              cursor=None, limit=None, include_cv=False):
+        """Lista registros del más reciente al más antiguo, filtrados por índice.
+
+        Los textos de CV solo se leen con `include_cv=True`. Retorna
+        {"items": [...], "next_cursor": ...}.
+        """
+        limit = page_limit(limit)
+        where, params = build_where(QUERY_COLUMNS, company=company, title=title, date_from=date_from,
+                                    date_to=date_to, url=url, cursor=cursor)
+        select = ", ".join(f"h.{column}" for column in SUMMARY_COLUMNS)
+        joins = ""
+        if include_cv:
+            select += ", o.body, es.body, en.body"
+            joins = """ JOIN cv_bodies o ON o.hash = h.cv_original_hash
+                        JOIN cv_bodies es ON es.hash = h.cv_es_hash
+                        JOIN cv_bodies en ON en.hash = h.cv_en_hash"""
+        rows = self._connection().execute(
+            f"SELECT {select} FROM history h{joins}{where} ORDER BY h.id DESC LIMIT ?", params + [limit + 1]
+        ).fetchall()
+        rows, next_cursor = paginate(rows, limit)
+        items = []
+        for row in rows:
+            item = dict(zip(SUMMARY_COLUMNS, row))
+            if include_cv:
+                item.update(zip(CV_FIELDS, row[len(SUMMARY_COLUMNS):]))
+            items.append(item)
+        return {"items": items, "next_cursor": next_cursor}
+
+    def get(self, record_id):
+        """Retorna un registro completo (con los tres CVs) por id, o None."""
+        row = self._connection().execute(
+            """SELECT h.id, h.fecha, h.empresa, h.puesto, h.linkedin_url, o.body, es.body, en.body
+               FROM history h
+               JOIN cv_bodies o ON o.hash = h.cv_original_hash
+               JOIN cv_bodies es ON es.hash = h.cv_es_hash
+               JOIN cv_bodies en ON en.hash = h.cv_en_hash
+               WHERE h.id = ?""",
+            (record_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(SUMMARY_COLUMNS + CV_FIELDS, row))
+
+    def find_optimized(self, linkedin_url, cv_original):
+        """(cv_es, cv_en) más recientes para esa vacante y ese mismo CV original, o None.
+
+        Los registros de respaldo (optimize_cv_manual) nunca se devuelven.
+        """
+        job_id = extract_job_id(linkedin_url)
+        column, value = ("h.job_id", job_id) if job_id else ("h.linkedin_url", linkedin_url)
+        row = self._connection().execute(
+            f"""SELECT es.body, en.body FROM history h
+                JOIN cv_bodies es ON es.hash = h.cv_es_hash
+                JOIN cv_bodies en ON en.hash = h.cv_en_hash
+                WHERE {column} = ? AND h.cv_original_hash = ? AND h.fallback = 0
+                ORDER BY h.id DESC LIMIT 1""",
+            (value, content_hash(cv_original)),
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def iter_records(self, batch_size=200):
+        """Recorre el histórico completo (con textos) en orden de inserción."""
+        last_id = 0
+        conn = self._connection()
+        while True:
+            rows = conn.execute(
+                """SELECT h.id, h.fecha, h.empresa, h.puesto, h.linkedin_url, o.body, es.body, en.body
+                   FROM history h
+                   JOIN cv_bodies o ON o.hash = h.cv_original_hash
+                   JOIN cv_bodies es ON es.hash = h.cv_es_hash
+                   JOIN cv_bodies en ON en.hash = h.cv_en_hash
+                   WHERE h.id > ? ORDER BY h.id LIMIT ?""",
+                (last_id, batch_size),
+            ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield {
+                    "fecha": row[1],
+                    "empresa": row[2],
+                    "puesto": row[3],
+                    "linkedin_url": row[4],
+                    "cv_original": row[5],
+                    "cv_es": row[6],
+                    "cv_en": row[7],
+                }
+            last_id = rows[-1][0]
+
+    def export_json(self, json_path=DEFAULT_JSON_PATH):
+        """Genera optimization_history.json con el formato anterior, registro a registro."""
+        tmp_path = f"{json_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("[")
+            for i, record in enumerate(self.iter_records()):
+                f.write(",\n" if i else "\n")
+                f.write(json.dumps(record, ensure_ascii=False, indent=4))
+            f.write("\n]")
+        os.replace(tmp_path, json_path)
+        return json_path
+
+    def migrate_json(self, json_path=DEFAULT_JSON_PATH):
+        """Importa una sola vez el optimization_history.json existente. Retorna los registros importados."""
+        name = f"json:{os.path.abspath(json_path)}"
+        conn = self._connection()
+        if conn.execute("SELECT 1 FROM migrations WHERE name = ?", (name,)).fetchone():
+            return 0
+        if not os.path.exists(json_path):
+            return 0
+        with open(json_path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Otro proceso pudo completar la migración mientras esperábamos el lock
+            if conn.execute("SELECT 1 FROM migrations WHERE name = ?", (name,)).fetchone():
+                conn.execute("ROLLBACK")
+                return 0
+            for record in records:
+                self._insert(conn, record)
+            conn.execute("INSERT INTO migrations (name, applied_at) VALUES (?, ?)", (name, time.time()))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        print(f"Migrados {len(records)} registros desde {json_path} a {self.db_path}.")
+        return len(records)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history_store():
+    """Devuelve el histórico compartido; en el primer uso importa el JSON heredado."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = HistoryStore(os.getenv("HISTORY_DB_PATH", DEFAULT_DB_PATH))
+            _store.migrate_json(os.getenv("HISTORY_JSON_PATH", DEFAULT_JSON_PATH))
+        return _store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migración y exportación del histórico de optimizaciones.")
+    parser.add_argument("command", choices=["migrate", "export"])
+    parser.add_argument("--db", default=os.getenv("HISTORY_DB_PATH", DEFAULT_DB_PATH))
+    parser.add_argument("--json", default=os.getenv("HISTORY_JSON_PATH", DEFAULT_JSON_PATH))
+    args = parser.parse_args(argv)
+
+    store = HistoryStore(args.db)
+    if args.command == "migrate":
+        store.migrate_json(args.json)
+    else:
+        store.export_json(args.json)
+        print(f"Exportados {store.count()} registros a {args.json}.")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
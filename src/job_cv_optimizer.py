@@ -2,51 +2,38 @@ import json
 import os
 import re
 import time
+import warnings
 import datetime
-import pandas as pd
-from bs4 import BeautifulSoup
-import sys
 
-print("Rutas de búsqueda:", sys.path)
-try:
-    import selenium
-    print("Selenium se encuentra en:", selenium.__file__)
-except ImportError as e:
-    print("Error al importar selenium:", e)
+# Solo módulos livianos al importar: selenium, requests/BeautifulSoup y
+# google.generativeai se cargan en el primer uso (ver init() y gemini_client)
+from driver_pool import get_driver_pool, shutdown_driver_pool
+from vacancy_cache import get_vacancy_cache
+from llm_cache import get_llm_cache, make_cache_key
+from jobs_store import get_jobs_store
+from gemini_client import warm_up_gemini, get_gemini_client
+from metrics import span, record_fallback, fallback_counts, postprocess_report, summary as metrics_summary
+from metrics import GEMINI_TTFT_SECONDS, STAGE_SECONDS, STAGE_ERRORS, POSTPROCESS_SOURCE
+import prompt_budget
+import job_parser
 
+_initialized = False
 
-# Selenium y webdriver-manager para scraping
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+def init(preload_gemini=False):
+    """Paso de arranque explícito: carga .env y crea los directorios de datos.
 
-import google.generativeai as genai
-
-# Asegurar que los directorios existan
-os.makedirs("data/raw", exist_ok=True)
-os.makedirs("data/processed", exist_ok=True)
-
-# Configurar la API key de Gemini (desde variable de entorno o .env)
-
-from dotenv import load_dotenv
-import os
-
-# Cargar variables de entorno desde .env
-load_dotenv()
-
-# Verificar que la API key se cargó
-print("GEMINI_API_KEY:", os.getenv("GEMINI_API_KEY"))
-
-try:
-    genai.configure(api_key=os.environ["GEMINI_API_KEY"])
-except KeyError:
-    from dotenv import load_dotenv
-    load_dotenv()
-    genai.configure(api_key=os.environ["GEMINI_API_KEY"])
+    Con `preload_gemini=True` también importa y configura Gemini ahora en lugar
+    de en la primera llamada. Se puede llamar varias veces.
+    """
+    global _initialized
+    if not _initialized:
+        from dotenv import load_dotenv
+        load_dotenv()
+        os.makedirs("data/raw", exist_ok=True)
+        os.makedirs("data/processed", exist_ok=True)
+        _initialized = True
+    if preload_gemini:
+        warm_up_gemini()
 
 def clean_filename(text):
     text = re.sub(r'[^\w\s-]', '', text)
@@ -70,6 +57,71 @@ def load_prompt():
         print("Error al leer cv_prompt.txt:", e)
         return ""
 
+GEMINI_MODEL = 'gemini-2.0-flash'
+# Cambiar la versión al editar una plantilla invalida sus respuestas cacheadas
+POSTPROCESS_PROMPT_VERSION = "postprocess-v1"
+OPTIMIZE_PROMPT_VERSION = "optimize-v1"
+COMBINED_PROMPT_VERSION = "combined-v1"
+
+# Respuesta del modo combinado: la vacante estructurada y las dos versiones del CV en un solo JSON
+POSTPROCESS_FIELDS = ("Información___del___trabajo", "Responsabilidades", "Requisitos", "Beneficios")
+CV_FIELDS = ("cv_es", "cv_en")
+COMBINED_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "Información___del___trabajo": {"type": "string"},
+        "Responsabilidades": {"type": "array", "items": {"type": "string"}},
+        "Requisitos": {"type": "array", "items": {"type": "string"}},
+        "Beneficios": {"type": "string", "nullable": True},
+        "cv_es": {"type": "string"},
+        "cv_en": {"type": "string"},
+    },
+    "required": ["Información___del___trabajo", "Responsabilidades", "Requisitos", "cv_es", "cv_en"],
+}
+COMBINED_GENERATION_CONFIG = {"response_mime_type": "application/json", "response_schema": COMBINED_SCHEMA}
+
+def combined_mode():
+    """GEMINI_COMBINED=1: una sola llamada para optimizar el CV y estructurar la vacante."""
+    return os.getenv("GEMINI_COMBINED", "0").lower() in ("1", "true", "yes")
+
+def set_gemini_rate_limiter(limiter):
+    """Reemplaza el limitador de cuota del cliente de Gemini (p. ej. rate_limit.TokenBucket).
+
+    Retorna el limitador anterior para poder restaurarlo.
+    """
+    client = get_gemini_client()
+    previous, client.rate_limiter = client.rate_limiter, limiter
+    return previous
+
+def _generate_cached(prompt, template_version, parse, use_cache=True, model_name=GEMINI_MODEL, stage="gemini",
+                     generation_config=None):
+    """Llama a Gemini pasando por la caché de respuestas.
+
+    Solo se cachean respuestas que `parse` acepta sin lanzar excepción, así que
+    los resultados de respaldo nunca llegan a la caché. La llamada real se mide
+    como la etapa `stage`.
+    """
+    cache = get_llm_cache() if use_cache else None
+    key = make_cache_key(model_name, template_version, prompt) if cache is not None else None
+    if cache is not None:
+        cached_text = cache.get(key)
+        if cached_text is not None:
+            try:
+                result = parse(cached_text)
+                print(f"Respuesta de Gemini obtenida de la caché ({template_version}).")
+                return result
+            except Exception:
+                cache.discard(key)
+
+    # Los aciertos de caché no consumen cuota; el cliente reintenta los errores transitorios
+    with span(stage):
+        text = get_gemini_client().generate(prompt, model_name, stage=stage,
+                                            generation_config=generation_config).strip()
+        result = parse(text)
+    if cache is not None:
+        cache.put(key, text, model_name=model_name, template_version=template_version)
+    return result
+
 def fallback_postprocess(raw_text):
     return {
         "Información___del___trabajo": raw_text,
@@ -78,8 +130,60 @@ def fallback_postprocess(raw_text):
         "Beneficios": None
     }
 
-def postprocess_job_text(raw_text):
-    prompt = f"""
+def _strip_code_fence(text):
+    # Limpiar delimitadores si existen
+    cleaned_text = text.strip()
+    if cleaned_text.startswith("```json"):
+        cleaned_text = cleaned_text[len("```json"):].strip()
+    if cleaned_text.endswith("```"):
+        cleaned_text = cleaned_text[:-3].strip()
+    return cleaned_text
+
+def _parse_postprocess_response(debug_text):
+    print("Respuesta de postprocesamiento:", debug_text)
+    return json.loads(_strip_code_fence(debug_text))
+
+def salvage_json_object(text):
+    """Miembros completos del objeto JSON de nivel superior, aunque la respuesta esté cortada.
+
+    Un JSON truncado (p. ej. por el límite de tokens de salida) no se puede
+    parsear entero: se decodifica clave por clave y se descarta el miembro que
+    quedó a medias. Retorna (dict, completo).
+    """
+    cleaned_text = _strip_code_fence(text)
+    try:
+        data = json.loads(cleaned_text)
+        if isinstance(data, dict):
+            return data, True
+    except json.JSONDecodeError:
+        pass
+    start = cleaned_text.find("{")
+    if start < 0:
+        raise ValueError("La respuesta no contiene un objeto JSON")
+    decoder = json.JSONDecoder()
+    whitespace = re.compile(r"\s*")
+    members = {}
+    pos = start + 1
+    while True:
+        pos = whitespace.match(cleaned_text, pos).end()
+        if pos >= len(cleaned_text) or cleaned_text[pos] == "}":
+            break
+        try:
+            key, pos = decoder.raw_decode(cleaned_text, pos)
+            pos = whitespace.match(cleaned_text, pos).end()
+            if cleaned_text[pos:pos + 1] != ":":
+                break
+            value, pos = decoder.raw_decode(cleaned_text, whitespace.match(cleaned_text, pos + 1).end())
+        except json.JSONDecodeError:
+            break
+        members[key] = value
+        pos = whitespace.match(cleaned_text, pos).end()
+        if cleaned_text[pos:pos + 1] == ",":
+            pos += 1
+    return members, False
+
+def _postprocess_prompt(raw_text):
+    return f"""
 Eres un experto en extracción de información de ofertas de empleo. Tu tarea es analizar el siguiente texto de una vacante y devolver únicamente un JSON válido, sin comentarios adicionales. El JSON debe tener exactamente las siguientes claves en español:
 - "Información___del___trabajo": Un resumen conciso (máximo 200 palabras) de la descripción general del empleo.
 - "Responsabilidades": Una lista (array de strings) con las principales responsabilidades.
@@ -88,103 +192,140 @@ Eres un experto en extracción de información de ofertas de empleo. Tu tarea es
 Texto de la vacante:
 {raw_text}
 """
+
+def _postprocess_with_gemini(raw_text, use_cache=True):
+    # La descripción se limpia de boilerplate y se ajusta al presupuesto de tokens
+    before = prompt_budget.estimate_tokens(_postprocess_prompt(raw_text))
+    budget = prompt_budget.available_budget(
+        prompt_budget.POSTPROCESS_BUDGET, prompt_budget.estimate_tokens(_postprocess_prompt("")))
+    job_text, trimmed = prompt_budget.compact_job_text(raw_text, budget)
+    prompt = _postprocess_prompt(job_text)
+    prompt_budget.log_prompt_size("gemini_postprocess", before, prompt, trimmed)
+    return _generate_cached(prompt, POSTPROCESS_PROMPT_VERSION, _parse_postprocess_response, use_cache=use_cache,
+                            stage="gemini_postprocess")
+
+def _postprocess_locally(raw_text):
+    """Resultado del parser de encabezados si su confianza alcanza el umbral; None si hace falta Gemini."""
+    if not job_parser.parser_enabled():
+        return None
+    with span("postprocess_parser"):
+        processed, confidence = job_parser.parse_job_text(raw_text)
+    if confidence >= job_parser.MIN_CONFIDENCE:
+        POSTPROCESS_SOURCE.inc(source="parser")
+        print(f"Postprocesamiento local (confianza {confidence:.2f}), sin llamar a Gemini.")
+        return processed
+    POSTPROCESS_SOURCE.inc(source="gemini")
+    print(f"Confianza del parser local {confidence:.2f} < {job_parser.MIN_CONFIDENCE}: se usa Gemini.")
+    return None
+
+def _postprocess(raw_text, use_cache=True, local=True):
+    """Parser local, luego Gemini y por último fallback_postprocess.
+
+    Retorna (processed, origen) con origen "parser", "gemini" o "fallback".
+    """
+    if local:
+        processed = _postprocess_locally(raw_text)
+        if processed is not None:
+            return processed, "parser"
     try:
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        response = model.generate_content(prompt)
-        debug_text = response.text.strip()
-        print("Respuesta de postprocesamiento:", debug_text)
-        # Limpiar delimitadores si existen
-        cleaned_text = debug_text
-        if cleaned_text.startswith("```json"):
-            cleaned_text = cleaned_text[len("```json"):].strip()
-        if cleaned_text.endswith("```"):
-            cleaned_text = cleaned_text[:-3].strip()
-        result_json = json.loads(cleaned_text)
-        return result_json
+        return _postprocess_with_gemini(raw_text, use_cache=use_cache), "gemini"
     except Exception as e:
         print("Error en postprocesamiento con Gemini:", e)
         print("Usando fallback heurístico...")
-        return fallback_postprocess(raw_text)
+        record_fallback("postprocess")
+        return fallback_postprocess(raw_text), "fallback"
+
+def postprocess_job_text(raw_text, use_cache=True):
+    return _postprocess(raw_text, use_cache=use_cache)[0]
+
+def postprocess_vacancy(vacancy_data, use_cache=True, outcome=None):
+    """postprocess_job_text con caché por ID de vacante. Solo se cachean las respuestas de Gemini.
+
+    Si se usa fallback_postprocess, marca outcome["postprocess_fallback"].
+    """
+    raw_text = vacancy_data["Información del trabajo"]
+    job_url = vacancy_data.get("Enlace de la vacante", "NA")
+    cache = get_vacancy_cache() if use_cache else None
+    if cache is not None:
+        cached = cache.get_processed(job_url, raw_text)
+        if cached is not None:
+            print("Postprocesamiento obtenido de la caché de vacantes.")
+            return cached
+    processed, source = _postprocess(raw_text, use_cache=use_cache)
+    if cache is not None and source == "gemini":
+        cache.put_processed(job_url, raw_text, processed)
+    if outcome is not None and source == "fallback":
+        outcome["postprocess_fallback"] = True
+    return processed
+
+def scrape_linkedin_vacancy_with_selenium(job_detail_url, pool=None):
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from linkedin_scraper import parse_vacancy_html
 
-def scrape_linkedin_vacancy_with_selenium(job_detail_url):
     print("Extrayendo información de la vacante usando Selenium...")
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--no-sandbox")
-    
-    driver = webdriver.Chrome(service=ChromeService(ChromeDriverManager().install()), options=chrome_options)
+    pool = pool or get_driver_pool()
     try:
-        driver.get(job_detail_url)
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "h1")))
-        html = driver.page_source
-        soup = BeautifulSoup(html, "html.parser")
-        
-        title_element = soup.find("h1")
-        title = title_element.get_text().strip() if title_element else "NA"
-        
-        company_element = soup.find("a", {"data-tracking-control-name": "public_jobs_topcard-org-name"})
-        company_name = company_element.get_text().strip() if company_element else "NA"
-        
-        description_element = soup.find("div", class_="description__text")
-        description = description_element.get_text().strip() if description_element else "NA"
-        
-        requirements = "NA"
-        criteria_elements = soup.select(".description__job-criteria-list li")
-        if criteria_elements:
-            req_list = []
-            for criteria in criteria_elements:
-                header = criteria.find(class_="description__job-criteria-subheader")
-                text_el = criteria.find(class_="description__job-criteria-text")
-                if header and text_el:
-                    req_list.append(f"{header.get_text().strip()}: {text_el.get_text().strip()}")
-            if req_list:
-                requirements = "\n- " + "\n- ".join(req_list)
-        
-        keywords = []
-        if description != "NA" and requirements != "NA":
-            combined_text = description + " " + requirements
-            common_keywords = ["python", "machine learning", "data science", "remote", "english", "skills", "experience"]
-            for word in combined_text.lower().split():
-                if word in common_keywords and word.capitalize() not in keywords:
-                    keywords.append(word.capitalize())
-        if not keywords:
-            keywords = ["Python", "Machine Learning", "Data Science", "Remote", "English"]
-
-        vacancy_data = {
-            "Título del puesto": title,
-            "Enlace de la vacante": job_detail_url,
-            "Nombre de la empresa": company_name,
-            "Información del trabajo": description,
-            "Requisitos": requirements,
-            "Palabras clave": keywords,
-            "Nombre del reclutador": "NA",
-            "Correo electrónico": "NA",
-            "WhatsApp": "NA",
-            "Salario": "NA",
-            "Horario laboral": "Tiempo completo",
-            "Modalidad de trabajo": "Remoto",
-            "Ubicación": "NA",
-            "Beneficios": "NA"
-        }
+        # El préstamo del navegador (incluido el arranque de Chrome) se mide en driver_pool
+        with pool.driver() as driver:
+            with span("selenium_page_load"):
+                driver.get(job_detail_url)
+                WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "h1")))
+                html = driver.page_source
+        with span("parse_html"):
+            vacancy_data = parse_vacancy_html(html, job_detail_url)
         print("Datos extraídos:", vacancy_data)
         return vacancy_data
     except Exception as e:
         print("Error durante el scraping con Selenium:", e)
         return None
-    finally:
-        driver.quit()
 
-def optimize_cv_with_gemini(vacancy_data, cv_description):
-    print("Optimizando el CV con Gemini 2.0 Flash...")
-    prompt = f"""
+def scrape_linkedin_vacancy(job_detail_url, pool=None, use_cache=True):
+    """Intenta la caché, luego la ruta HTTP sin navegador y recurre a Selenium solo si faltan elementos."""
+    from linkedin_scraper import scrape_linkedin_vacancy_with_http, has_required_fields
+
+    cache = get_vacancy_cache() if use_cache else None
+    if cache is not None:
+        vacancy_data = cache.get(job_detail_url)
+        if vacancy_data is not None:
+            print("Vacante obtenida de la caché:", vacancy_data["Título del puesto"])
+            return vacancy_data
+
+    with span("scrape_http"):
+        vacancy_data = scrape_linkedin_vacancy_with_http(job_detail_url)
+    if vacancy_data is not None:
+        print("Datos extraídos:", vacancy_data)
+    else:
+        print("Usando Selenium como respaldo...")
+        with span("scrape_selenium"):
+            vacancy_data = scrape_linkedin_vacancy_with_selenium(job_detail_url, pool=pool)
+
+    if cache is not None and has_required_fields(vacancy_data):
+        cache.put(job_detail_url, vacancy_data)
+    return vacancy_data
+
+def _split_optimized_cv(optimized_text):
+    print("Respuesta de optimización:", optimized_text)
+    if "Hoja de Vida Optimizada para" in optimized_text and "Optimized Resume for" in optimized_text:
+        # Se corta en el marcador sin tocar el espacio que lo sigue ni lo que venga después
+        marker = optimized_text.index("Optimized Resume for")
+        optimized_cv_es = optimized_text[:marker].strip()
+        optimized_cv_en = optimized_text[marker:].strip()
+    else:
+        optimized_cv_es = optimized_text
+        optimized_cv_en = optimized_text
+    return optimized_cv_es, optimized_cv_en
+
+def _optimize_prompt(vacancy_data, cv_description, job_info):
+    return f"""
 Eres un asistente experto en optimización de currículums. Toma la siguiente hoja de vida base:
 {cv_description}
 
 Y la siguiente información de la vacante:
 Título del puesto: {vacancy_data["Título del puesto"]}
 Nombre de la empresa: {vacancy_data["Nombre de la empresa"]}
-Información del trabajo: {vacancy_data["Información del trabajo"]}
+Información del trabajo: {job_info}
 Requisitos: {vacancy_data["Requisitos"]}
 Responsabilidades: { " ".join(vacancy_data.get("Palabras clave", [])) }
 
@@ -198,47 +339,310 @@ Genera dos versiones:
 
 Asegúrate de reestructurar la experiencia profesional y resaltar las secciones clave (Perfil Profesional, Habilidades, Experiencia Profesional, Educación, Idiomas) de forma que sean compatibles con sistemas ATS.
 """
+
+def build_optimize_prompt(vacancy_data, cv_description):
+    """Prompt de optimización con el CV y la vacante compactados al presupuesto de tokens.
+
+    Los requisitos, el título y los datos de contacto del CV se envían completos.
+    """
+    job_info = vacancy_data["Información del trabajo"]
+    before = prompt_budget.estimate_tokens(_optimize_prompt(vacancy_data, cv_description, job_info))
+    budget = prompt_budget.available_budget(
+        prompt_budget.OPTIMIZE_BUDGET, prompt_budget.estimate_tokens(_optimize_prompt(vacancy_data, "", "")))
+    cv_text, job_text, trimmed = prompt_budget.compact_for_optimize(cv_description, job_info, budget)
+    prompt = _optimize_prompt(vacancy_data, cv_text, job_text)
+    prompt_budget.log_prompt_size("gemini_optimize", before, prompt, trimmed)
+    return prompt
+
+def optimize_cv_with_gemini(vacancy_data, cv_description, use_cache=True, outcome=None):
+    """Retorna (cv_es, cv_en). Si se usa optimize_cv_manual, marca outcome["fallback"]."""
+    print("Optimizando el CV con Gemini 2.0 Flash...")
+    prompt = build_optimize_prompt(vacancy_data, cv_description)
     try:
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        response = model.generate_content(prompt)
-        optimized_text = response.text.strip()
-        print("Respuesta de optimización:", optimized_text)
-        
-        if "Hoja de Vida Optimizada para" in optimized_text and "Optimized Resume for" in optimized_text:
-            parts = optimized_text.split("Optimized Resume for")
-            optimized_cv_es = parts[0].strip()
-            optimized_cv_en = "Optimized Resume for" + parts[1].strip()
-        else:
-            optimized_cv_es = optimized_text
-            optimized_cv_en = optimized_text
-            
+        optimized_cv_es, optimized_cv_en = _generate_cached(
+            prompt, OPTIMIZE_PROMPT_VERSION, _split_optimized_cv, use_cache=use_cache, stage="gemini_optimize"
+        )
         if optimized_cv_es.strip() == cv_description.strip():
             print("Advertencia: La versión optimizada en español es idéntica al CV base.")
         return optimized_cv_es, optimized_cv_en
     except Exception as e:
         print(f"Error al optimizar el CV con Gemini: {e}")
+        record_fallback("optimize")
+        if outcome is not None:
+            outcome["fallback"] = True
         return optimize_cv_manual(vacancy_data, cv_description)
 
+class IncompleteResponseError(ValueError):
+    """La respuesta combinada llegó cortada o con campos inválidos; `partial` guarda los campos válidos."""
+
+    def __init__(self, message, partial):
+        super().__init__(message)
+        self.partial = partial
+
+def _valid_combined_fields(data):
+    """Campos del JSON combinado que cumplen el esquema (listas de strings, textos no vacíos)."""
+    valid = {}
+    for field in CV_FIELDS:
+        if isinstance(data.get(field), str) and data[field].strip():
+            valid[field] = data[field].strip()
+    info = data.get("Información___del___trabajo")
+    if isinstance(info, str):
+        valid["Información___del___trabajo"] = info
+    for field in ("Responsabilidades", "Requisitos"):
+        value = data.get(field)
+        if value is None or (isinstance(value, list) and all(isinstance(item, str) for item in value)):
+            if field in data:
+                valid[field] = value
+    if data.get("Beneficios") is None or isinstance(data["Beneficios"], str):
+        if "Beneficios" in data:
+            valid["Beneficios"] = data["Beneficios"]
+    return valid
+
+def _parse_combined_response(text):
+    print("Respuesta combinada:", text)
+    data, complete = salvage_json_object(text)
+    valid = _valid_combined_fields(data)
+    missing = [field for field in CV_FIELDS + POSTPROCESS_FIELDS[:3] if field not in valid]
+    if not complete or missing:
+        raise IncompleteResponseError(
+            f"Respuesta combinada {'truncada' if not complete else 'incompleta'}; faltan: {', '.join(missing) or '-'}",
+            valid)
+    valid.setdefault("Beneficios", None)
+    return valid
+
+def _combined_prompt(vacancy_data, cv_description, job_info):
+    title, company = vacancy_data["Título del puesto"], vacancy_data["Nombre de la empresa"]
+    return f"""
+Eres un asistente experto en optimización de currículums y en extracción de información de ofertas de empleo. Devuelve únicamente un objeto JSON con estas claves:
+- "Información___del___trabajo": Un resumen conciso (máximo 200 palabras) de la descripción general del empleo.
+- "Responsabilidades": Una lista (array de strings) con las principales responsabilidades.
+- "Requisitos": Una lista (array de strings) con los requisitos del puesto.
+- "Beneficios": Un string con la descripción de los beneficios ofrecidos, o null si no se mencionan.
+- "cv_es": La hoja de vida optimizada en español, que comience con "Hoja de Vida Optimizada para {title} – {company} – Versión en Español".
+- "cv_en": La hoja de vida optimizada en inglés, que comience con "Optimized Resume for {title} – {company} – English Version".
+
+Optimiza la hoja de vida para que se alinee perfectamente con esta vacante, resaltando las habilidades, experiencia y logros relevantes. No inventes información; conserva los datos personales (nombre, correo, LinkedIn, teléfono) sin cambios. Reestructura la experiencia profesional y resalta las secciones clave (Perfil Profesional, Habilidades, Experiencia Profesional, Educación, Idiomas) de forma que sean compatibles con sistemas ATS.
+
+Hoja de vida base:
+{cv_description}
+
+Vacante:
+Título del puesto: {title}
+Nombre de la empresa: {company}
+Información del trabajo: {job_info}
+Requisitos: {vacancy_data["Requisitos"]}
+Palabras clave: {", ".join(vacancy_data.get("Palabras clave", []))}
+"""
+
+def build_combined_prompt(vacancy_data, cv_description):
+    """Prompt del modo combinado: la vacante se envía una sola vez, compactada al presupuesto de optimización."""
+    job_info = vacancy_data["Información del trabajo"]
+    before = prompt_budget.estimate_tokens(_combined_prompt(vacancy_data, cv_description, job_info))
+    budget = prompt_budget.available_budget(
+        prompt_budget.OPTIMIZE_BUDGET, prompt_budget.estimate_tokens(_combined_prompt(vacancy_data, "", "")))
+    cv_text, job_text, trimmed = prompt_budget.compact_for_optimize(cv_description, job_info, budget)
+    prompt = _combined_prompt(vacancy_data, cv_text, job_text)
+    prompt_budget.log_prompt_size("gemini_combined", before, prompt, trimmed)
+    return prompt
+
+def structure_without_gemini(vacancy_data, use_cache=True):
+    """(necesita Gemini, processed): la vacante estructurada desde la caché o el parser local.
+
+    Sin descripción no hay nada que estructurar y processed es None; si ni la
+    caché ni el parser local alcanzan, necesita Gemini.
+    """
+    raw_text = vacancy_data["Información del trabajo"]
+    if raw_text == "NA":
+        return False, None
+    cache = get_vacancy_cache() if use_cache else None
+    job_url = vacancy_data.get("Enlace de la vacante", "NA")
+    processed = cache.get_processed(job_url, raw_text) if cache is not None else None
+    if processed is None:
+        processed = _postprocess_locally(raw_text)
+    return processed is None, processed
+
+def optimize_and_postprocess(vacancy_data, cv_description, use_cache=True, outcome=None, local=True):
+    """CV optimizado y vacante estructurada con una sola llamada a Gemini. Retorna (cv_es, cv_en, processed).
+
+    Si la vacante ya está estructurada (caché de vacantes o parser local con
+    confianza suficiente) solo se optimiza el CV. Si la respuesta combinada llega
+    cortada o inválida, se conservan los campos completos y solo lo que falta se
+    pide por la ruta de dos llamadas. `processed` es None cuando la vacante no
+    tiene descripción (build_custom_json lo resuelve). Los respaldos se marcan en
+    `outcome` igual que en optimize_cv_with_gemini y postprocess_vacancy. Con
+    `local=False` el llamador ya comprobó la caché y el parser con structure_without_gemini.
+    """
+    raw_text = vacancy_data["Información del trabajo"]
+    job_url = vacancy_data.get("Enlace de la vacante", "NA")
+    cache = get_vacancy_cache() if use_cache else None
+    needs_gemini, processed = structure_without_gemini(vacancy_data, use_cache=use_cache) if local else (True, None)
+    if not needs_gemini:
+        cv_es, cv_en = optimize_cv_with_gemini(vacancy_data, cv_description, use_cache=use_cache, outcome=outcome)
+        return cv_es, cv_en, processed
+
+    print("Optimizando el CV y estructurando la vacante con una sola llamada a Gemini...")
+    prompt = build_combined_prompt(vacancy_data, cv_description)
+    try:
+        data = _generate_cached(prompt, COMBINED_PROMPT_VERSION, _parse_combined_response, use_cache=use_cache,
+                                stage="gemini_combined", generation_config=COMBINED_GENERATION_CONFIG)
+    except IncompleteResponseError as e:
+        print(f"{e}. Se reparan los campos completos y se pide el resto por separado.")
+        record_fallback("combined_repair")
+        data = e.partial
+    except Exception as e:
+        print(f"Error en la llamada combinada a Gemini: {e}")
+        record_fallback("combined_repair")
+        data = {}
+
+    if all(field in data for field in CV_FIELDS):
+        cv_es, cv_en = data["cv_es"], data["cv_en"]
+    else:
+        cv_es, cv_en = optimize_cv_with_gemini(vacancy_data, cv_description, use_cache=use_cache, outcome=outcome)
+    if all(field in data for field in POSTPROCESS_FIELDS[:3]):
+        processed = {field: data.get(field) for field in POSTPROCESS_FIELDS}
+        if cache is not None:
+            cache.put_processed(job_url, raw_text, processed)
+    else:
+        # El parser local ya se descartó: solo falta la llamada de postprocesamiento
+        processed, source = _postprocess(raw_text, use_cache=use_cache, local=False)
+        if cache is not None and source == "gemini":
+            cache.put_processed(job_url, raw_text, processed)
+        if outcome is not None and source == "fallback":
+            outcome["postprocess_fallback"] = True
+    return cv_es, cv_en, processed
+
+class SectionSplitter:
+    """Reparte el texto en streaming entre las secciones 'es' y 'en' a medida que llega.
+
+    Solo retiene los últimos caracteres que podrían ser el comienzo del marcador
+    "Optimized Resume for", nunca la respuesta completa.
+    """
+
+    def __init__(self, marker="Optimized Resume for"):
+        self.marker = marker
+        self.section = "es"
+        self._pending = ""
+
+    def feed(self, text):
+        if self.section == "en":
+            return [("en", text)] if text else []
+        self._pending += text
+        index = self._pending.find(self.marker)
+        if index >= 0:
+            before, after = self._pending[:index], self._pending[index:]
+            self._pending = ""
+            self.section = "en"
+            return [(section, part) for section, part in (("es", before), ("en", after)) if part]
+        keep = len(self.marker) - 1
+        emit_upto = max(0, len(self._pending) - keep)
+        emitted, self._pending = self._pending[:emit_upto], self._pending[emit_upto:]
+        return [("es", emitted)] if emitted else []
+
+    def flush(self):
+        pending, self._pending = self._pending, ""
+        return [(self.section, pending)] if pending else []
+
+def stream_optimize_cv_with_gemini(vacancy_data, cv_description, outcome=None, use_cache=True):
+    """Versión en streaming de optimize_cv_with_gemini.
+
+    Genera tuplas (sección, texto) con sección 'es' o 'en' según van llegando los
+    fragmentos. Al terminar, `outcome` contiene cv_es, cv_en, ttft_ms y total_ms.
+    """
+    print("Optimizando el CV con Gemini 2.0 Flash (streaming)...")
+    outcome = {} if outcome is None else outcome
+    outcome.update(cached=False, fallback=False)
+    prompt = build_optimize_prompt(vacancy_data, cv_description)
+    start = time.perf_counter()
+    splitter = SectionSplitter()
+    parts = []
+
+    cache = get_llm_cache() if use_cache else None
+    key = make_cache_key(GEMINI_MODEL, OPTIMIZE_PROMPT_VERSION, prompt) if cache is not None else None
+    cached_text = cache.get(key) if cache is not None else None
+
+    if cached_text is not None:
+        chunks = [cached_text]
+    else:
+        chunks = get_gemini_client().stream(prompt, GEMINI_MODEL, stage="gemini_optimize_stream")
+    outcome["cached"] = cached_text is not None
+    try:
+        for text in chunks:
+            if not text:
+                continue
+            if not parts:
+                outcome["ttft_ms"] = round((time.perf_counter() - start) * 1000, 1)
+                if cached_text is None:
+                    GEMINI_TTFT_SECONDS.observe(outcome["ttft_ms"] / 1000, stage="gemini_optimize_stream")
+            parts.append(text)
+            yield from splitter.feed(text)
+        if not parts:
+            raise ValueError("Gemini devolvió una respuesta vacía")
+        yield from splitter.flush()
+    except Exception as e:
+        if cached_text is None:
+            STAGE_ERRORS.inc(stage="gemini_optimize_stream")
+        if parts:
+            # Parte de la respuesta ya se envió al usuario: no se mezcla con el respaldo
+            raise
+        print(f"Error al optimizar el CV con Gemini: {e}")
+        record_fallback("optimize")
+        cv_es, cv_en = optimize_cv_manual(vacancy_data, cv_description)
+        outcome.update(cv_es=cv_es, cv_en=cv_en, fallback=True,
+                       ttft_ms=round((time.perf_counter() - start) * 1000, 1))
+        yield ("es", cv_es)
+        yield ("en", cv_en)
+        outcome["total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return
+
+    optimized_text = "".join(parts).strip()
+    outcome["cv_es"], outcome["cv_en"] = _split_optimized_cv(optimized_text)
+    outcome["total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    if cached_text is None:
+        STAGE_SECONDS.observe(outcome["total_ms"] / 1000, stage="gemini_optimize_stream")
+    if cache is not None and cached_text is None:
+        cache.put(key, optimized_text, model_name=GEMINI_MODEL, template_version=OPTIMIZE_PROMPT_VERSION)
+
+# Encabezado con el que empieza cada versión del CV optimizado: (prefijo, sufijo)
+CV_HEADERS = {
+    "es": ("Hoja de Vida Optimizada para", "Versión en Español"),
+    "en": ("Optimized Resume for", "English Version"),
+}
+
+def cv_header(vacancy_data, language):
+    prefix, suffix = CV_HEADERS[language]
+    return f"{prefix} {vacancy_data['Título del puesto']} – {vacancy_data['Nombre de la empresa']} – {suffix}"
+
+def rebase_cv_header(cv_text, vacancy_data, language):
+    """Cambia el encabezado de un CV optimizado para otra vacante por el de `vacancy_data`.
+
+    Conserva lo que rodea al encabezado (p. ej. negritas de Markdown); si no lo
+    encuentra, retorna el CV sin cambios.
+    """
+    prefix, suffix = CV_HEADERS[language]
+    header = re.compile(f"{re.escape(prefix)} .*? – {re.escape(suffix)}")
+    return header.sub(lambda _: cv_header(vacancy_data, language), cv_text, count=1)
+
 def optimize_cv_manual(vacancy_data, cv_description):
     print("Usando optimización manual como respaldo...")
-    optimized_cv_es = f"""Hoja de Vida Optimizada para {vacancy_data["Título del puesto"]} – {vacancy_data["Nombre de la empresa"]} – Versión en Español
+    optimized_cv_es = f"""{cv_header(vacancy_data, "es")}
 
 {cv_description}
 """
-    optimized_cv_en = f"""Optimized Resume for {vacancy_data["Título del puesto"]} – {vacancy_data["Nombre de la empresa"]} – English Version
+    optimized_cv_en = f"""{cv_header(vacancy_data, "en")}
 
 {cv_description}
 """
     return optimized_cv_es, optimized_cv_en
 
-def build_custom_json(vacancy_data):
+def build_custom_json(vacancy_data, processed=None, outcome=None):
+    """JSON de la vacante para el almacén; `processed` evita postprocesarla otra vez (modo combinado)."""
     fecha_solicitud = datetime.datetime.now().strftime("%d-%m-%Y")
     idioma_input = detect_idioma(vacancy_data["Información del trabajo"])
     idioma_publicacion = "inglés" if idioma_input == "inglés" else "español"
     
-    if vacancy_data["Información del trabajo"] != "NA":
-        processed = postprocess_job_text(vacancy_data["Información del trabajo"])
-    else:
+    if processed is None and vacancy_data["Información del trabajo"] != "NA":
+        processed = postprocess_vacancy(vacancy_data, outcome=outcome)
+    elif processed is None:
         processed = {
             "Información___del___trabajo": None,
             "Responsabilidades": None,
@@ -266,21 +670,53 @@ def build_custom_json(vacancy_data):
     }
     return custom_json
 
-def guardar_en_dataframe(custom_json, csv_filename="data/processed/jobs.CSV"):
-    df_nueva = pd.DataFrame([custom_json])
-    if os.path.exists(csv_filename):
-        df_existente = pd.read_csv(csv_filename)
-        df_final = pd.concat([df_existente, df_nueva], ignore_index=True)
-    else:
-        df_final = df_nueva
-    df_final.to_csv(csv_filename, index=False)
-    print(f"Datos almacenados en el DataFrame y guardados en {csv_filename}.")
+def guardar_en_dataframe(custom_json, csv_filename=None, source_text=None, fallback=False):
+    """Agrega la vacante al almacén append-only (SQLite).
+
+    jobs.CSV ya no se reescribe en cada petición; se genera bajo demanda con
+    `python src/jobs_store.py export` o desde GET /export/jobs.csv.
+    `source_text` (la "Información del trabajo" scrapeada) se guarda con la fila
+    y se indexa para reconocer republicaciones de la misma vacante; sin él la
+    fila no se indexa. Con `fallback` (JSON de fallback_postprocess) la fila
+    queda marcada y no se indexa, así no se reutiliza.
+    `csv_filename` ya no tiene efecto y emite un DeprecationWarning.
+    """
+    if csv_filename is not None:
+        warnings.warn(
+            "guardar_en_dataframe ya no escribe csv_filename; genera el CSV con "
+            "`python src/jobs_store.py export --csv RUTA` o desde GET /export/jobs.csv.",
+            DeprecationWarning, stacklevel=2,
+        )
+    if source_text == "NA":
+        source_text = None
+    store = get_jobs_store()
+    with span("persist_jobs"):
+        job_row_id = store.append(custom_json, fallback=fallback, source_text=source_text)
+    print(f"Datos almacenados en {store.db_path}.")
+    # Import local: NumPy solo se carga al indexar
+    from dedup_index import dedup_enabled, get_duplicate_index
+    if dedup_enabled() and source_text and not fallback:
+        try:
+            with span("dedup_index"):
+                get_duplicate_index().add(job_row_id, source_text)
+        except Exception as e:
+            print(f"Error indexando la vacante para duplicados: {e}")
 
 def main():
+    # Import local: pipeline importa este módulo
+    from pipeline import StageTimer, optimize_vacancy
+
+    init()
     print("Iniciando el proceso de procesamiento de vacantes...")
     job_detail_url = "https://www.linkedin.com/jobs/view/4119032958"
     
-    vacancy_data = scrape_linkedin_vacancy_with_selenium(job_detail_url)
+    timer = StageTimer()
+    try:
+        with timer.stage("scrape"):
+            vacancy_data = scrape_linkedin_vacancy(job_detail_url)
+    finally:
+        print("Estadísticas del pool de Chrome:", get_driver_pool().stats())
+        shutdown_driver_pool()
     
     if vacancy_data is None:
         print("No se pudo extraer la información de la vacante. Se utilizarán datos dummy (todo NA).")
@@ -308,14 +744,14 @@ def main():
         print("Error al leer input_cv.txt:", e)
         cv_description = ""
 
-    if vacancy_data["Información del trabajo"] == "NA":
-        cv_es = cv_description
-        cv_en = cv_description
-    else:
-        cv_es, cv_en = optimize_cv_with_gemini(vacancy_data, cv_description)
-    
-    custom_json = build_custom_json(vacancy_data)
-    guardar_en_dataframe(custom_json)
+    outcome = {}
+    cv_es, cv_en, custom_json = optimize_vacancy(
+        vacancy_data, cv_description, timer=timer,
+        optimize=vacancy_data["Información del trabajo"] != "NA", outcome=outcome
+    )
+    with timer.stage("persist"):
+        guardar_en_dataframe(custom_json, source_text=vacancy_data["Información del trabajo"],
+                             fallback=outcome["postprocess_fallback"])
     
     job_title = clean_filename(vacancy_data["Título del puesto"])
     company_name = clean_filename(vacancy_data["Nombre de la empresa"])
@@ -336,5 +772,12 @@ def main():
     except Exception as e:
         print("Error al guardar los archivos:", e)
 
+    print("Tiempos por etapa (ms):", timer.as_dict())
+    print("Estadísticas de la caché de vacantes:", get_vacancy_cache().stats())
+    print("Estadísticas de la caché de Gemini:", get_llm_cache().stats())
+    print("Métricas por etapa:", metrics_summary())
+    print("Respaldos usados:", fallback_counts())
+    print("Postprocesamiento local:", postprocess_report())
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,138 @@
+"""Estructuración local de descripciones de vacantes por encabezados y viñetas.
+
+Produce el mismo JSON que postprocess_job_text (Información___del___trabajo,
+Responsabilidades, Requisitos y Beneficios) sin llamar a Gemini, junto con una
+confianza entre 0 y 1. Las secciones salen de los encabezados que prompt_budget
+ya reconoce en inglés y español ("Responsibilities", "Requisitos", "What we
+offer"...). Dentro de cada sección, cada viñeta o línea corta es un elemento.
+
+La confianza sube con lo que el parser reconoce: requisitos y responsabilidades
+con al menos MIN_ITEMS elementos, un resumen, y la parte del texto que cae bajo
+encabezados conocidos. Baja cuando tiene que adivinar, por ejemplo al partir
+párrafos en oraciones o al encontrar listas bajo encabezados desconocidos. Solo
+se llama a Gemini si la confianza queda por debajo de MIN_CONFIDENCE.
+"""
+import os
+import re
+
+import prompt_budget
+
+MIN_CONFIDENCE = float(os.getenv("POSTPROCESS_MIN_CONFIDENCE", "0.7"))
+INFO_MAX_WORDS = 200
+MIN_ITEMS = 2
+# Una línea más larga dentro de una lista es un párrafo, no un elemento
+ITEM_MAX_WORDS = 40
+# Una oración sin viñeta de al menos este largo en "About the role" o "Responsabilidades" va al resumen
+PROSE_MIN_WORDS = 12
+
+# Peso de cada señal en la confianza
+WEIGHTS = {"requirements": 0.4, "responsibilities": 0.3, "info": 0.15, "coverage": 0.15}
+GUESS_PENALTY = 0.85
+UNKNOWN_LIST_PENALTY = 0.9
+
+_BULLET = re.compile(r"^(?:[-–—•*·▪●◦‣►✓✔➢→]+|\d{1,2}[.)]|[a-z]\))\s*")
+_SENTENCE_END = re.compile(r"(?<=[.!?;])\s+")
+_LIST_KINDS = ("requirements", "responsibilities", "benefits")
+
+
+def parser_enabled():
+    return os.getenv("POSTPROCESS_PARSER", "1").lower() not in ("0", "false", "no")
+
+
+def _strip_bullet(line):
+    """(texto sin viñeta, tenía viñeta)."""
+    match = _BULLET.match(line)
+    if match and match.end():
+        return line[match.end():].strip(), True
+    return line.strip(), False
+
+
+def _unique(items):
+    seen = set()
+    result = []
+    for item in items:
+        key = item.lower().rstrip(".;:")
+        if key and key not in seen:
+            seen.add(key)
+            result.append(item)
+    return result
+
+
+def _truncate_words(text, max_words):
+    words = text.split()
+    if len(words) <= max_words:
+        return text
+    return " ".join(words[:max_words]).rstrip(",;:") + "…"
+
+
+class _Parse:
+    def __init__(self):
+        self.info = []
+        self.about = []
+        self.items = {kind: [] for kind in _LIST_KINDS}
+        self.guessed = 0
+        self.unknown_lists = 0
+        self.listed_chars = 0
+        self.total_chars = 0
+
+    def add_section(self, section):
+        kind = section["kind"]
+        lines = [line for line in section["lines"] if line.strip()]
+        size = sum(len(line) for line in lines)
+        if kind == "legal":
+            return
+        self.total_chars += size
+        if kind == "about":
+            self.about.extend(line.strip() for line in lines)
+            return
+        if kind not in _LIST_KINDS:
+            if any(_strip_bullet(line)[1] for line in lines) and kind == "other":
+                self.unknown_lists += 1
+            self.info.extend(_strip_bullet(line)[0] for line in lines)
+            return
+        self.listed_chars += size
+        for line in lines:
+            text, bulleted = _strip_bullet(line)
+            if not text:
+                continue
+            words = len(text.split())
+            if not bulleted and kind == "responsibilities" and words >= PROSE_MIN_WORDS and text.endswith("."):
+                self.info.append(text)
+            elif bulleted or words <= ITEM_MAX_WORDS or kind == "benefits":
+                self.items[kind].append(text)
+            else:
+                # Párrafo dentro de una lista: se parte en oraciones, pero es una suposición
+                self.guessed += 1
+                self.items[kind].extend(part.strip() for part in _SENTENCE_END.split(text) if part.strip())
+
+    def confidence(self):
+        score = 0.0
+        for kind in ("requirements", "responsibilities"):
+            count = len(_unique(self.items[kind]))
+            score += WEIGHTS[kind] * min(1.0, count / MIN_ITEMS)
+        if self.info or self.about:
+            score += WEIGHTS["info"]
+        if self.total_chars:
+            score += WEIGHTS["coverage"] * self.listed_chars / self.total_chars
+        score *= GUESS_PENALTY ** min(self.guessed, 2)
+        if self.unknown_lists:
+            score *= UNKNOWN_LIST_PENALTY
+        return round(score, 3)
+
+    def result(self):
+        info = " ".join(self.info or self.about).strip()
+        benefits = _unique(self.items["benefits"])
+        return {
+            "Información___del___trabajo": _truncate_words(info, INFO_MAX_WORDS) if info else None,
+            "Responsabilidades": _unique(self.items["responsibilities"]) or None,
+            "Requisitos": _unique(self.items["requirements"]) or None,
+            "Beneficios": "; ".join(item.rstrip(".;") for item in benefits) if benefits else None,
+        }
+
+
+def parse_job_text(raw_text):
+    """Estructura la descripción sin Gemini. Retorna (JSON de postprocess_job_text, confianza 0-1)."""
+    parse = _Parse()
+    for section in prompt_budget.split_job_sections(raw_text or ""):
+        parse.add_section(section)
+    return parse.result(), parse.confidence()
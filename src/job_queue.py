@@ -0,0 +1,331 @@
+import os
+import json
+import time
+import uuid
+import queue
+import threading
+
+# Estados por los que pasa un trabajo de optimización
+QUEUED = "queued"
+SCRAPING = "scraping"
+OPTIMIZING = "optimizing"
+DONE = "done"
+FAILED = "failed"
+FINAL_STATES = (DONE, FAILED)
+
+
+class QueueFullError(Exception):
+    """La cola alcanzó su máximo de trabajos pendientes."""
+
+
+class JobBackend:
+    """Interfaz de almacenamiento y cola de trabajos.
+
+    Un backend guarda el estado de cada trabajo como un diccionario plano con un
+    campo `version` que aumenta en cada cambio, una lista de eventos por trabajo
+    (p. ej. fragmentos del CV en streaming) y una cola FIFO de IDs.
+    """
+
+    def create(self, job_id, payload):
+        raise NotImplementedError
+
+    def update(self, job_id, **fields):
+        raise NotImplementedError
+
+    def get(self, job_id):
+        raise NotImplementedError
+
+    def enqueue(self, job_id):
+        raise NotImplementedError
+
+    def dequeue(self, timeout):
+        """Retorna el siguiente ID de la cola o None si no llegó ninguno en `timeout` segundos."""
+        raise NotImplementedError
+
+    def pending(self):
+        raise NotImplementedError
+
+    def append_event(self, job_id, event):
+        raise NotImplementedError
+
+    def get_events(self, job_id, start):
+        """Retorna los eventos del trabajo a partir de la posición `start`."""
+        raise NotImplementedError
+
+    def wait_for_change(self, job_id, version, event_count, timeout):
+        """Bloquea hasta que cambie el estado o lleguen eventos nuevos, o venza el timeout."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            job = self.get(job_id)
+            if job is None or job["version"] > version or job["events"] > event_count:
+                return job
+            time.sleep(0.1)
+        return self.get(job_id)
+
+
+class InMemoryJobBackend(JobBackend):
+    """Backend local en proceso; los trabajos terminados se descartan tras `ttl` segundos."""
+
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+        self._jobs = {}
+        self._events = {}
+        self._queue = queue.Queue()
+        self._changed = threading.Condition()
+
+    def _prune(self):
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job["status"] in FINAL_STATES and now - job["updated_at"] > self.ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+            self._events.pop(job_id, None)
+
+    def create(self, job_id, payload):
+        now = time.time()
+        with self._changed:
+            self._prune()
+            self._jobs[job_id] = {
+                "id": job_id,
+                "status": QUEUED,
+                "payload": payload,
+                "result": None,
+                "error": None,
+                "created_at": now,
+                "updated_at": now,
+                "version": 0,
+                "events": 0,
+            }
+            self._events[job_id] = []
+
+    def update(self, job_id, **fields):
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            job["updated_at"] = time.time()
+            job["version"] += 1
+            self._changed.notify_all()
+
+    def get(self, job_id):
+        with self._changed:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def enqueue(self, job_id):
+        self._queue.put(job_id)
+
+    def dequeue(self, timeout):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def append_event(self, job_id, event):
+        with self._changed:
+            events = self._events.get(job_id)
+            if events is None:
+                return
+            events.append(event)
+            self._jobs[job_id]["events"] = len(events)
+            self._changed.notify_all()
+
+    def get_events(self, job_id, start):
+        with self._changed:
+            return list(self._events.get(job_id, [])[start:])
+
+    def wait_for_change(self, job_id, version, event_count, timeout):
+        def changed():
+            job = self._jobs.get(job_id)
+            return job is None or job["version"] > version or job["events"] > event_count
+
+        with self._changed:
+            self._changed.wait_for(changed, timeout=timeout)
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+
+class RedisJobBackend(JobBackend):
+    """Backend sobre cualquier cliente con la API de redis-py (Redis, Valkey, fakeredis...)."""
+
+    def __init__(self, client, prefix="cv_optimizer:jobs", ttl=3600):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def _key(self, job_id):
+        return f"{self.prefix}:{job_id}"
+
+    def create(self, job_id, payload):
+        now = time.time()
+        key = self._key(job_id)
+        self.client.hset(key, mapping={
+            "id": job_id,
+            "status": QUEUED,
+            "payload": json.dumps(payload, ensure_ascii=False),
+            "result": "null",
+            "error": "",
+            "created_at": now,
+            "updated_at": now,
+            "version": 0,
+        })
+        self.client.expire(key, self.ttl)
+        self.client.delete(f"{key}:events")
+
+    def update(self, job_id, **fields):
+        key = self._key(job_id)
+        mapping = {"updated_at": time.time()}
+        for name, value in fields.items():
+            if name in ("payload", "result"):
+                value = json.dumps(value, ensure_ascii=False)
+            elif value is None:
+                value = ""
+            mapping[name] = value
+        from redis.exceptions import WatchError
+
+        # WATCH + EXISTS: un HSET sobre un trabajo ya expirado crearía un hash parcial sin `id`
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    if not pipe.exists(key):
+                        return
+                    pipe.multi()
+                    pipe.hset(key, mapping=mapping)
+                    pipe.hincrby(key, "version", 1)
+                    pipe.expire(key, self.ttl)
+                    pipe.execute()
+                    return
+                except WatchError:
+                    continue
+
+    def get(self, job_id):
+        raw = self.client.hgetall(self._key(job_id))
+        if not raw:
+            return None
+        job = {(k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+               for k, v in raw.items()}
+        if "id" not in job:
+            # Hash parcial (p. ej. escrito por una versión anterior tras expirar el trabajo)
+            return None
+        return {
+            "id": job["id"],
+            "status": job["status"],
+            "payload": json.loads(job["payload"]),
+            "result": json.loads(job["result"]),
+            "error": job["error"] or None,
+            "created_at": float(job["created_at"]),
+            "updated_at": float(job["updated_at"]),
+            "version": int(job["version"]),
+            "events": self.client.llen(f"{self._key(job_id)}:events"),
+        }
+
+    def enqueue(self, job_id):
+        self.client.lpush(f"{self.prefix}:queue", job_id)
+
+    def dequeue(self, timeout):
+        item = self.client.brpop(f"{self.prefix}:queue", timeout=max(1, int(timeout)))
+        if item is None:
+            return None
+        job_id = item[1]
+        return job_id.decode() if isinstance(job_id, bytes) else job_id
+
+    def pending(self):
+        return self.client.llen(f"{self.prefix}:queue")
+
+    def append_event(self, job_id, event):
+        key = f"{self._key(job_id)}:events"
+        pipe = self.client.pipeline()
+        pipe.rpush(key, json.dumps(event, ensure_ascii=False))
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def get_events(self, job_id, start):
+        return [json.loads(item) for item in self.client.lrange(f"{self._key(job_id)}:events", start, -1)]
+
+
+class JobContext:
+    """Lo que recibe el handler para informar el avance de su trabajo."""
+
+    def __init__(self, backend, job_id):
+        self.backend = backend
+        self.job_id = job_id
+
+    def set_status(self, status):
+        self.backend.update(self.job_id, status=status)
+
+    def emit(self, event_type, data):
+        self.backend.append_event(self.job_id, {"type": event_type, "data": data})
+
+
+class JobQueue:
+    """Cola de trabajos con un número acotado de workers en hilos."""
+
+    def __init__(self, handler, backend=None, workers=2, max_pending=100):
+        self.handler = handler
+        self.backend = backend or InMemoryJobBackend()
+        self.workers = workers
+        self.max_pending = max_pending
+        self._threads = []
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+
+    def submit(self, payload):
+        """Encola un trabajo y retorna su ID inmediatamente."""
+        if self.backend.pending() >= self.max_pending:
+            raise QueueFullError("Hay demasiados trabajos en cola, intenta de nuevo en unos minutos")
+        self.start()
+        job_id = uuid.uuid4().hex
+        self.backend.create(job_id, payload)
+        self.backend.enqueue(job_id)
+        return job_id
+
+    def get(self, job_id):
+        return self.backend.get(job_id)
+
+    def wait_for_change(self, job_id, version, event_count, timeout=15):
+        return self.backend.wait_for_change(job_id, version, event_count, timeout)
+
+    def get_events(self, job_id, start):
+        return self.backend.get_events(job_id, start)
+
+    def _worker(self):
+        while not self._stop.is_set():
+            job_id = self.backend.dequeue(timeout=1)
+            if job_id is None:
+                continue
+            job = self.backend.get(job_id)
+            if job is None:
+                continue
+
+            try:
+                result = self.handler(job["payload"], JobContext(self.backend, job_id))
+                self.backend.update(job_id, status=DONE, result=result)
+            except Exception as e:
+                print(f"Error procesando el trabajo {job_id}: {e}")
+                self.backend.update(job_id, status=FAILED, error=str(e))
+
+
+def create_backend():
+    """Elige el backend según JOB_BACKEND: 'memory' (por defecto) o 'redis' con JOB_REDIS_URL."""
+    if os.getenv("JOB_BACKEND", "memory") == "redis":
+        import redis
+        client = redis.Redis.from_url(os.getenv("JOB_REDIS_URL", "redis://localhost:6379/0"))
+        return RedisJobBackend(client)
+    return InMemoryJobBackend()
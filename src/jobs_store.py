@@ -0,0 +1,284 @@
+"""Almacén append-only de vacantes procesadas (reemplaza la reescritura de jobs.CSV).
+
+Uso:
+    python src/jobs_store.py migrate [--csv data/processed/jobs.CSV]
+    python src/jobs_store.py export  [--csv data/processed/jobs.CSV]
+"""
+import os
+import csv
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import datetime
+import threading
+
+from vacancy_cache import extract_job_id
+from store_query import build_where, page_limit, paginate
+
+DEFAULT_DB_PATH = "data/processed/jobs.sqlite3"
+DEFAULT_CSV_PATH = "data/processed/jobs.CSV"
+
+# Columnas indexadas que se devuelven por defecto en las consultas
+SUMMARY_COLUMNS = ("id", "fecha", "enlace", "empresa", "titulo")
+QUERY_COLUMNS = {"id": "id", "company": "empresa", "title": "titulo", "date": "fecha",
+                 "job_id": "job_id", "url": "enlace"}
+
+# Orden de columnas de build_custom_json, el mismo que tenía jobs.CSV
+JOB_FIELDS = [
+    "Fecha___de___la___solicitud",
+    "Enlace___de___la___vacante",
+    "Idioma___de___la___publicación",
+    "Título___del___puesto",
+    "Nombre___de___la___empresa",
+    "Nombre___del___reclutador",
+    "Correo___electrónico",
+    "WhatsApp",
+    "Información___del___trabajo",
+    "Responsabilidades",
+    "Requisitos",
+    "Salario",
+    "Horario___laboral",
+    "Modalidad___de___trabajo",
+    "Ubicación",
+    "Beneficios",
+]
+
+
+def _iso_date(fecha):
+    """Convierte 'dd-mm-YYYY' a 'YYYY-mm-dd' para poder indexar y ordenar por fecha."""
+    try:
+        return datetime.datetime.strptime(fecha, "%d-%m-%Y").strftime("%Y-%m-%d")
+    except (TypeError, ValueError):
+        return None
+
+
+def _csv_value(value):
+    # Mismo formato que escribía pandas.to_csv: None vacío, listas con repr de Python
+    if value is None:
+        return ""
+    return str(value)
+
+
+class JobsStore:
+    """Vacantes en SQLite (modo WAL): inserciones O(1) y escritores concurrentes seguros."""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        conn = self._connection()
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                fecha TEXT,
+                enlace TEXT,
+                empresa TEXT,
+                titulo TEXT,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_enlace ON jobs(enlace);
+            CREATE INDEX IF NOT EXISTS idx_jobs_fecha ON jobs(fecha);
+            CREATE TABLE IF NOT EXISTS migrations (
+                name TEXT PRIMARY KEY,
+                applied_at REAL NOT NULL
+            );
+            """
+        )
+        self._upgrade_schema(conn)
+
+    def _upgrade_schema(self, conn):
+        """Agrega job_id e índices sin distinción de mayúsculas a bases creadas antes de las consultas."""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if "job_id" not in columns:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("ALTER TABLE jobs ADD COLUMN job_id TEXT")
+                rows = conn.execute("SELECT id, enlace FROM jobs").fetchall()
+                conn.executemany("UPDATE jobs SET job_id = ? WHERE id = ?",
+                                 [(extract_job_id(enlace), row_id) for row_id, enlace in rows])
+                conn.execute("COMMIT")
+            except sqlite3.OperationalError:
+                # Otro proceso agregó la columna primero
+                conn.execute("ROLLBACK")
+        if "fallback" not in columns:
+            # 1 si el JSON salió de fallback_postprocess: esas filas no se reutilizan como republicación
+            try:
+                conn.execute("ALTER TABLE jobs ADD COLUMN fallback INTEGER NOT NULL DEFAULT 0")
+            except sqlite3.OperationalError:
+                pass
+        if "source_text" not in columns:
+            # Descripción scrapeada tal cual: el índice de republicaciones la necesita para reindexar
+            try:
+                conn.execute("ALTER TABLE jobs ADD COLUMN source_text TEXT")
+            except sqlite3.OperationalError:
+                pass
+        conn.executescript(
+            """
+            DROP INDEX IF EXISTS idx_jobs_empresa;
+            CREATE INDEX IF NOT EXISTS idx_jobs_empresa_nocase ON jobs(empresa COLLATE NOCASE);
+            CREATE INDEX IF NOT EXISTS idx_jobs_titulo_nocase ON jobs(titulo COLLATE NOCASE);
+            CREATE INDEX IF NOT EXISTS idx_jobs_job_id ON jobs(job_id);
+            """
+        )
+
+    def _connection(self):
+        # Una conexión por hilo; SQLite serializa a los escritores con su propio lock
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, custom_json, fallback=False, source_text=None):
+        """Inserta una vacante y retorna su id.
+
+        `fallback` marca un JSON de respaldo; `source_text` es la descripción
+        scrapeada de la que salió el JSON.
+        """
+        cursor = self._connection().execute(
+            """INSERT INTO jobs (fecha, enlace, job_id, empresa, titulo, data, created_at, fallback, source_text)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (
+                _iso_date(custom_json.get("Fecha___de___la___solicitud")),
+                custom_json.get("Enlace___de___la___vacante"),
+                extract_job_id(custom_json.get("Enlace___de___la___vacante")),
+                custom_json.get("Nombre___de___la___empresa"),
+                custom_json.get("Título___del___puesto"),
+                json.dumps(custom_json, ensure_ascii=False),
+                time.time(),
+                int(bool(fallback)),
+                source_text,
+            ),
+        )
+        return cursor.lastrowid
+
+    def count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def query(self, company=None, title=None, date_from=None, date_to=None, url=None,
+              cursor=None, limit=None, fields=None):
+        """Lista vacantes de la más reciente a la más antigua, filtradas por índice.
+
+        Por defecto solo devuelve las columnas indexadas; `fields` agrega claves
+        del JSON completo de la vacante. Retorna {"items": [...], "next_cursor": ...}.
+        """
+        limit = page_limit(limit)
+        where, params = build_where(QUERY_COLUMNS, company=company, title=title, date_from=date_from,
+                                    date_to=date_to, url=url, cursor=cursor)
+        select = ", ".join(SUMMARY_COLUMNS) + (", data" if fields else "")
+        rows = self._connection().execute(
+            f"SELECT {select} FROM jobs{where} ORDER BY id DESC LIMIT ?", params + [limit + 1]
+        ).fetchall()
+        rows, next_cursor = paginate(rows, limit)
+        items = []
+        for row in rows:
+            item = dict(zip(SUMMARY_COLUMNS, row))
+            if fields:
+                data = json.loads(row[len(SUMMARY_COLUMNS)])
+                item.update({field: data.get(field) for field in fields})
+            items.append(item)
+        return {"items": items, "next_cursor": next_cursor}
+
+    def get(self, job_row_id):
+        """Retorna el JSON completo de una vacante por id, o None."""
+        row = self._connection().execute("SELECT data FROM jobs WHERE id = ?", (job_row_id,)).fetchone()
+        if row is None:
+            return None
+        return dict(json.loads(row[0]), id=job_row_id)
+
+    def iter_rows(self, batch_size=500):
+        """Recorre todas las vacantes en orden de inserción sin cargarlas a la vez en memoria."""
+        last_id = 0
+        conn = self._connection()
+        while True:
+            rows = conn.execute(
+                "SELECT id, data FROM jobs WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size)
+            ).fetchall()
+            if not rows:
+                return
+            for row_id, data in rows:
+                yield json.loads(data)
+            last_id = rows[-1][0]
+
+    def export_csv(self, csv_path=DEFAULT_CSV_PATH):
+        """Genera el CSV con el mismo formato que producía guardar_en_dataframe."""
+        fields = list(JOB_FIELDS)
+        for row in self.iter_rows():
+            for key in row:
+                if key not in fields:
+                    fields.append(key)
+        tmp_path = f"{csv_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(fields)
+            for row in self.iter_rows():
+                writer.writerow([_csv_value(row.get(field)) for field in fields])
+        os.replace(tmp_path, csv_path)
+        return csv_path
+
+    def migrate_csv(self, csv_path=DEFAULT_CSV_PATH):
+        """Importa una sola vez el jobs.CSV existente. Retorna las filas importadas."""
+        name = f"csv:{os.path.abspath(csv_path)}"
+        conn = self._connection()
+        if conn.execute("SELECT 1 FROM migrations WHERE name = ?", (name,)).fetchone():
+            return 0
+        if not os.path.exists(csv_path):
+            return 0
+        imported = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Otro proceso pudo completar la migración mientras esperábamos el lock
+            if conn.execute("SELECT 1 FROM migrations WHERE name = ?", (name,)).fetchone():
+                conn.execute("ROLLBACK")
+                return 0
+            with open(csv_path, "r", encoding="utf-8", newline="") as f:
+                for record in csv.DictReader(f):
+                    self.append({key: (value if value != "" else None) for key, value in record.items()})
+                    imported += 1
+            conn.execute("INSERT INTO migrations (name, applied_at) VALUES (?, ?)", (name, time.time()))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        print(f"Migradas {imported} vacantes desde {csv_path} a {self.db_path}.")
+        return imported
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_jobs_store():
+    """Devuelve el almacén compartido; en el primer uso importa el jobs.CSV heredado."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = JobsStore(os.getenv("JOBS_DB_PATH", DEFAULT_DB_PATH))
+            _store.migrate_csv(os.getenv("JOBS_CSV_PATH", DEFAULT_CSV_PATH))
+        return _store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migración y exportación del almacén de vacantes.")
+    parser.add_argument("command", choices=["migrate", "export"])
+    parser.add_argument("--db", default=os.getenv("JOBS_DB_PATH", DEFAULT_DB_PATH))
+    parser.add_argument("--csv", default=os.getenv("JOBS_CSV_PATH", DEFAULT_CSV_PATH))
+    args = parser.parse_args(argv)
+
+    store = JobsStore(args.db)
+    if args.command == "migrate":
+        store.migrate_csv(args.csv)
+    else:
+        store.export_csv(args.csv)
+        print(f"Exportadas {store.count()} vacantes a {args.csv}.")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+import os
+import re
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup
+
+from skill_taxonomy import extract_skills
+
+HTTP_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/122.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9,es;q=0.8",
+}
+
+# Máximo de habilidades en "Palabras clave"
+KEYWORDS_LIMIT = int(os.getenv("KEYWORDS_LIMIT", "15"))
+# Formato dentro de una línea; el resto de etiquetas (li, p, br, ul...) separa líneas
+_INLINE_TAGS = ("a", "b", "strong", "em", "i", "u", "span", "code", "mark", "small", "sub", "sup")
+_BLANK_RUNS = re.compile(r"\n{3,}")
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """Devuelve una sesión HTTP compartida con pool de conexiones y reintentos."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            pool_size = int(os.getenv("HTTP_POOL_SIZE", "10"))
+            retry = Retry(total=2, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                          allowed_methods=("GET",))
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+            session = requests.Session()
+            session.headers.update(HTTP_HEADERS)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def _extract_keywords(description, requirements):
+    """Habilidades de la taxonomía mencionadas en la vacante, las más frecuentes primero."""
+    text = "\n".join(part for part in (description, requirements) if part and part != "NA")
+    return extract_skills(text, limit=KEYWORDS_LIMIT) if text else []
+
+
+def element_text(element):
+    """Texto de un elemento con una línea por bloque (encabezado, viñeta, párrafo).
+
+    En el HTML minificado de LinkedIn no hay espacios entre etiquetas, así que
+    get_text() sin separador pegaría "Responsibilities" con la primera viñeta.
+    Las etiquetas de formato se quitan antes para no partir una oración en
+    líneas sueltas, y las líneas en blanco seguidas se reducen a una.
+    """
+    for tag in element.find_all(_INLINE_TAGS):
+        tag.unwrap()
+    element.smooth()
+    lines = (" ".join(line.split()) for line in element.get_text("\n").splitlines())
+    return _BLANK_RUNS.sub("\n\n", "\n".join(lines)).strip()
+
+
+def parse_vacancy_html(html, job_detail_url):
+    """Convierte el HTML público de una vacante de LinkedIn en el diccionario vacancy_data."""
+    soup = BeautifulSoup(html, "html.parser")
+
+    title_element = soup.find("h1")
+    title = title_element.get_text().strip() if title_element else "NA"
+
+    company_element = soup.find("a", {"data-tracking-control-name": "public_jobs_topcard-org-name"})
+    company_name = company_element.get_text().strip() if company_element else "NA"
+
+    description_element = soup.find("div", class_="description__text")
+    description = element_text(description_element) if description_element else "NA"
+
+    requirements = "NA"
+    criteria_elements = soup.select(".description__job-criteria-list li")
+    if criteria_elements:
+        req_list = []
+        for criteria in criteria_elements:
+            header = criteria.find(class_="description__job-criteria-subheader")
+            text_el = criteria.find(class_="description__job-criteria-text")
+            if header and text_el:
+                req_list.append(f"{element_text(header)}: {element_text(text_el)}")
+        if req_list:
+            requirements = "\n- " + "\n- ".join(req_list)
+
+    return {
+        "Título del puesto": title,
+        "Enlace de la vacante": job_detail_url,
+        "Nombre de la empresa": company_name,
+        "Información del trabajo": description,
+        "Requisitos": requirements,
+        "Palabras clave": _extract_keywords(description, requirements),
+        "Nombre del reclutador": "NA",
+        "Correo electrónico": "NA",
+        "WhatsApp": "NA",
+        "Salario": "NA",
+        "Horario laboral": "Tiempo completo",
+        "Modalidad de trabajo": "Remoto",
+        "Ubicación": "NA",
+        "Beneficios": "NA"
+    }
+
+
+def has_required_fields(vacancy_data):
+    """Indica si el HTML traía el título y la descripción de la vacante."""
+    return (
+        vacancy_data is not None
+        and vacancy_data["Título del puesto"] != "NA"
+        and vacancy_data["Información del trabajo"] != "NA"
+    )
+
+
+def scrape_linkedin_vacancy_with_http(job_detail_url, timeout=10):
+    """Extrae la vacante sin navegador. Retorna None si faltan elementos obligatorios."""
+    print("Extrayendo información de la vacante vía HTTP...")
+    try:
+        response = get_http_session().get(job_detail_url, timeout=timeout)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        print("Error descargando la vacante vía HTTP:", e)
+        return None
+    vacancy_data = parse_vacancy_html(response.text, job_detail_url)
+    if not has_required_fields(vacancy_data):
+        print("El HTML no contiene los elementos obligatorios de la vacante.")
+        return None
+    return vacancy_data
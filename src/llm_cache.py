@@ -0,0 +1,46 @@
+import os
+import hashlib
+import threading
+
+from bounded_cache import BoundedTextCache
+
+
+def make_cache_key(model_name, template_version, prompt):
+    """Hash SHA-256 de (modelo, versión de plantilla, prompt renderizado)."""
+    digest = hashlib.sha256()
+    for part in (model_name, template_version, prompt):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class LLMResponseCache(BoundedTextCache):
+    """Caché direccionada por contenido para respuestas de Gemini: memoria + SQLite, acotada por bytes."""
+
+    table = "responses"
+    value_column = "response"
+    extra_columns = ("model", "template_version")
+
+    def __init__(self, db_path="data/cache/llm_cache.sqlite3", memory_max_bytes=16 * 1024 * 1024,
+                 disk_max_bytes=256 * 1024 * 1024):
+        super().__init__(db_path, memory_max_bytes, disk_max_bytes)
+
+    def put(self, key, text, model_name="", template_version=""):
+        self._put(key, text, (model_name, template_version))
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Devuelve la caché de respuestas compartida del proceso, configurada por variables de entorno."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache(
+                db_path=os.getenv("LLM_CACHE_PATH", "data/cache/llm_cache.sqlite3"),
+                memory_max_bytes=int(os.getenv("LLM_CACHE_MEMORY_BYTES", str(16 * 1024 * 1024))),
+                disk_max_bytes=int(os.getenv("LLM_CACHE_DISK_BYTES", str(256 * 1024 * 1024))),
+            )
+        return _cache
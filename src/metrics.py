@@ -0,0 +1,252 @@
+"""Métricas del pipeline en memoria con exportación en formato de texto de Prometheus.
+
+Flask las publica en GET /metrics; la CLI y Streamlit usan el mismo registro del
+proceso (`summary()` o `write_textfile()`). Los contadores son por proceso: con
+varios workers cada uno expone los suyos.
+"""
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if value != float("inf") else "+Inf"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} espera las etiquetas {self.labelnames}, recibió {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def values(self):
+        with self._lock:
+            return dict(self._values)
+
+    def _samples(self):
+        values = self.values()
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self):
+        with self._lock:
+            return {key: {"counts": list(series["counts"]), "sum": series["sum"], "count": series["count"]}
+                    for key, series in self._series.items()}
+
+    def _samples(self):
+        lines = []
+        for key, series in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series["counts"]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, extra=[("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series['sum'])}")
+            lines.append(f"{self.name}_count{labels} {series['count']}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            # Reimportar un módulo no debe duplicar métricas
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "cv_optimizer_stage_duration_seconds", "Duración de cada etapa del pipeline.", ["stage"]))
+STAGE_ERRORS = REGISTRY.register(Counter(
+    "cv_optimizer_stage_errors_total", "Etapas que terminaron con una excepción.", ["stage"]))
+FALLBACKS = REGISTRY.register(Counter(
+    "cv_optimizer_fallbacks_total", "Resultados de respaldo entregados en lugar de la respuesta de Gemini.",
+    ["kind"]))
+GEMINI_TTFT_SECONDS = REGISTRY.register(Histogram(
+    "cv_optimizer_gemini_ttft_seconds", "Tiempo hasta el primer fragmento de Gemini en streaming.", ["stage"]))
+GEMINI_REQUESTS = REGISTRY.register(Counter(
+    "cv_optimizer_gemini_requests_total",
+    ("Llamadas a Gemini por resultado: ok, recovered (ok tras reintentos), failed, rejected "
+     "(circuito abierto) o abandoned (stream cerrado por el consumidor)."),
+    ["stage", "outcome"]))
+GEMINI_RETRIES = REGISTRY.register(Counter(
+    "cv_optimizer_gemini_retries_total", "Reintentos de llamadas a Gemini por motivo.", ["stage", "reason"]))
+GEMINI_CIRCUIT_OPENED = REGISTRY.register(Counter(
+    "cv_optimizer_gemini_circuit_opened_total", "Veces que se abrió el circuito de Gemini."))
+REPOST_LOOKUPS = REGISTRY.register(Counter(
+    "cv_optimizer_repost_lookups_total",
+    "Búsquedas de republicaciones: full (JSON y CVs reutilizados), json (solo el JSON) o miss.", ["outcome"]))
+POSTPROCESS_SOURCE = REGISTRY.register(Counter(
+    "cv_optimizer_postprocess_total",
+    "Descripciones estructuradas por el parser local (parser) o enviadas a Gemini (gemini).", ["source"]))
+PROMPT_TOKENS = REGISTRY.register(Histogram(
+    "cv_optimizer_prompt_tokens", "Tokens estimados de cada prompt antes (before) y después (after) de compactarlo.",
+    ["stage", "phase"], buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000)))
+
+
+@contextmanager
+def span(stage):
+    """Mide un bloque y lo registra en el histograma de etapas; cuenta las excepciones."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+def record_fallback(kind):
+    FALLBACKS.inc(kind=kind)
+
+
+def render_latest():
+    """Texto para GET /metrics (formato de exposición 0.0.4 de Prometheus)."""
+    return REGISTRY.render()
+
+
+def _bucket_quantile(buckets, counts, total, q):
+    # Cota superior del bucket que contiene el cuantil
+    target = q * total
+    cumulative = 0
+    for bound, count in zip(buckets + (float("inf"),), counts):
+        cumulative += count
+        if cumulative >= target:
+            return bound
+    return float("inf")
+
+
+def summary():
+    """Resumen legible por etapa: {etapa: {count, mean_ms, p95_ms}} (p95 aproximado por bucket)."""
+    result = {}
+    for (stage,), series in sorted(STAGE_SECONDS.snapshot().items()):
+        count = series["count"]
+        p95 = _bucket_quantile(STAGE_SECONDS.buckets, series["counts"], count, 0.95)
+        result[stage] = {
+            "count": count,
+            "mean_ms": round(series["sum"] / count * 1000, 1) if count else 0.0,
+            "p95_ms": round(p95 * 1000, 1) if p95 != float("inf") else None,
+            "errors": STAGE_ERRORS.value(stage=stage),
+        }
+    return result
+
+
+def fallback_counts():
+    return {key[0]: value for key, value in FALLBACKS.values().items()}
+
+
+def postprocess_report():
+    """Llamadas de postprocesamiento que evitó el parser local y latencia ahorrada estimada.
+
+    El ahorro usa la latencia media observada de gemini_postprocess en este proceso.
+    """
+    parsed = POSTPROCESS_SOURCE.value(source="parser")
+    sent = POSTPROCESS_SOURCE.value(source="gemini")
+    stages = STAGE_SECONDS.snapshot()
+
+    def mean_ms(stage):
+        series = stages.get((stage,))
+        return series["sum"] / series["count"] * 1000 if series and series["count"] else None
+
+    gemini_ms, parser_ms = mean_ms("gemini_postprocess"), mean_ms("postprocess_parser")
+    saved_ms = parsed * (gemini_ms - (parser_ms or 0.0)) if gemini_ms is not None else None
+    return {
+        "parser": parsed,
+        "gemini": sent,
+        "avoided_share": round(parsed / (parsed + sent), 3) if parsed + sent else 0.0,
+        "parser_mean_ms": round(parser_ms, 2) if parser_ms is not None else None,
+        "gemini_mean_ms": round(gemini_ms, 1) if gemini_ms is not None else None,
+        "estimated_saved_ms": round(saved_ms, 1) if saved_ms is not None else None,
+    }
+
+
+def write_textfile(path):
+    """Escribe las métricas en un archivo (p. ej. para el textfile collector de node_exporter)."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render_latest())
+    os.replace(tmp_path, path)
@@ -0,0 +1,179 @@
+"""Extracción de texto de PDFs repartida por páginas en un pool de procesos.
+
+Los PDFs cortos se leen en el propio proceso; a partir de `PDF_PARALLEL_MIN_PAGES`
+las páginas se dividen en tramos contiguos que procesan los workers. Las páginas
+sin capa de texto (escaneos, imágenes) se detectan por sus recursos y se saltan
+sin llamar a extract_text.
+"""
+import io
+import os
+import time
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+import PyPDF2
+
+MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "40"))
+TIME_BUDGET = float(os.getenv("PDF_TIME_BUDGET", "10"))
+PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "8"))
+WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _default_start_method():
+    # fork copia los locks de los hilos que ya existen (workers de la cola, pool de Chrome,
+    # executor del pipeline) y un worker puede quedar bloqueado; forkserver parte de un proceso limpio
+    methods = multiprocessing.get_all_start_methods()
+    return "forkserver" if "forkserver" in methods else "spawn"
+
+
+def get_pdf_executor():
+    """Pool de procesos compartido; se crea en el primer PDF largo.
+
+    Los workers arrancan con forkserver (spawn donde no existe), no con fork;
+    PDF_POOL_START_METHOD elige otro método.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            start_method = os.getenv("PDF_POOL_START_METHOD") or _default_start_method()
+            context = multiprocessing.get_context(start_method)
+            if start_method == "forkserver":
+                # El servidor precarga este módulo (y PyPDF2), no __main__: importar app.py
+                # ahí volvería a lanzar su warm-up
+                context.set_forkserver_preload([__name__])
+            _executor = ProcessPoolExecutor(max_workers=max(1, WORKERS), mp_context=context)
+        return _executor
+
+
+def warm_up_pdf_executor():
+    """Arranca los workers antes de la primera subida para no pagar su inicio en una petición."""
+    executor = get_pdf_executor()
+    for future in [executor.submit(os.getpid) for _ in range(max(1, WORKERS))]:
+        future.result()
+
+
+def shutdown_pdf_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+atexit.register(shutdown_pdf_executor)
+
+
+def has_text_layer(page):
+    """True si la página (o alguno de sus formularios XObject) declara fuentes."""
+    return _resources_have_fonts(page.get("/Resources"), depth=0)
+
+
+def _resources_have_fonts(resources, depth):
+    if resources is None or depth > 3:
+        return False
+    resources = resources.get_object()
+    fonts = resources.get("/Font")
+    if fonts is not None and len(fonts.get_object()) > 0:
+        return True
+    xobjects = resources.get("/XObject")
+    if xobjects is None:
+        return False
+    for xobject in xobjects.get_object().values():
+        xobject = xobject.get_object()
+        if xobject.get("/Subtype") == "/Form" and _resources_have_fonts(xobject.get("/Resources"), depth + 1):
+            return True
+    return False
+
+
+def _page_text(page):
+    if not has_text_layer(page):
+        return None
+    text = page.extract_text()
+    return text if text and text.strip() else None
+
+
+def _open_reader(document):
+    # Ruta en disco o bytes del archivo subido
+    if isinstance(document, (bytes, bytearray)):
+        return PyPDF2.PdfReader(io.BytesIO(document))
+    return PyPDF2.PdfReader(document)
+
+
+def _extract_range(document, first, last):
+    """Se ejecuta en un worker: retorna [(número de página, texto)] del tramo [first, last)."""
+    reader = _open_reader(document)
+    pages = []
+    for number in range(first, last):
+        text = _page_text(reader.pages[number])
+        if text is not None:
+            pages.append((number, text))
+    return pages
+
+
+def _read_document(source):
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    source.seek(0)
+    return source.read()
+
+
+def iter_pdf_pages(source, max_pages=None, time_budget=None, outcome=None):
+    """Genera (número de página, texto) en orden, omitiendo páginas sin texto.
+
+    `source` es una ruta o un stream. Solo se leen las primeras `max_pages`
+    páginas; al agotarse `time_budget` (segundos) se dejan de entregar páginas
+    y se cancelan los tramos que aún no empezaron. Si se pasa `outcome` (dict),
+    se completa con `pages`, `read_pages`, `truncated` y `timed_out`.
+    """
+    outcome = {} if outcome is None else outcome
+    outcome["timed_out"] = False
+    max_pages = MAX_PAGES if max_pages is None else max_pages
+    time_budget = TIME_BUDGET if time_budget is None else time_budget
+    deadline = time.monotonic() + time_budget
+    document = _read_document(source)
+    reader = _open_reader(document)
+    total = len(reader.pages)
+    page_count = min(total, max_pages) if max_pages > 0 else total
+    outcome["pages"] = total
+    outcome["read_pages"] = page_count
+    outcome["truncated"] = page_count < total
+    if outcome["truncated"]:
+        print(f"Advertencia: PDF de {total} páginas; solo se extraen las primeras {page_count} (PDF_MAX_PAGES).")
+
+    if page_count < PARALLEL_MIN_PAGES or WORKERS <= 1:
+        for number in range(page_count):
+            if time.monotonic() > deadline:
+                print(f"Tiempo agotado extrayendo el PDF en la página {number + 1} de {page_count}.")
+                outcome["timed_out"] = True
+                return
+            text = _page_text(reader.pages[number])
+            if text is not None:
+                yield number, text
+        return
+
+    chunk = -(-page_count // WORKERS)
+    executor = get_pdf_executor()
+    futures = [executor.submit(_extract_range, document, first, min(first + chunk, page_count))
+               for first in range(0, page_count, chunk)]
+    try:
+        for i, future in enumerate(futures):
+            try:
+                pages = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                print(f"Tiempo agotado extrayendo el PDF en la página {i * chunk + 1} de {page_count}.")
+                outcome["timed_out"] = True
+                return
+            yield from pages
+    finally:
+        # Los tramos en curso terminan en segundo plano; los pendientes se descartan
+        for future in futures:
+            future.cancel()
+
+
+def extract_pdf_text(source, max_pages=None, time_budget=None, outcome=None):
+    return '\n'.join(text for _, text in iter_pdf_pages(source, max_pages, time_budget, outcome))
@@ -0,0 +1,228 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from job_cv_optimizer import (optimize_cv_with_gemini, stream_optimize_cv_with_gemini, build_custom_json,
+                              optimize_and_postprocess, combined_mode, structure_without_gemini,
+                              rebase_cv_header, POSTPROCESS_FIELDS)
+from jobs_store import get_jobs_store
+from history_store import get_history_store
+from metrics import STAGE_SECONDS, REPOST_LOOKUPS
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Executor compartido por Flask, Streamlit y la CLI para las llamadas a Gemini."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv("PIPELINE_WORKERS", "8")),
+                thread_name_prefix="pipeline",
+            )
+        return _executor
+
+
+class StageTimer:
+    """Acumula la duración en milisegundos de cada etapa del pipeline.
+
+    Cada medición también se registra en el histograma de etapas de metrics.
+    """
+
+    def __init__(self):
+        self._timings = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self._timings[name] = round(self._timings.get(name, 0.0) + elapsed_ms, 1)
+            STAGE_SECONDS.observe(elapsed_ms / 1000, stage=name)
+
+    def record(self, name, elapsed_ms):
+        with self._lock:
+            self._timings[name] = round(elapsed_ms, 1)
+        STAGE_SECONDS.observe(elapsed_ms / 1000, stage=name)
+
+    def as_dict(self):
+        with self._lock:
+            return dict(self._timings)
+
+
+def _rebase_custom_json(custom_json, vacancy_data):
+    """JSON de la vacante nueva con las secciones estructuradas de una publicación anterior.
+
+    La cabecera (fecha, enlace, título, empresa, contacto, salario, modalidad...)
+    sale siempre de la vacante nueva; de la anterior solo se reutiliza lo que
+    generó Gemini.
+    """
+    processed = {field: custom_json.get(field) for field in POSTPROCESS_FIELDS}
+    return build_custom_json(vacancy_data, processed=processed)
+
+
+def find_repost(vacancy_data, cv_text=None, timer=None):
+    """Busca una publicación anterior casi idéntica para reutilizar su resultado sin llamar a Gemini.
+
+    Retorna None o {"job_row_id", "similarity", "custom_json", "cv_es", "cv_en"};
+    los CVs solo vienen si ese mismo CV ya se optimizó para la publicación anterior.
+    """
+    text = vacancy_data.get("Información del trabajo")
+    # Import local: NumPy solo se carga si hay algo que comparar
+    from dedup_index import dedup_enabled, get_duplicate_index
+    if not text or text == "NA" or not dedup_enabled():
+        return None
+    timer = timer or StageTimer()
+    with timer.stage("dedup_lookup"):
+        for job_row_id, score in get_duplicate_index().find(text):
+            previous = get_jobs_store().get(job_row_id)
+            if previous is None:
+                continue
+            repost = {"job_row_id": job_row_id, "similarity": score,
+                      "custom_json": _rebase_custom_json(previous, vacancy_data), "cv_es": None, "cv_en": None}
+            if cv_text:
+                optimized = get_history_store().find_optimized(previous.get("Enlace___de___la___vacante"), cv_text)
+                if optimized:
+                    # Los CVs empiezan con el título y la empresa de la publicación anterior
+                    repost["cv_es"] = rebase_cv_header(optimized[0], vacancy_data, "es")
+                    repost["cv_en"] = rebase_cv_header(optimized[1], vacancy_data, "en")
+            break
+        else:
+            REPOST_LOOKUPS.inc(outcome="miss")
+            return None
+    reused = "full" if repost["cv_es"] is not None else "json"
+    REPOST_LOOKUPS.inc(outcome=reused)
+    print(f"Republicación de la vacante #{repost['job_row_id']} (similitud {repost['similarity']}): "
+          f"se reutiliza {'el JSON y los CVs optimizados' if reused == 'full' else 'el JSON de la vacante'}.")
+    return repost
+
+
+def optimize_vacancy(vacancy_data, cv_text, timer=None, optimize=True, reuse=True, combined=None, outcome=None):
+    """Optimiza el CV y construye el JSON de la vacante en paralelo.
+
+    Las dos llamadas a Gemini son independientes, así que el tiempo total es el
+    de la más lenta en lugar de la suma. Si la vacante es una republicación
+    (`reuse`), se reutiliza lo ya generado para la anterior. Con `combined`
+    (por defecto GEMINI_COMBINED) ambas salen de una sola llamada con respuesta
+    JSON. Retorna (cv_es, cv_en, custom_json). En `outcome` quedan "fallback"
+    (CVs de optimize_cv_manual) y "postprocess_fallback" (JSON de
+    fallback_postprocess), para que esos resultados no se guarden como reutilizables.
+    """
+    timer = timer or StageTimer()
+    outcome = {} if outcome is None else outcome
+    outcome.update(fallback=False, postprocess_fallback=False)
+    executor = get_executor()
+    repost = find_repost(vacancy_data, cv_text if optimize else None, timer=timer) if reuse else None
+    if combined is None:
+        combined = combined_mode()
+
+    if combined and optimize and not repost:
+        with timer.stage("llm_combined"):
+            cv_es, cv_en, processed = optimize_and_postprocess(vacancy_data, cv_text, outcome=outcome)
+        with timer.stage("build_custom_json"):
+            custom_json = build_custom_json(vacancy_data, processed=processed, outcome=outcome)
+        return cv_es, cv_en, custom_json
+
+    def run_optimize():
+        if not optimize:
+            return cv_text, cv_text
+        if repost and repost["cv_es"] is not None:
+            return repost["cv_es"], repost["cv_en"]
+        with timer.stage("optimize_cv"):
+            return optimize_cv_with_gemini(vacancy_data, cv_text, outcome=outcome)
+
+    def run_build():
+        if repost:
+            return repost["custom_json"]
+        with timer.stage("build_custom_json"):
+            return build_custom_json(vacancy_data, outcome=outcome)
+
+    with timer.stage("llm_parallel"):
+        cv_future = executor.submit(run_optimize)
+        json_future = executor.submit(run_build)
+        cv_es, cv_en = cv_future.result()
+        custom_json = json_future.result()
+    return cv_es, cv_en, custom_json
+
+
+class OptimizationStream:
+    """Variante en streaming de optimize_vacancy.
+
+    Iterar produce tuplas (sección, texto) del CV optimizado mientras
+    build_custom_json corre en paralelo; `result()` devuelve lo mismo que
+    optimize_vacancy una vez consumido el stream; `outcome` tiene las mismas
+    marcas de respaldo.
+
+    Con `combined` (por defecto GEMINI_COMBINED), si la vacante necesita a
+    Gemini para estructurarse, se hace la misma llamada única que en
+    optimize_vacancy: su respuesta es un JSON, así que cada versión del CV se
+    entrega completa al terminar en lugar de por fragmentos. Si la caché o el
+    parser local ya la estructuran, se transmite el CV como siempre.
+    """
+
+    def __init__(self, vacancy_data, cv_text, timer=None, reuse=True, combined=None):
+        self.vacancy_data = vacancy_data
+        self.cv_text = cv_text
+        self.timer = timer or StageTimer()
+        self.outcome = {"fallback": False, "postprocess_fallback": False}
+        self.repost = find_repost(vacancy_data, cv_text, timer=self.timer) if reuse else None
+        self.combined = False
+        processed = None
+        if combined is None:
+            combined = combined_mode()
+        if combined and not self.repost:
+            self.combined, processed = structure_without_gemini(vacancy_data)
+
+        def run_build():
+            with self.timer.stage("build_custom_json"):
+                return build_custom_json(vacancy_data, processed=processed, outcome=self.outcome)
+
+        if self.repost:
+            self._json_future = Future()
+            self._json_future.set_result(self.repost["custom_json"])
+        elif self.combined:
+            # Lo completa __iter__ con la respuesta combinada
+            self._json_future = Future()
+        else:
+            self._json_future = get_executor().submit(run_build)
+
+    def _iter_combined(self):
+        try:
+            with self.timer.stage("llm_combined"):
+                cv_es, cv_en, processed = optimize_and_postprocess(self.vacancy_data, self.cv_text,
+                                                                   outcome=self.outcome, local=False)
+            with self.timer.stage("build_custom_json"):
+                custom_json = build_custom_json(self.vacancy_data, processed=processed, outcome=self.outcome)
+        except BaseException as e:
+            self._json_future.set_exception(e)
+            raise
+        self._json_future.set_result(custom_json)
+        self.outcome.update(cv_es=cv_es, cv_en=cv_en)
+        yield "es", cv_es
+        yield "en", cv_en
+
+    def __iter__(self):
+        if self.repost and self.repost["cv_es"] is not None:
+            self.outcome.update(cv_es=self.repost["cv_es"], cv_en=self.repost["cv_en"])
+            yield "es", self.outcome["cv_es"]
+            yield "en", self.outcome["cv_en"]
+            return
+        if self.combined:
+            yield from self._iter_combined()
+            return
+        with self.timer.stage("optimize_cv"):
+            yield from stream_optimize_cv_with_gemini(self.vacancy_data, self.cv_text, outcome=self.outcome)
+        if "ttft_ms" in self.outcome:
+            self.timer.record("optimize_cv_ttft", self.outcome["ttft_ms"])
+
+    def result(self):
+        custom_json = self._json_future.result()
+        return self.outcome["cv_es"], self.outcome["cv_en"], custom_json
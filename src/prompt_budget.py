@@ -0,0 +1,241 @@
+"""Presupuesto de tokens para los prompts de Gemini.
+
+Antes de construir un prompt se limpia el texto (espacios, líneas repetidas y
+boilerplate como "About us" o las declaraciones de igualdad de oportunidades)
+y, si aun así supera el presupuesto, se recortan primero las secciones de menor
+prioridad del CV y de la vacante. Los datos de contacto del CV y los requisitos
+de la vacante nunca se recortan.
+
+El tamaño se estima con la heurística de ~4 caracteres por token: contar con
+la API de Gemini costaría una llamada de red por prompt.
+"""
+import os
+import re
+import math
+
+from metrics import PROMPT_TOKENS
+
+CHARS_PER_TOKEN = 4
+TRUNCATION_MARK = "[…]"
+
+# Presupuestos por llamada (tokens estimados del prompt completo); 0 desactiva el recorte
+OPTIMIZE_BUDGET = int(os.getenv("PROMPT_BUDGET_OPTIMIZE", "6000"))
+POSTPROCESS_BUDGET = int(os.getenv("PROMPT_BUDGET_POSTPROCESS", "3000"))
+# Parte del presupuesto de optimización reservada a la vacante cuando el CV no cabe
+JOB_SHARE = float(os.getenv("PROMPT_BUDGET_JOB_SHARE", "0.35"))
+
+PROTECTED = None  # prioridad de las secciones que nunca se recortan
+
+# (tipo, patrón del encabezado, prioridad): mayor prioridad = se recorta más tarde
+JOB_SECTIONS = (
+    ("requirements", r"(requirements|requisitos|qualifications|calificaciones|must[- ]haves?|skills|habilidades"
+                     r"|what you('| wi)ll need|what we('re| are) looking for|who you are|perfil (buscado|requerido)"
+                     r"|nice to have|deseable)", PROTECTED),
+    ("responsibilities", r"(responsibilities|responsabilidades|funciones|what you('ll| will)? do"
+                         r"|about the (role|job|position|opportunity)|the role|sobre el (rol|puesto)"
+                         r"|descripci[oó]n del (puesto|cargo)|job description)", 80),
+    ("benefits", r"(what we offer|benefits|beneficios|perks|ofrecemos|qu[eé] ofrecemos|compensation)", 20),
+    ("about", r"(about us|about the company|about [\w&.\- ]{2,40}$|sobre nosotros|qui[eé]nes somos|who we are"
+              r"|our company|acerca de)", 0),
+    ("legal", r"(equal (employment )?opportunity|eeo|diversity|igualdad de oportunidades|privacy|privacidad)", 0),
+)
+JOB_DEFAULT_PRIORITY = 50
+# Se eliminan siempre, estén o no dentro del presupuesto
+JOB_DROPPED = {"about", "legal"}
+
+CV_SECTIONS = (
+    ("contact", r"(contacto|contact( information)?|datos personales|personal (details|information))", PROTECTED),
+    ("experience", r"(experiencia( profesional| laboral)?|(professional |work )?experience|employment history"
+                   r"|trayectoria)", 80),
+    ("skills", r"(habilidades|skills|competencias|conocimientos|technical skills|herramientas|tools)", 80),
+    ("profile", r"(perfil( profesional)?|resumen( profesional)?|profile|summary|about me|sobre m[ií]|objetivo)", 60),
+    ("education", r"(educaci[oó]n|formaci[oó]n( acad[eé]mica)?|education|estudios)", 50),
+    ("languages", r"(idiomas|languages)", 50),
+    ("certifications", r"(certificaciones|certifications|licencias|licenses)", 40),
+    ("projects", r"(proyectos|projects|portafolio|portfolio)", 40),
+    ("courses", r"(cursos|courses|capacitaci[oó]n|training)", 30),
+    ("publications", r"(publicaciones|publications|premios|awards|logros|achievements)", 30),
+    ("interests", r"(intereses|interests|hobbies|pasatiempos|referencias|references|voluntariado|volunteering)", 10),
+)
+CV_DEFAULT_PRIORITY = 30
+
+# Líneas de boilerplate que no aportan nada al modelo en ningún contexto
+BOILERPLATE_LINES = re.compile(
+    r"(equal (employment )?opportunity employer|without regard to (race|color|religion|sex|age)"
+    r"|reasonable accommodations?|e-?verify|igualdad de oportunidades|no discrimina"
+    r"|^(show|see) (more|less)$|^(ver|mostrar) (m[aá]s|menos)$|^apply( now)?$|^postularse$"
+    r"|^report this job$|^denunciar (este )?empleo$)",
+    re.IGNORECASE,
+)
+# Solo se deduplican líneas largas: un "Python" repetido en dos secciones es legítimo
+DEDUP_MIN_CHARS = 40
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+def _compile(table):
+    return [(kind, re.compile(r"^" + pattern + r"\b", re.IGNORECASE), priority) for kind, pattern, priority in table]
+
+
+_JOB_PATTERNS = _compile(JOB_SECTIONS)
+_CV_PATTERNS = _compile(CV_SECTIONS)
+
+
+def clean_text(text):
+    """Normaliza espacios y elimina líneas de boilerplate y párrafos largos repetidos."""
+    lines = []
+    seen = set()
+    for line in (text or "").splitlines():
+        line = re.sub(r"[ \t ]+", " ", line).strip()
+        if line and BOILERPLATE_LINES.search(line):
+            continue
+        if len(line) >= DEDUP_MIN_CHARS:
+            key = line.lower()
+            if key in seen:
+                continue
+            seen.add(key)
+        if not line and (not lines or not lines[-1]):
+            continue
+        lines.append(line)
+    return "\n".join(lines).strip()
+
+
+def _heading_kind(line, patterns):
+    """(tipo, prioridad) si la línea parece un encabezado de sección, o None."""
+    title = line.strip().strip("#*•-_=").strip()
+    if not title or len(title) > 60 or len(title.split()) > 6 or title.endswith("."):
+        return None
+    normalized = title.rstrip(":").strip()
+    for kind, pattern, priority in patterns:
+        if pattern.match(normalized):
+            return kind, priority
+    letters = [c for c in normalized if c.isalpha()]
+    if title.endswith(":") or (len(letters) >= 3 and normalized.isupper()):
+        return "other", None
+    return None
+
+
+def split_sections(text, patterns, first_kind, default_priority):
+    """Divide el texto en secciones [{kind, priority, heading, lines}] según los encabezados."""
+    sections = [{"kind": first_kind, "priority": PROTECTED if first_kind == "contact" else default_priority,
+                 "heading": None, "lines": []}]
+    for line in text.splitlines():
+        match = _heading_kind(line, patterns) if line else None
+        if match is None:
+            sections[-1]["lines"].append(line)
+            continue
+        kind, priority = match
+        sections.append({"kind": kind, "priority": default_priority if kind == "other" else priority,
+                         "heading": line, "lines": []})
+    return [s for s in sections if s["heading"] is not None or any(s["lines"])]
+
+
+def _render(section):
+    body = "\n".join(section["lines"]).strip()
+    return "\n".join(part for part in (section["heading"], body) if part)
+
+
+def join_sections(sections):
+    return "\n\n".join(text for text in (_render(s) for s in sections) if text)
+
+
+def _truncate(section, max_tokens):
+    """Conserva las primeras líneas que caben en `max_tokens`. False si no cabe ninguna."""
+    heading_tokens = estimate_tokens(section["heading"] or "")
+    allowed = (max_tokens - heading_tokens - estimate_tokens(TRUNCATION_MARK)) * CHARS_PER_TOKEN
+    kept = []
+    used = 0
+    for line in section["lines"]:
+        if used + len(line) + 1 > allowed:
+            break
+        kept.append(line)
+        used += len(line) + 1
+    if not any(kept):
+        return False
+    section["lines"] = kept + [TRUNCATION_MARK]
+    return True
+
+
+def fit_sections(sections, budget):
+    """Recorta secciones por prioridad ascendente hasta que el texto quepa en `budget` tokens.
+
+    Dentro de la misma prioridad se recorta primero la sección más al final. Las
+    secciones protegidas no se tocan, así que el resultado puede seguir excediendo
+    el presupuesto si solo ellas ya lo hacen. Retorna (secciones, tipos recortados).
+    """
+    sections = [dict(s, lines=list(s["lines"])) for s in sections]
+    trimmed = []
+    order = sorted((i for i, s in enumerate(sections) if s["priority"] is not PROTECTED),
+                   key=lambda i: (sections[i]["priority"], -i))
+    for index in order:
+        excess = estimate_tokens(join_sections(sections)) - budget
+        if excess <= 0:
+            break
+        section = sections[index]
+        size = estimate_tokens(_render(section))
+        if size <= excess or not _truncate(section, size - excess):
+            section["lines"] = []
+            section["heading"] = None
+        trimmed.append(section["kind"])
+    return [s for s in sections if s["heading"] is not None or any(s["lines"])], trimmed
+
+
+def split_job_sections(text):
+    """Secciones de una descripción de vacante ya limpia (intro, requirements, benefits...)."""
+    return split_sections(clean_text(text), _JOB_PATTERNS, "intro", JOB_DEFAULT_PRIORITY)
+
+
+def compact_job_text(text, budget=None):
+    """Limpia la descripción de una vacante y la ajusta a `budget` tokens (None = sin límite)."""
+    sections = [s for s in split_job_sections(text) if s["kind"] not in JOB_DROPPED]
+    trimmed = []
+    if budget is not None:
+        sections, trimmed = fit_sections(sections, budget)
+    return join_sections(sections), trimmed
+
+
+def compact_cv(text, budget=None):
+    """Limpia un CV y lo ajusta a `budget` tokens sin tocar el encabezado de contacto."""
+    sections = split_sections(clean_text(text), _CV_PATTERNS, "contact", CV_DEFAULT_PRIORITY)
+    trimmed = []
+    if budget is not None:
+        sections, trimmed = fit_sections(sections, budget)
+    return join_sections(sections), trimmed
+
+
+def compact_for_optimize(cv_text, job_text, budget):
+    """Reparte `budget` tokens entre el CV y la vacante.
+
+    La vacante recibe lo que el CV no usa, con un mínimo de JOB_SHARE del
+    presupuesto; el CV se ajusta a lo que queda después.
+    """
+    job_text, job_trimmed = compact_job_text(job_text)
+    cv_text, cv_trimmed = compact_cv(cv_text)
+    if budget is None:
+        return cv_text, job_text, []
+    job_budget = max(budget - estimate_tokens(cv_text), int(budget * JOB_SHARE))
+    if estimate_tokens(job_text) > job_budget:
+        job_text, job_trimmed = compact_job_text(job_text, job_budget)
+    cv_budget = budget - estimate_tokens(job_text)
+    if estimate_tokens(cv_text) > cv_budget:
+        cv_text, cv_trimmed = compact_cv(cv_text, cv_budget)
+    return cv_text, job_text, [f"cv:{kind}" for kind in cv_trimmed] + [f"job:{kind}" for kind in job_trimmed]
+
+
+def available_budget(total_budget, template_tokens):
+    """Tokens que quedan para el texto variable, o None si el recorte está desactivado."""
+    if not total_budget or total_budget <= 0:
+        return None
+    return max(0, total_budget - template_tokens)
+
+
+def log_prompt_size(stage, before_tokens, prompt, trimmed=()):
+    """Registra el tamaño estimado del prompt antes y después de compactarlo."""
+    after_tokens = estimate_tokens(prompt)
+    PROMPT_TOKENS.observe(before_tokens, stage=stage, phase="before")
+    PROMPT_TOKENS.observe(after_tokens, stage=stage, phase="after")
+    detail = f", recortado: {', '.join(trimmed)}" if trimmed else ""
+    print(f"Prompt {stage}: {before_tokens} → {after_tokens} tokens estimados{detail}")
+    return after_tokens
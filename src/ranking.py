@@ -0,0 +1,362 @@
+"""Ranking de CVs contra vacantes con matrices de términos y un solo producto vectorizado.
+
+Cada documento se representa con sus términos (los mismos de ats_score) y con
+sus habilidades de la taxonomía como rasgos adicionales, así un CV en español
+y una vacante en inglés comparten "skill:English". Los pesos son TF-IDF
+(tf logarítmico, IDF sobre las vacantes) normalizados a norma 1, de modo que la
+similitud es el coseno.
+
+Las vacantes se guardan como filas dispersas (CSR en arreglos de NumPy) y los
+CVs como una matriz densa. La matriz completa CV × vacante sale de un único
+producto disperso × denso, por bloques para acotar la memoria. Agregar
+vacantes solo tokeniza las nuevas; el IDF y las normas se recalculan de forma
+vectorizada en el siguiente ranking.
+
+Uso:
+    python src/ranking.py --cv cvs/ --jobs-json "*.json" [--from-store] [--top 5] [--reverse]
+                          [--export-batch pares.jsonl]
+"""
+import os
+import sys
+import glob
+import json
+import argparse
+import threading
+from collections import Counter
+
+import numpy as np
+
+from ats_score import tokenize
+from skill_taxonomy import get_skill_taxonomy
+
+# Campos con el texto de una vacante, tanto en vacancy_data como en el JSON de build_custom_json
+VACANCY_FIELDS = (
+    ("Título del puesto", "Título___del___puesto"),
+    ("Información del trabajo", "Información___del___trabajo"),
+    ("Responsabilidades", "Responsabilidades"),
+    ("Requisitos", "Requisitos"),
+    ("Palabras clave", "Palabras clave"),
+)
+SKILL_PREFIX = "skill:"
+# Fracción de filas reemplazadas o eliminadas a partir de la cual se compactan los arreglos
+COMPACT_DEAD_FRACTION = 0.25
+
+
+def vacancy_text(record):
+    """Texto indexable de una vacante (vacancy_data o JSON de build_custom_json)."""
+    parts = []
+    for key, custom_key in VACANCY_FIELDS:
+        value = record.get(key, record.get(custom_key))
+        if isinstance(value, (list, tuple)):
+            value = "\n".join(str(item) for item in value)
+        if value and value != "NA":
+            parts.append(str(value))
+    return "\n".join(parts)
+
+
+def vacancy_id(record):
+    return record.get("Enlace de la vacante") or record.get("Enlace___de___la___vacante") or record.get("id")
+
+
+class TermRows:
+    """Filas dispersas de frecuencias (CSR) a las que se agregan filas sin reconstruir las anteriores.
+
+    Las filas reemplazadas o eliminadas solo se marcan como muertas; cuando
+    superan COMPACT_DEAD_FRACTION del total se reconstruyen los arreglos sin
+    ellas, lo que cambia los números de fila.
+    """
+
+    def __init__(self):
+        self.ids = []
+        self._row_of = {}
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._indices = np.zeros(0, dtype=np.int32)
+        self._counts = np.zeros(0, dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._pending = []
+
+    def __len__(self):
+        return len(self._row_of)
+
+    def add(self, doc_id, counts):
+        """Agrega una fila {columna: frecuencia}. Un id repetido reemplaza la fila anterior."""
+        if doc_id in self._row_of:
+            self.remove(doc_id)
+        self._row_of[doc_id] = len(self.ids)
+        self.ids.append(doc_id)
+        columns = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        self._pending.append((columns, values))
+
+    def remove(self, doc_id):
+        row = self._row_of.pop(doc_id, None)
+        if row is None:
+            return False
+        self._flush()
+        self._alive[row] = False
+        if len(self.ids) - len(self._row_of) > COMPACT_DEAD_FRACTION * len(self.ids):
+            self.compact()
+        return True
+
+    def compact(self):
+        """Reconstruye los arreglos solo con las filas vivas."""
+        self._flush()
+        keep = np.flatnonzero(self._alive)
+        lengths = np.diff(self._indptr)
+        live_values = np.repeat(self._alive, lengths)
+        self._indptr = np.concatenate([np.zeros(1, dtype=np.int64), np.cumsum(lengths[keep], dtype=np.int64)])
+        self._indices = self._indices[live_values]
+        self._counts = self._counts[live_values]
+        self._alive = np.ones(len(keep), dtype=bool)
+        self.ids = [self.ids[row] for row in keep]
+        self._row_of = {doc_id: row for row, doc_id in enumerate(self.ids)}
+
+    def __contains__(self, doc_id):
+        return doc_id in self._row_of
+
+    def _flush(self):
+        if not self._pending:
+            return
+        lengths = np.array([len(columns) for columns, _ in self._pending], dtype=np.int64)
+        self._indptr = np.concatenate([self._indptr, self._indptr[-1] + np.cumsum(lengths)])
+        self._indices = np.concatenate([self._indices] + [columns for columns, _ in self._pending])
+        self._counts = np.concatenate([self._counts] + [values for _, values in self._pending])
+        self._alive = np.concatenate([self._alive, np.ones(len(self._pending), dtype=bool)])
+        self._pending = []
+
+    def arrays(self):
+        """(indptr, indices, frecuencias, vivas) con todas las filas agregadas."""
+        self._flush()
+        return self._indptr, self._indices, self._counts, self._alive
+
+    @property
+    def nnz(self):
+        self._flush()
+        return len(self._indices)
+
+
+class RankingIndex:
+    """Índice de vacantes y CVs para calcular la matriz de similitud completa de una vez."""
+
+    def __init__(self, skill_weight=2.0, taxonomy=None, chunk_size=1 << 20):
+        self.skill_weight = skill_weight
+        self.taxonomy = taxonomy or get_skill_taxonomy()
+        self.chunk_size = chunk_size
+        self.vocabulary = {}
+        self.vacancies = TermRows()
+        self.cvs = TermRows()
+        self._lock = threading.Lock()
+        self._cache = None
+
+    def _features(self, text):
+        features = Counter(stem for stem, _ in tokenize(text))
+        for skill, count in self.taxonomy.count(text).items():
+            features[SKILL_PREFIX + skill] += self.skill_weight * count
+        columns = {}
+        for term, count in features.items():
+            column = self.vocabulary.get(term)
+            if column is None:
+                column = self.vocabulary[term] = len(self.vocabulary)
+            columns[column] = count
+        return columns
+
+    def add_vacancy(self, doc_id, text):
+        with self._lock:
+            self.vacancies.add(doc_id, self._features(text))
+            self._cache = None
+
+    def add_vacancies(self, documents):
+        """Agrega [(id, texto)]; solo se tokenizan los documentos nuevos."""
+        for doc_id, text in documents:
+            self.add_vacancy(doc_id, text)
+
+    def add_cv(self, doc_id, text):
+        with self._lock:
+            self.cvs.add(doc_id, self._features(text))
+            self._cache = None
+
+    def add_cvs(self, documents):
+        for doc_id, text in documents:
+            self.add_cv(doc_id, text)
+
+    def remove_vacancy(self, doc_id):
+        with self._lock:
+            removed = self.vacancies.remove(doc_id)
+            self._cache = None if removed else self._cache
+            return removed
+
+    def _idf(self, vocabulary_size):
+        indptr, indices, _, alive = self.vacancies.arrays()
+        rows = np.repeat(np.arange(len(alive)), np.diff(indptr))
+        live_columns = indices[alive[rows]]
+        df = np.bincount(live_columns, minlength=vocabulary_size).astype(np.float32)
+        documents = max(1, int(alive.sum()))
+        return np.log((1 + documents) / (1 + df)).astype(np.float32) + 1.0
+
+    def _weights(self, rows, idf):
+        """(ids de fila, columnas, pesos) TF-IDF normalizados a norma 1 por fila."""
+        indptr, indices, counts, alive = rows.arrays()
+        row_ids = np.repeat(np.arange(len(alive)), np.diff(indptr))
+        weights = (1.0 + np.log(counts)) * idf[indices]
+        norms = np.sqrt(np.bincount(row_ids, weights=weights * weights, minlength=len(alive))).astype(np.float32)
+        norms[norms == 0] = 1.0
+        return row_ids, indptr, indices, (weights / norms[row_ids]).astype(np.float32)
+
+    def similarity(self):
+        """Matriz de cosenos (CVs × vacantes) en float32. Las filas muertas aún sin compactar valen -inf."""
+        with self._lock:
+            if self._cache is not None:
+                return self._cache
+            vocabulary_size = len(self.vocabulary)
+            idf = self._idf(vocabulary_size)
+            cv_rows, _, cv_columns, cv_weights = self._weights(self.cvs, idf)
+            cvs = np.zeros((vocabulary_size, len(self.cvs.ids)), dtype=np.float32)
+            cvs[cv_columns, cv_rows] = cv_weights
+            _, indptr, columns, weights = self._weights(self.vacancies, idf)
+            scores = self._sparse_dot(indptr, columns, weights, cvs).T
+            scores[:, ~self.vacancies.arrays()[3]] = -np.inf
+            scores[~self.cvs.arrays()[3], :] = -np.inf
+            self._cache = scores
+            return scores
+
+    def _sparse_dot(self, indptr, columns, weights, dense):
+        """Filas CSR × matriz densa por bloques de ~chunk_size elementos (gather + reduceat)."""
+        n_rows = len(indptr) - 1
+        out = np.zeros((n_rows, dense.shape[1]), dtype=np.float32)
+        rows_per_chunk = max(1, self.chunk_size // max(1, dense.shape[1]) // max(1, len(columns) // max(1, n_rows)))
+        for first in range(0, n_rows, rows_per_chunk):
+            last = min(n_rows, first + rows_per_chunk)
+            start, end = indptr[first], indptr[last]
+            if start == end:
+                continue
+            contributions = dense[columns[start:end]] * weights[start:end, None]
+            offsets = indptr[first:last] - start
+            nonempty = np.diff(indptr[first:last + 1]) > 0
+            out[first:last][nonempty] = np.add.reduceat(contributions, offsets[nonempty], axis=0)
+        return out
+
+    @staticmethod
+    def _top_k(scores, k):
+        k = min(k, scores.shape[1])
+        if k <= 0:
+            return np.zeros((scores.shape[0], 0), dtype=np.int64)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind="stable")
+        return np.take_along_axis(top, order, axis=1)
+
+    def top_vacancies(self, k=10, min_score=0.0):
+        """{cv_id: [(vacancy_id, similitud), ...]} con las k vacantes más afines a cada CV."""
+        scores = self.similarity()
+        alive = self.cvs.arrays()[3]
+        result = {}
+        for row, columns in enumerate(self._top_k(scores, k)):
+            if alive[row]:
+                result[self.cvs.ids[row]] = [(self.vacancies.ids[c], round(float(scores[row, c]), 4))
+                                             for c in columns if scores[row, c] > min_score]
+        return result
+
+    def top_cvs(self, k=10, min_score=0.0):
+        """{vacancy_id: [(cv_id, similitud), ...]} con los k CVs más afines a cada vacante viva."""
+        scores = self.similarity().T
+        alive = self.vacancies.arrays()[3]
+        result = {}
+        for row, columns in enumerate(self._top_k(scores, k)):
+            if alive[row]:
+                result[self.vacancies.ids[row]] = [(self.cvs.ids[c], round(float(scores[row, c]), 4))
+                                                   for c in columns if scores[row, c] > min_score]
+        return result
+
+    def stats(self):
+        return {"vacancies": len(self.vacancies), "cvs": len(self.cvs), "terms": len(self.vocabulary),
+                "vacancy_nnz": self.vacancies.nnz, "cv_nnz": self.cvs.nnz}
+
+
+def load_vacancy_json(patterns):
+    """Vacantes de archivos JSON de build_custom_json (o vacancy_data). Retorna {id: registro}."""
+    records = {}
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    record = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Se omite {path}: {e}")
+                continue
+            if isinstance(record, dict) and vacancy_text(record):
+                records[vacancy_id(record) or path] = record
+    return records
+
+
+def load_store_vacancies():
+    from jobs_store import get_jobs_store
+    records = {}
+    for record in get_jobs_store().iter_rows():
+        records[vacancy_id(record) or f"job-{len(records)}"] = record
+    return records
+
+
+def load_cvs(paths):
+    """CVs en texto plano, de archivos o directorios (*.txt). Retorna {ruta: texto}."""
+    cvs = {}
+    for path in paths:
+        files = sorted(glob.glob(os.path.join(path, "*.txt"))) if os.path.isdir(path) else [path]
+        for file_path in files:
+            with open(file_path, "r", encoding="utf-8") as f:
+                cvs[file_path] = f.read()
+    return cvs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ordena vacantes por afinidad con cada CV (y viceversa).")
+    parser.add_argument("--cv", action="append", default=[], required=True, help="CV .txt o directorio; se puede repetir")
+    parser.add_argument("--jobs-json", action="append", default=[], help="Patrón glob de JSON de vacantes")
+    parser.add_argument("--from-store", action="store_true", help="Incluye las vacantes de jobs.sqlite3")
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--min-score", type=float, default=0.0)
+    parser.add_argument("--reverse", action="store_true", help="Muestra los mejores CVs por vacante")
+    parser.add_argument("--export-batch", help="Escribe los mejores pares como entrada JSONL de batch.py")
+    args = parser.parse_args(argv)
+
+    records = load_vacancy_json(args.jobs_json)
+    if args.from_store:
+        records.update(load_store_vacancies())
+    cvs = load_cvs(args.cv)
+    if not records or not cvs:
+        print("Se necesita al menos una vacante y un CV.")
+        return 1
+
+    index = RankingIndex()
+    index.add_vacancies((doc_id, vacancy_text(record)) for doc_id, record in records.items())
+    index.add_cvs(cvs.items())
+    print("Índice:", index.stats())
+
+    def label(doc_id):
+        record = records[doc_id]
+        title = record.get("Título del puesto") or record.get("Título___del___puesto") or "NA"
+        company = record.get("Nombre de la empresa") or record.get("Nombre___de___la___empresa") or "NA"
+        return f"{title} – {company}"
+
+    if args.reverse:
+        for doc_id, matches in index.top_cvs(args.top, args.min_score).items():
+            print(f"\n{label(doc_id)}")
+            for cv_path, score in matches:
+                print(f"  {score:.3f}  {cv_path}")
+    top = index.top_vacancies(args.top, args.min_score)
+    if not args.reverse:
+        for cv_path, matches in top.items():
+            print(f"\n{cv_path}")
+            for doc_id, score in matches:
+                print(f"  {score:.3f}  {label(doc_id)}  {doc_id}")
+
+    if args.export_batch:
+        with open(args.export_batch, "w", encoding="utf-8") as f:
+            for cv_path, matches in top.items():
+                for doc_id, score in matches:
+                    if str(doc_id).startswith("http"):
+                        f.write(json.dumps({"url": doc_id, "cv": cv_path, "score": score}, ensure_ascii=False) + "\n")
+        print(f"\nPares exportados para batch.py en {args.export_batch}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
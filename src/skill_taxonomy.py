@@ -0,0 +1,233 @@
+"""Extracción de habilidades con una taxonomía cargable y un autómata Aho-Corasick.
+
+La taxonomía (por defecto skills_taxonomy.txt, o SKILL_TAXONOMY_PATH) asocia a
+cada habilidad canónica sus sinónimos en inglés y español, incluidas frases de
+varias palabras como "machine learning". Todos los sinónimos se compilan en un
+único autómata, así que la extracción recorre el texto una sola vez sin importar
+cuántas habilidades haya.
+
+El texto y los sinónimos se normalizan igual: minúsculas, sin tildes, guiones
+como espacios y espacios colapsados. Una coincidencia solo cuenta si está entre
+límites de palabra; entre coincidencias solapadas gana la más larga más a la
+izquierda ("machine learning" antes que "learning"). Un sinónimo de una sola
+letra tampoco cuenta si en el texto original lo sigue un guion o ")", como en
+"C-level" o en la enumeración "c) SQL".
+"""
+import os
+import re
+import threading
+import unicodedata
+from collections import deque
+
+DEFAULT_TAXONOMY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "skills_taxonomy.txt")
+
+# Letras latinas acentuadas -> letra base, sin recorrer el texto carácter a carácter en Python
+_ACCENTS = {}
+for _codepoint in range(0xC0, 0x250):
+    _base = unicodedata.normalize("NFKD", chr(_codepoint))[0]
+    if _base != chr(_codepoint) and _base.isascii():
+        _ACCENTS[_codepoint] = _base
+_HYPHENS = "-‐‑"
+_ACCENTS.update({ord(ch): " " for ch in _HYPHENS + "_"})
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_cased(text):
+    """Texto sin tildes, con guiones como espacios y espacios colapsados; conserva mayúsculas."""
+    return _SPACES.sub(" ", text.translate(_ACCENTS)).strip()
+
+
+def _lower_same_length(text):
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    # Algunos caracteres (p. ej. "İ") cambian de longitud al pasar a minúsculas
+    return "".join(ch.lower() if len(ch.lower()) == 1 else ch for ch in text)
+
+
+def normalize(text):
+    return _lower_same_length(normalize_cased(text))
+
+
+def _hyphen_gaps(text):
+    """Posiciones de normalize_cased(text) cuyo espacio viene de un guion del texto original."""
+    translated = text.translate(_ACCENTS)
+    gaps = set()
+    removed = 0
+    for match in _SPACES.finditer(translated):
+        if match.start() == 0:
+            # strip() quita el espacio inicial
+            removed = match.end()
+            continue
+        if any(ch in _HYPHENS for ch in text[match.start():match.end()]):
+            gaps.add(match.start() - removed)
+        removed += match.end() - match.start() - 1
+    return gaps
+
+
+def parse_taxonomy(lines):
+    """Entradas (canónico, categoría, sinónimos) de un archivo en el formato de skills_taxonomy.txt."""
+    entries = []
+    category = None
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("[") and line.endswith("]"):
+            category = line[1:-1].strip() or None
+            continue
+        parts = [part.strip() for part in line.split("|")]
+        if parts[0]:
+            entries.append((parts[0], category, [alias for alias in parts[1:] if alias]))
+    return entries
+
+
+class SkillTaxonomy:
+    """Habilidades canónicas con sus sinónimos, compiladas en un autómata Aho-Corasick.
+
+    Cada entrada es (nombre canónico, categoría, sinónimos). Un sinónimo con
+    prefijo "!" solo coincide con esas mayúsculas exactas; si repite el nombre
+    canónico, el nombre deja de coincidir sin distinguir mayúsculas (así "!Go"
+    evita que cuente el verbo "go"). Un nombre canónico con prefijo "=" solo
+    coincide por sus sinónimos ("=C" no cuenta la letra suelta de "C suite").
+    """
+
+    def __init__(self, entries=()):
+        self.skills = []
+        self.categories = {}
+        self.pattern_count = 0
+        self.duplicate_aliases = 0
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        seen = set()
+        for canonical, category, aliases in entries:
+            self._add(canonical, category, aliases, seen)
+        self._build_fail_links()
+
+    @classmethod
+    def from_lines(cls, lines):
+        return cls(parse_taxonomy(lines))
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_lines(f)
+
+    def _add(self, canonical, category, aliases, seen):
+        exact = [alias[1:] for alias in aliases if alias.startswith("!")]
+        loose = [alias for alias in aliases if not alias.startswith("!")]
+        aliases_only = canonical.startswith("=")
+        canonical = canonical.lstrip("=").strip()
+        if not aliases_only and not any(alias.lower() == canonical.lower() for alias in exact):
+            loose.insert(0, canonical)
+        index = len(self.skills)
+        self.skills.append(canonical)
+        self.categories[canonical] = category
+        for alias, cased in [(alias, None) for alias in loose] + [(alias, alias) for alias in exact]:
+            pattern = normalize(alias)
+            cased = normalize_cased(cased) if cased is not None else None
+            key = (pattern, cased)
+            if not pattern or key in seen:
+                self.duplicate_aliases += bool(pattern)
+                continue
+            seen.add(key)
+            self._insert(pattern, (index, len(pattern), pattern[0].isalnum(), pattern[-1].isalnum(), cased))
+
+    def _insert(self, pattern, output):
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = nxt
+        self._out[node] += (output,)
+        self.pattern_count += 1
+
+    def _build_fail_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                # Hereda las salidas del sufijo más largo que también es un patrón
+                self._out[child] += self._out[self._fail[child]]
+
+    def find(self, text):
+        """Coincidencias [(habilidad, inicio, fin)] sobre el texto normalizado, sin solapes."""
+        cased = normalize_cased(text or "")
+        folded = _lower_same_length(cased)
+        goto, fail, out = self._goto, self._fail, self._out
+        size = len(folded)
+        candidates = []
+        hyphen_gaps = None
+        node = 0
+        for i, ch in enumerate(folded):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if not out[node]:
+                continue
+            for index, length, check_start, check_end, exact in out[node]:
+                start = i - length + 1
+                if check_start and start > 0 and folded[start - 1].isalnum():
+                    continue
+                if check_end and i + 1 < size and folded[i + 1].isalnum():
+                    continue
+                if exact is not None and cased[start:i + 1] != exact:
+                    continue
+                if length == 1 and i + 1 < size and folded[i + 1] in ") ":
+                    # Una letra suelta seguida de ")" o de un guion es una enumeración o un prefijo
+                    if folded[i + 1] == ")":
+                        continue
+                    if hyphen_gaps is None:
+                        hyphen_gaps = _hyphen_gaps(text)
+                    if i + 1 in hyphen_gaps:
+                        continue
+                candidates.append((start, -length, index))
+        matches = []
+        last_end = -1
+        for start, negative_length, index in sorted(candidates):
+            if start > last_end:
+                last_end = start - negative_length - 1
+                matches.append((self.skills[index], start, last_end + 1))
+        return matches
+
+    def count(self, text):
+        """{habilidad: ocurrencias} en orden de primera aparición."""
+        counts = {}
+        for skill, _, _ in self.find(text):
+            counts[skill] = counts.get(skill, 0) + 1
+        return counts
+
+    def extract(self, text, limit=None):
+        """Habilidades del texto, las más mencionadas primero (empates por orden de aparición)."""
+        counts = self.count(text)
+        ranked = sorted(counts, key=lambda skill: -counts[skill])
+        return ranked[:limit] if limit else ranked
+
+
+_taxonomy = None
+_taxonomy_lock = threading.Lock()
+
+
+def get_skill_taxonomy():
+    """Taxonomía compartida del proceso; se compila en el primer uso (SKILL_TAXONOMY_PATH la reemplaza)."""
+    global _taxonomy
+    with _taxonomy_lock:
+        if _taxonomy is None:
+            _taxonomy = SkillTaxonomy.from_file(os.getenv("SKILL_TAXONOMY_PATH") or DEFAULT_TAXONOMY_PATH)
+        return _taxonomy
+
+
+def extract_skills(text, limit=None):
+    return get_skill_taxonomy().extract(text, limit=limit)
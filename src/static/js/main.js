@@ -33,6 +33,9 @@ document.addEventListener('DOMContentLoaded', function() {
                 }
                 cvTextarea.value = data.text;
                 hideProcessingStatus();
+                if (data.truncated) {
+                    showError(data.warning);
+                }
             })
             .catch(error => {
                 showError('Error al procesar el archivo: ' + error.message);
@@ -73,20 +76,23 @@ document.addEventListener('DOMContentLoaded', function() {
             formData.append('cv_text', cvTextarea.value);
             formData.append('linkedin_url', linkedinUrl);
 
-            const response = await fetch('/optimize', {
+            const response = await fetch('/jobs', {
                 method: 'POST',
                 body: formData
             });
 
-            const data = await response.json();
+            const job = await response.json();
 
-            if (data.error) {
-                throw new Error(data.error);
+            if (job.error) {
+                throw new Error(job.error);
             }
 
+            const data = await waitForJob(job);
+
             // Mostrar resultados
             document.getElementById('cvEsResult').value = data.cv_es;
             document.getElementById('cvEnResult').value = data.cv_en;
+            showAtsScore(data.ats);
             results.style.display = 'block';
 
             // Configurar botones de descarga
@@ -110,6 +116,91 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
 
+    // Puntaje ATS local antes y después de optimizar
+    function showAtsScore(ats) {
+        const card = document.getElementById('atsCard');
+        if (!ats) {
+            card.style.display = 'none';
+            return;
+        }
+        const best = ats.after.es.score >= ats.after.en.score ? ats.after.es : ats.after.en;
+        document.getElementById('atsScore').textContent =
+            `Antes: ${ats.before.score} / 100 · Después: ${best.score} / 100`;
+        document.getElementById('atsMissing').textContent = best.missing_keywords.length
+            ? 'Palabras clave que aún faltan: ' + best.missing_keywords.join(', ')
+            : 'El CV optimizado cubre todas las palabras clave de la vacante.';
+        card.style.display = 'block';
+    }
+
+    // Seguimiento de trabajos: SSE con respaldo por polling
+    const STATUS_MESSAGES = {
+        queued: 'En cola, esperando un worker disponible...',
+        scraping: 'Extrayendo la vacante de LinkedIn...',
+        optimizing: 'Optimizando tu CV...',
+        done: 'Listo'
+    };
+
+    function handleJobUpdate(job, resolve, reject) {
+        if (job.status === 'done') {
+            resolve(job.result);
+            return true;
+        }
+        if (job.status === 'failed') {
+            reject(new Error(job.error || 'El trabajo falló'));
+            return true;
+        }
+        showProcessingStatus(STATUS_MESSAGES[job.status] || 'Procesando...');
+        return false;
+    }
+
+    function waitForJob(job) {
+        let streamStarted = false;
+        return new Promise((resolve, reject) => {
+            showProcessingStatus(STATUS_MESSAGES.queued);
+            if (!window.EventSource) {
+                pollJob(job.status_url, resolve, reject);
+                return;
+            }
+            const source = new EventSource(job.events_url);
+            // El CV optimizado llega por fragmentos mientras Gemini lo genera
+            source.addEventListener('chunk', function(event) {
+                const chunk = JSON.parse(event.data);
+                const target = document.getElementById(chunk.section === 'en' ? 'cvEnResult' : 'cvEsResult');
+                if (!streamStarted) {
+                    document.getElementById('cvEsResult').value = '';
+                    document.getElementById('cvEnResult').value = '';
+                    results.style.display = 'block';
+                    streamStarted = true;
+                }
+                target.value += chunk.text;
+            });
+            source.onmessage = function(event) {
+                if (handleJobUpdate(JSON.parse(event.data), resolve, reject)) {
+                    source.close();
+                }
+            };
+            source.onerror = function() {
+                // Si el stream se corta (proxy, reinicio) se continúa por polling
+                source.close();
+                pollJob(job.status_url, resolve, reject);
+            };
+        });
+    }
+
+    function pollJob(statusUrl, resolve, reject) {
+        fetch(statusUrl)
+            .then(response => response.json())
+            .then(job => {
+                if (job.error && !job.status) {
+                    throw new Error(job.error);
+                }
+                if (!handleJobUpdate(job, resolve, reject)) {
+                    setTimeout(() => pollJob(statusUrl, resolve, reject), 2000);
+                }
+            })
+            .catch(reject);
+    }
+
     // Funciones auxiliares
     function setLoadingState(isLoading) {
         btnText.style.display = isLoading ? 'none' : 'block';
@@ -0,0 +1,89 @@
+"""Filtros y paginación por cursor compartidos por jobs_store e history_store."""
+import datetime
+
+from vacancy_cache import extract_job_id
+
+MAX_PAGE_SIZE = 200
+
+
+class InvalidQueryError(ValueError):
+    """Parámetros de consulta mal formados (fecha, cursor, límite...)."""
+
+
+def _parse_date(value, name):
+    try:
+        return datetime.datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d")
+    except (TypeError, ValueError):
+        raise InvalidQueryError(f"{name} debe tener el formato YYYY-mm-dd")
+
+
+def _prefix_bounds(prefix):
+    # Rango [prefix, prefix + U+10FFFF) para que la búsqueda por prefijo use el índice NOCASE
+    return prefix, prefix + "\U0010ffff"
+
+
+def build_where(columns, company=None, title=None, date_from=None, date_to=None, url=None, cursor=None):
+    """Arma la cláusula WHERE a partir de los filtros.
+
+    `columns` mapea 'company', 'title', 'date' y 'job_id'/'url' a columnas reales.
+    Empresa y título aceptan un prefijo sin distinguir mayúsculas; la URL se
+    normaliza al ID de LinkedIn. Todas las condiciones se resuelven por índice.
+    """
+    clauses = []
+    params = []
+    if company:
+        low, high = _prefix_bounds(company.strip())
+        clauses.append(f"{columns['company']} >= ? COLLATE NOCASE AND {columns['company']} < ? COLLATE NOCASE")
+        params += [low, high]
+    if title:
+        low, high = _prefix_bounds(title.strip())
+        clauses.append(f"{columns['title']} >= ? COLLATE NOCASE AND {columns['title']} < ? COLLATE NOCASE")
+        params += [low, high]
+    if date_from:
+        clauses.append(f"{columns['date']} >= ?")
+        params.append(_parse_date(date_from, "date_from"))
+    if date_to:
+        # Las fechas del histórico incluyen hora: se compara contra el día siguiente
+        next_day = datetime.datetime.strptime(_parse_date(date_to, "date_to"), "%Y-%m-%d") + datetime.timedelta(days=1)
+        clauses.append(f"{columns['date']} < ?")
+        params.append(next_day.strftime("%Y-%m-%d"))
+    if url:
+        job_id = extract_job_id(url)
+        if job_id:
+            clauses.append(f"{columns['job_id']} = ?")
+            params.append(job_id)
+        else:
+            clauses.append(f"{columns['url']} = ?")
+            params.append(url)
+    if cursor is not None:
+        clauses.append(f"{columns['id']} < ?")
+        params.append(decode_cursor(cursor))
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def decode_cursor(cursor):
+    try:
+        value = int(cursor)
+    except (TypeError, ValueError):
+        raise InvalidQueryError("cursor inválido")
+    if value <= 0:
+        raise InvalidQueryError("cursor inválido")
+    return value
+
+
+def page_limit(limit, default=50):
+    if limit in (None, ""):
+        return default
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise InvalidQueryError("limit debe ser un entero")
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def paginate(rows, limit):
+    """Recibe hasta limit + 1 filas (id en la primera columna) y retorna (filas, siguiente cursor)."""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, str(rows[-1][0])
+    return rows, None
@@ -0,0 +1,222 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs
+
+_JOB_VIEW_RE = re.compile(r"/jobs/view/(?:[^/?#]*?-)?(\d+)")
+# Cada cuántas escrituras se vuelven a contar las filas (otros procesos pueden compartir el archivo)
+RESYNC_WRITES = 1000
+
+
+def extract_job_id(url):
+    """Obtiene el ID de LinkedIn de URLs como /jobs/view/4024724270/?trk=... o ?currentJobId=..."""
+    if not url or url == "NA":
+        return None
+    match = _JOB_VIEW_RE.search(url)
+    if match:
+        return match.group(1)
+    job_ids = parse_qs(urlsplit(url).query).get("currentJobId")
+    if job_ids and job_ids[0].isdigit():
+        return job_ids[0]
+    return None
+
+
+class VacancyCache:
+    """Caché de vacantes por ID de LinkedIn: LRU en memoria con respaldo en SQLite y TTL.
+
+    El número de filas se lleva en memoria, así escribir no cuenta la tabla.
+    """
+
+    def __init__(self, db_path="data/cache/vacancy_cache.sqlite3", ttl=7 * 24 * 3600,
+                 max_entries=5000, memory_entries=256):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        # hits/misses cuentan las vacantes scrapeadas; processed_* las búsquedas de get_processed
+        self._stats = {"hits": 0, "memory_hits": 0, "misses": 0, "processed_hits": 0,
+                       "processed_memory_hits": 0, "processed_misses": 0, "expired": 0, "evictions": 0,
+                       "writes": 0}
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS vacancies (
+                job_id TEXT PRIMARY KEY,
+                vacancy_data TEXT NOT NULL,
+                processed TEXT,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_vacancies_accessed ON vacancies(accessed_at)")
+        self._conn.commit()
+        self._sync_count()
+
+    def _sync_count(self):
+        self._count = self._conn.execute("SELECT COUNT(*) FROM vacancies").fetchone()[0]
+        self._writes_since_sync = 0
+
+    def _remember(self, job_id, entry):
+        self._memory[job_id] = entry
+        self._memory.move_to_end(job_id)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _load(self, job_id):
+        """(entrada o None, salió de memoria). Busca en memoria y luego en disco; con el lock tomado."""
+        now = time.time()
+        entry = self._memory.get(job_id)
+        if entry is not None:
+            if now - entry["created_at"] <= self.ttl:
+                self._memory.move_to_end(job_id)
+                return entry, True
+            del self._memory[job_id]
+
+        row = self._conn.execute(
+            "SELECT vacancy_data, processed, created_at FROM vacancies WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None, False
+        if now - row[2] > self.ttl:
+            self._conn.execute("DELETE FROM vacancies WHERE job_id = ?", (job_id,))
+            self._conn.commit()
+            self._count -= 1
+            self._stats["expired"] += 1
+            return None, False
+        self._conn.execute("UPDATE vacancies SET accessed_at = ? WHERE job_id = ?", (now, job_id))
+        self._conn.commit()
+        entry = {
+            "vacancy_data": json.loads(row[0]),
+            "processed": json.loads(row[1]) if row[1] else None,
+            "created_at": row[2],
+        }
+        self._remember(job_id, entry)
+        return entry, False
+
+    def get(self, url):
+        """Retorna una copia de vacancy_data cacheada para la URL, o None."""
+        job_id = extract_job_id(url)
+        if job_id is None:
+            return None
+        with self._lock:
+            entry, in_memory = self._load(job_id)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            self._stats["memory_hits"] += in_memory
+            vacancy_data = dict(entry["vacancy_data"])
+        # Se conserva la URL exacta que pidió el usuario
+        vacancy_data["Enlace de la vacante"] = url
+        return vacancy_data
+
+    def put(self, url, vacancy_data):
+        job_id = extract_job_id(url)
+        if job_id is None:
+            return
+        now = time.time()
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM vacancies WHERE job_id = ?", (job_id,)).fetchone()
+            self._conn.execute(
+                """INSERT OR REPLACE INTO vacancies (job_id, vacancy_data, processed, created_at, accessed_at)
+                   VALUES (?, ?, NULL, ?, ?)""",
+                (job_id, json.dumps(vacancy_data, ensure_ascii=False), now, now),
+            )
+            self._stats["writes"] += 1
+            self._count += exists is None
+            self._writes_since_sync += 1
+            if self._writes_since_sync >= RESYNC_WRITES:
+                self._sync_count()
+            self._evict()
+            self._conn.commit()
+            self._remember(job_id, {"vacancy_data": dict(vacancy_data), "processed": None, "created_at": now})
+
+    def get_processed(self, url, description):
+        """Retorna el resultado de postprocess_job_text si corresponde a la misma descripción."""
+        job_id = extract_job_id(url)
+        if job_id is None:
+            return None
+        with self._lock:
+            entry, in_memory = self._load(job_id)
+            if entry is None or entry["processed"] is None:
+                self._stats["processed_misses"] += 1
+                return None
+            if entry["vacancy_data"].get("Información del trabajo") != description:
+                self._stats["processed_misses"] += 1
+                return None
+            self._stats["processed_hits"] += 1
+            self._stats["processed_memory_hits"] += in_memory
+            return dict(entry["processed"])
+
+    def put_processed(self, url, description, processed):
+        """Guarda el JSON procesado junto a la vacante scrapeada, si es la misma descripción."""
+        job_id = extract_job_id(url)
+        if job_id is None:
+            return
+        with self._lock:
+            entry, _ = self._load(job_id)
+            if entry is None or entry["vacancy_data"].get("Información del trabajo") != description:
+                return
+            self._conn.execute(
+                "UPDATE vacancies SET processed = ? WHERE job_id = ?",
+                (json.dumps(processed, ensure_ascii=False), job_id),
+            )
+            self._conn.commit()
+            self._stats["writes"] += 1
+            entry["processed"] = dict(processed)
+
+    def _evict(self):
+        excess = self._count - self.max_entries
+        if excess <= 0:
+            return
+        evicted = [row[0] for row in self._conn.execute(
+            "SELECT job_id FROM vacancies ORDER BY accessed_at ASC LIMIT ?", (excess,)
+        )]
+        self._conn.executemany("DELETE FROM vacancies WHERE job_id = ?", [(job_id,) for job_id in evicted])
+        for job_id in evicted:
+            self._memory.pop(job_id, None)
+        self._count -= len(evicted)
+        self._stats["evictions"] += len(evicted)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = self._conn.execute("SELECT COUNT(*) FROM vacancies").fetchone()[0]
+        stats["memory_entries"] = len(self._memory)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        lookups = stats["processed_hits"] + stats["processed_misses"]
+        stats["processed_hit_rate"] = stats["processed_hits"] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM vacancies")
+            self._conn.commit()
+            self._memory.clear()
+            self._count = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_vacancy_cache():
+    """Devuelve la caché compartida del proceso, configurada por variables de entorno."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = VacancyCache(
+                db_path=os.getenv("VACANCY_CACHE_PATH", "data/cache/vacancy_cache.sqlite3"),
+                ttl=float(os.getenv("VACANCY_CACHE_TTL", str(7 * 24 * 3600))),
+                max_entries=int(os.getenv("VACANCY_CACHE_MAX_ENTRIES", "5000")),
+            )
+        return _cache
@@ -12,23 +12,30 @@ sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
 # Importar funciones necesarias desde job_cv_optimizer y file_processor
 try:
     from job_cv_optimizer import (
-        optimize_cv_with_gemini,
+        init,
         clean_filename,
-        build_custom_json,
         guardar_en_dataframe
     )
+    from pipeline import StageTimer, OptimizationStream
+    from ats_score import get_ats_scorer
+    import metrics
     from file_processor import FileProcessor
 except ImportError as e:
     st.error("Error al importar módulos. Asegúrate de que los archivos job_cv_optimizer.py y file_processor.py estén en la carpeta src/.")
     st.error(f"Detalles del error: {str(e)}")
     st.stop()
 
+# Carga .env una sola vez por proceso; Gemini se importa al pulsar "Optimizar CV"
+init()
+
 # Clase auxiliar para adaptar UploadedFile de Streamlit a FileProcessor
 class StreamlitFileAdapter:
     def __init__(self, uploaded_file):
         self.uploaded_file = uploaded_file
         self.filename = uploaded_file.name  # Nombre del archivo desde UploadedFile
-        self.file_content = uploaded_file.read()  # Contenido del archivo
+        self.file_content = uploaded_file.getvalue()  # Contenido del archivo
+        # FileProcessor extrae directamente de este buffer, sin pasar por disco
+        self.stream = io.BytesIO(self.file_content)
 
     def save(self, path):
         """Guarda el contenido del archivo en el path especificado."""
@@ -182,8 +189,12 @@ if uploaded_file is not None:
         # Adaptar el objeto UploadedFile para que FileProcessor pueda procesarlo
         file_adapter = StreamlitFileAdapter(uploaded_file)
         
-        # Procesar el archivo subido con FileProcessor
-        cv_text = FileProcessor.process_file(file_adapter)
+        # Procesar el archivo subido con FileProcessor; en cada rerun el texto sale de la caché por contenido
+        extraction = {}
+        cv_text = FileProcessor.process_file(file_adapter, outcome=extraction)
+        if extraction.get("truncated"):
+            st.warning(f"El PDF tiene {extraction['pages']} páginas; solo se leyeron las primeras "
+                       f"{extraction['read_pages']} (PDF_MAX_PAGES).")
         if cv_text:
             # Actualizar el área de texto con el contenido extraído
             st.session_state['cv_text'] = cv_text
@@ -226,17 +237,37 @@ if st.button("Optimizar CV", help="Generar un CV optimizado para esta vacante"):
                 "Beneficios": "NA"
             }
 
-            # Optimizar el CV con Gemini
+            # Optimizar el CV y procesar la vacante con Gemini en paralelo,
+            # mostrando cada versión a medida que llega
             st.info("Optimizando CV con inteligencia artificial...")
-            cv_es, cv_en = optimize_cv_with_gemini(vacancy_data, cv_text)
+            timer = StageTimer()
+            # La vacante es de ejemplo: no se buscan republicaciones con ella
+            stream = OptimizationStream(vacancy_data, cv_text, timer=timer, reuse=False)
+            chunks = iter(stream)
+            next_section = []
+
+            def section_chunks(section):
+                if next_section and next_section[0][0] == section:
+                    yield next_section.pop()[1]
+                for chunk_section, text in chunks:
+                    if chunk_section != section:
+                        next_section.append((chunk_section, text))
+                        return
+                    yield text
+
+            st.subheader("Versión en Español")
+            st.write_stream(section_chunks("es"))
+            st.subheader("Versión en Inglés")
+            st.write_stream(section_chunks("en"))
+            cv_es, cv_en, custom_json = stream.result()
 
             # Guardar la información en historial
             try:
-                custom_json = build_custom_json(vacancy_data)
-                guardar_en_dataframe(custom_json)
+                with timer.stage("persist"):
+                    # Sin source_text: la descripción de ejemplo no entra al índice de republicaciones
+                    guardar_en_dataframe(custom_json, fallback=stream.outcome["postprocess_fallback"])
             except Exception as e:
                 st.warning(f"Error al guardar el historial: {str(e)}")
-                custom_json = vacancy_data  # Usar datos sin procesar si falla
 
             # Generar nombres de archivo dinámicos
             job_title = clean_filename(vacancy_data["Título del puesto"])
@@ -256,12 +287,23 @@ if st.button("Optimizar CV", help="Generar un CV optimizado para esta vacante"):
 
             # Mostrar los resultados en la pantalla
             st.success("CV optimizado con éxito!")
-
-            st.subheader("Versión en Español")
-            st.text_area("CV Optimizado en Español", cv_es, height=250)
-
-            st.subheader("Versión en Inglés")
-            st.text_area("CV Optimizado en Inglés", cv_en, height=250)
+            st.caption(f"Tiempos por etapa (ms): {timer.as_dict()}")
+
+            # Puntaje ATS local, sin llamadas adicionales a Gemini
+            ats = get_ats_scorer().compare(vacancy_data, cv_text, cv_es, cv_en)
+            best = max(ats["after"].values(), key=lambda report: report["score"])
+            st.metric("Puntaje ATS", f"{best['score']} / 100", delta=ats["delta"])
+            if best["missing_keywords"]:
+                st.caption("Palabras clave que aún faltan: " + ", ".join(best["missing_keywords"]))
+
+            with st.expander("Ver en texto plano"):
+                st.text_area("CV Optimizado en Español", cv_es, height=250)
+                st.text_area("CV Optimizado en Inglés", cv_en, height=250)
+
+            # Métricas acumuladas por este proceso de Streamlit (todas las sesiones)
+            with st.expander("Métricas del proceso"):
+                st.json({"etapas": metrics.summary(), "respaldos": metrics.fallback_counts(),
+                         "postprocesamiento_local": metrics.postprocess_report()})
 
             # Permitir descargar los archivos
             st.download_button(
@@ -0,0 +1,8 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(ROOT, "benchmarks", "fixtures")
+
+# Los módulos viven en src/ y se importan sin paquete, igual que en app.py y los benchmarks
+sys.path.insert(0, os.path.join(ROOT, "src"))
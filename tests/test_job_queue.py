@@ -0,0 +1,63 @@
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from job_queue import DONE, QUEUED, RedisJobBackend
+
+
+@pytest.fixture
+def backend():
+    return RedisJobBackend(fakeredis.FakeRedis(), prefix="test:jobs", ttl=60)
+
+
+def test_create_get_update(backend):
+    backend.create("a", {"url": "https://example.com", "cv_text": "CV"})
+    job = backend.get("a")
+    assert job["status"] == QUEUED
+    assert job["payload"] == {"url": "https://example.com", "cv_text": "CV"}
+    assert job["result"] is None and job["error"] is None
+    assert job["version"] == 0 and job["events"] == 0
+
+    backend.update("a", status=DONE, result={"cv_es": "Hola"})
+    job = backend.get("a")
+    assert job["status"] == DONE
+    assert job["result"] == {"cv_es": "Hola"}
+    assert job["version"] == 1
+    assert backend.client.ttl("test:jobs:a") > 0
+
+
+def test_update_does_not_recreate_expired_job(backend):
+    backend.create("a", {})
+    backend.client.delete("test:jobs:a")
+    backend.update("a", status=DONE)
+    assert not backend.client.exists("test:jobs:a")
+    assert backend.get("a") is None
+
+
+def test_partial_hash_is_ignored(backend):
+    backend.client.hset("test:jobs:a", mapping={"status": DONE, "version": 3})
+    assert backend.get("a") is None
+
+
+def test_missing_job(backend):
+    assert backend.get("nope") is None
+
+
+def test_events(backend):
+    backend.create("a", {})
+    backend.append_event("a", {"type": "chunk", "data": "uno"})
+    backend.append_event("a", {"type": "chunk", "data": "dos"})
+    assert backend.get("a")["events"] == 2
+    assert [event["data"] for event in backend.get_events("a", 1)] == ["dos"]
+    # Volver a crear el trabajo descarta los eventos anteriores
+    backend.create("a", {})
+    assert backend.get_events("a", 0) == []
+
+
+def test_queue_is_fifo(backend):
+    backend.enqueue("a")
+    backend.enqueue("b")
+    assert backend.pending() == 2
+    assert backend.dequeue(timeout=1) == "a"
+    assert backend.dequeue(timeout=1) == "b"
+    assert backend.pending() == 0
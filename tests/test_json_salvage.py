@@ -0,0 +1,34 @@
+import pytest
+
+from job_cv_optimizer import salvage_json_object
+
+
+def test_complete_object():
+    assert salvage_json_object('{"a": 1, "b": [2, 3]}') == ({"a": 1, "b": [2, 3]}, True)
+
+
+def test_code_fence():
+    text = '```json\n{"Requisitos": ["SQL"], "Beneficios": null}\n```'
+    assert salvage_json_object(text) == ({"Requisitos": ["SQL"], "Beneficios": None}, True)
+
+
+def test_truncated_keeps_complete_members():
+    text = '{"Información___del___trabajo": "Resumen", "Requisitos": ["SQL", "Pyth'
+    assert salvage_json_object(text) == ({"Información___del___trabajo": "Resumen"}, False)
+
+
+def test_truncated_after_key():
+    data, complete = salvage_json_object('```json\n{"a": {"b": 1}, "c"')
+    assert data == {"a": {"b": 1}}
+    assert not complete
+
+
+def test_text_before_object():
+    data, complete = salvage_json_object('Aquí está el JSON: {"a": 1, "b": ')
+    assert data == {"a": 1}
+    assert not complete
+
+
+def test_no_object():
+    with pytest.raises(ValueError):
+        salvage_json_object("Lo siento, no puedo ayudar con eso.")
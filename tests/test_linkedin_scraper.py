@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+from conftest import FIXTURES_DIR
+from linkedin_scraper import has_required_fields, parse_vacancy_html
+
+URL = "https://www.linkedin.com/jobs/view/123"
+
+
+def parse_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return parse_vacancy_html(f.read(), URL)
+
+
+@pytest.fixture(scope="module")
+def vacancy():
+    return parse_fixture("linkedin_job_public.html")
+
+
+def test_public_page(vacancy):
+    assert has_required_fields(vacancy)
+    assert vacancy["Título del puesto"] == "Senior Data Analyst"
+    assert vacancy["Nombre de la empresa"] == "EPAM Systems"
+    assert vacancy["Enlace de la vacante"] == URL
+    assert vacancy["Requisitos"].startswith("\n- Seniority level: Mid-Senior level")
+    assert vacancy["Palabras clave"]
+
+
+def test_minified_page_matches_indented(vacancy):
+    minified = parse_fixture("linkedin_job_public_minified.html")
+    assert minified["Título del puesto"] == vacancy["Título del puesto"]
+    assert minified["Nombre de la empresa"] == vacancy["Nombre de la empresa"]
+    assert minified["Información del trabajo"].split() == vacancy["Información del trabajo"].split()
+    assert minified["Requisitos"] == vacancy["Requisitos"]
+    # Sin espacios entre etiquetas el encabezado no debe pegarse a la primera viñeta
+    assert "Responsibilities\nBuild dashboards" in minified["Información del trabajo"]
+
+
+def test_authwall_is_rejected():
+    assert not has_required_fields(parse_fixture("linkedin_authwall.html"))
+
+
+def test_empty_page():
+    vacancy = parse_vacancy_html("<html></html>", URL)
+    assert not has_required_fields(vacancy)
+    assert vacancy["Requisitos"] == "NA"
+    assert vacancy["Palabras clave"] == []
@@ -0,0 +1,65 @@
+import pytest
+
+from ranking import COMPACT_DEAD_FRACTION, RankingIndex, TermRows
+
+SKILLS = ["Python", "SQL", "Tableau", "Power BI", "Spark", "Airflow", "Docker", "Kubernetes",
+          "Excel", "Machine Learning"]
+
+
+def vacancy(i):
+    skills = ", ".join(SKILLS[j % len(SKILLS)] for j in range(i, i + 3))
+    return f"Data role {i} requiring {skills} and stakeholder communication"
+
+
+CVS = [
+    ("cv-python", "Data analyst with Python, SQL and Tableau dashboards"),
+    ("cv-platform", "Engineer running Spark and Airflow on Docker and Kubernetes"),
+    ("cv-excel", "Analyst with Excel, Power BI and Machine Learning basics"),
+]
+
+
+def test_term_rows_compaction_bounds_arrays():
+    rows = TermRows()
+    for i in range(200):
+        rows.add(i, {i % 7: 1.0, 100 + i % 5: 2.0})
+    for i in range(150):
+        rows.remove(i)
+        indptr, indices, counts, alive = rows.arrays()
+        assert len(alive) == len(rows.ids) == len(indptr) - 1
+        assert len(rows.ids) - len(rows) <= COMPACT_DEAD_FRACTION * len(rows.ids)
+        assert len(indices) == len(counts) == indptr[-1]
+    assert sorted(doc_id for doc_id in rows.ids if doc_id in rows) == list(range(150, 200))
+    rows.compact()
+    assert rows.ids == list(range(150, 200))
+    assert rows.nnz == 2 * len(rows)
+
+
+def test_replacing_a_row_keeps_one_live_copy():
+    rows = TermRows()
+    rows.add("a", {0: 1.0})
+    rows.add("a", {1: 3.0})
+    indptr, indices, counts, alive = rows.arrays()
+    live = [row for row in range(len(alive)) if alive[row]]
+    assert len(rows) == 1 and len(live) == 1
+    assert indices[indptr[live[0]]:indptr[live[0] + 1]].tolist() == [1]
+
+
+def test_ranking_after_compaction_matches_fresh_index():
+    index = RankingIndex()
+    index.add_vacancies((f"v{i}", vacancy(i)) for i in range(120))
+    index.add_cvs(CVS)
+    for i in range(0, 120, 2):
+        assert index.remove_vacancy(f"v{i}")
+    assert not index.remove_vacancy("v0")
+    assert len(index.vacancies.arrays()[3]) == len(index.vacancies.ids) < 120
+
+    fresh = RankingIndex()
+    fresh.add_vacancies((f"v{i}", vacancy(i)) for i in range(1, 120, 2))
+    fresh.add_cvs(CVS)
+
+    for cv_id, ranked in index.top_vacancies(k=5).items():
+        expected = fresh.top_vacancies(k=5)[cv_id]
+        assert [score for _, score in ranked] == pytest.approx([score for _, score in expected])
+        assert all(int(vacancy_id[1:]) % 2 == 1 for vacancy_id, _ in ranked)
+    assert set(index.top_cvs(k=1)) == {f"v{i}" for i in range(1, 120, 2)}
+    assert index.stats()["vacancies"] == 60